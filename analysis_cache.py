@@ -0,0 +1,104 @@
+# analysis_cache.py
+"""AI 분석 결과를 디스크에 보관하는 SQLite 기반 캐시"""
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+
+def make_analysis_key(model, title, description, length, include_sentiment=False, include_keywords=False,
+                      full_text=False):
+    """모델, 정리된 기사 내용, 분석 옵션으로 캐시 키(SHA-256) 생성 (원문 분석은 설명 기반 분석과 다른 키)"""
+    fields = [model, title, description, length, bool(include_sentiment), bool(include_keywords)]
+    if full_text:
+        fields.append("full_text")
+    payload = json.dumps(fields, ensure_ascii=False)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+class AnalysisCache:
+    """TTL 만료와 LRU 용량 제한을 지원하는 분석 결과 캐시
+
+    여러 분석 스레드가 동시에 접근하므로 하나의 연결을 잠금으로 보호한다.
+    """
+
+    def __init__(self, path, ttl_seconds=7 * 24 * 3600, max_entries=5000):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS analyses (
+                    key TEXT PRIMARY KEY,
+                    value TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    last_access REAL NOT NULL
+                )
+            """)
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_analyses_last_access ON analyses (last_access)")
+
+    def get(self, key):
+        """캐시된 분석 결과 반환 (없거나 만료되면 None)"""
+        now = time.time()
+        with self._lock, self._conn:
+            row = self._conn.execute(
+                "SELECT value, created_at FROM analyses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+
+            value, created_at = row
+            if self.ttl_seconds and now - created_at > self.ttl_seconds:
+                self._conn.execute("DELETE FROM analyses WHERE key = ?", (key,))
+                self.misses += 1
+                return None
+
+            # LRU 순서 갱신
+            self._conn.execute("UPDATE analyses SET last_access = ? WHERE key = ?", (now, key))
+            self.hits += 1
+            return json.loads(value)
+
+    def set(self, key, value):
+        """분석 결과 저장 후 용량을 넘으면 가장 오래 사용하지 않은 항목부터 제거"""
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO analyses (key, value, created_at, last_access) VALUES (?, ?, ?, ?)",
+                (key, json.dumps(value, ensure_ascii=False), now, now)
+            )
+            count = self._conn.execute("SELECT COUNT(*) FROM analyses").fetchone()[0]
+            if count > self.max_entries:
+                self._conn.execute(
+                    "DELETE FROM analyses WHERE key IN "
+                    "(SELECT key FROM analyses ORDER BY last_access ASC LIMIT ?)",
+                    (count - self.max_entries,)
+                )
+
+    def clear(self):
+        """모든 캐시 항목과 적중 통계 삭제"""
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM analyses")
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self):
+        """적중/미스 횟수, 적중률, 저장된 항목 수 반환"""
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM analyses").fetchone()[0]
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+                "entries": entries
+            }
+
+    def close(self):
+        """데이터베이스 연결 종료"""
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,217 @@
+# archive.py
+"""검색하고 분석한 기사를 계속 쌓아 두는 로컬 아카이브 (SQLite, 역색인 + 게시 시각 색인)
+
+기사와 분석 결과는 지우거나 고치지 않고 추가만 한다. 제목·설명·요약·키워드를 relevance.tokenize와 같은
+방식(한글은 두 글자 조각)으로 나눠 역색인(postings)에 넣어 두므로, 지난 보도를 API 호출 없이
+몇 밀리초 안에 다시 찾을 수 있다. 분석 결과는 분석 캐시 키와 함께 저장해, 캐시에서 밀려난
+분석도 같은 옵션이면 AI를 다시 호출하지 않고 아카이브에서 꺼내 쓴다.
+"""
+import math
+import os
+import sqlite3
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timezone
+
+from articles import Article
+from relevance import article_tokens, tokenize
+
+DEFAULT_ARCHIVE_DB_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "archive.sqlite3")
+DEFAULT_ARCHIVE_RESULTS = 20
+BM25_K1 = 1.2  # 단어 빈도가 점수에 더하는 몫의 포화 정도
+
+def analysis_tokens(analysis):
+    """분석 결과의 요약과 키워드 토큰 (감정 이유는 색인하지 않음)"""
+    return tokenize(analysis.get('summary')) + tokenize(analysis.get('keywords'))
+
+class ArticleArchive:
+    """URL마다 처음 본 기사 한 건과 그 기사의 분석 결과들을 추가만 하는 아카이브
+
+    여러 세션과 분석 스레드가 함께 쓰므로 하나의 연결을 잠금으로 보호한다.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript("""
+                CREATE TABLE IF NOT EXISTS articles (
+                    id INTEGER PRIMARY KEY,
+                    url TEXT NOT NULL UNIQUE,
+                    title TEXT NOT NULL,
+                    description TEXT NOT NULL DEFAULT '',
+                    source TEXT NOT NULL DEFAULT '',
+                    api_source TEXT NOT NULL DEFAULT '',
+                    published_at REAL,
+                    archived_at REAL NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS idx_articles_published_at ON articles (published_at);
+                CREATE TABLE IF NOT EXISTS analyses (
+                    id INTEGER PRIMARY KEY,
+                    article_id INTEGER NOT NULL REFERENCES articles (id),
+                    cache_key TEXT NOT NULL UNIQUE,
+                    summary TEXT NOT NULL,
+                    sentiment TEXT,
+                    keywords TEXT,
+                    archived_at REAL NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS idx_analyses_article_id ON analyses (article_id);
+                CREATE TABLE IF NOT EXISTS postings (
+                    token TEXT NOT NULL,
+                    article_id INTEGER NOT NULL,
+                    count INTEGER NOT NULL,
+                    PRIMARY KEY (token, article_id)
+                ) WITHOUT ROWID;
+            """)
+
+    def _index(self, article_id, counts):
+        """토큰 빈도를 역색인에 더함 (잠금을 잡은 상태에서 호출)"""
+        self._conn.executemany(
+            "INSERT INTO postings (token, article_id, count) VALUES (?, ?, ?) "
+            "ON CONFLICT (token, article_id) DO UPDATE SET count = count + excluded.count",
+            [(token, article_id, count) for token, count in counts.items()]
+        )
+
+    def _add_article(self, article, now):
+        """기사를 처음 보면 저장하고 색인한 뒤 (기사 id, 새로 저장했는지) 반환 (잠금을 잡은 상태에서 호출)"""
+        cursor = self._conn.execute(
+            "INSERT OR IGNORE INTO articles (url, title, description, source, api_source, published_at, archived_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (article.url, article.title, article.description or '', article.source or '', article.api_source or '',
+             article.published_at.timestamp() if article.published_at else None, now)
+        )
+        if cursor.rowcount == 1:
+            self._index(cursor.lastrowid, Counter(article_tokens(article)))
+            return cursor.lastrowid, True
+        return self._conn.execute("SELECT id FROM articles WHERE url = ?", (article.url,)).fetchone()[0], False
+
+    def add_articles(self, articles):
+        """검색된 기사 저장 (이미 있는 URL은 그대로 두고, 새로 저장한 기사 수 반환)"""
+        now = time.time()
+        with self._lock, self._conn:
+            return sum(self._add_article(article, now)[1] for article in articles if article.url)
+
+    def add_analysis(self, article, cache_key, analysis):
+        """기사의 분석 결과를 분석 캐시 키와 함께 저장 (같은 키가 이미 있거나 실패한 분석이면 무시)"""
+        if analysis.get('error') or not article.url:
+            return False
+        now = time.time()
+        with self._lock, self._conn:
+            article_id, _ = self._add_article(article, now)
+            cursor = self._conn.execute(
+                "INSERT OR IGNORE INTO analyses (article_id, cache_key, summary, sentiment, keywords, archived_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (article_id, cache_key, analysis.get('summary', ''), analysis.get('sentiment'),
+                 analysis.get('keywords'), now)
+            )
+            if cursor.rowcount != 1:
+                return False
+            self._index(article_id, Counter(analysis_tokens(analysis)))
+            return True
+
+    def get_analysis(self, cache_key):
+        """분석 캐시 키로 저장된 분석 결과 반환 (없으면 None)"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT summary, sentiment, keywords FROM analyses WHERE cache_key = ?", (cache_key,)
+            ).fetchone()
+        return self._analysis_from_row(row) if row else None
+
+    @staticmethod
+    def _analysis_from_row(row):
+        summary, sentiment, keywords = row
+        analysis = {"summary": summary}
+        if sentiment is not None:
+            analysis["sentiment"] = sentiment
+        if keywords is not None:
+            analysis["keywords"] = keywords
+        return analysis
+
+    def search(self, query, limit=DEFAULT_ARCHIVE_RESULTS, since=None, until=None, api_sources=None,
+               newest_first=False):
+        """검색어의 모든 토큰이 들어 있는 기사를 관련도순(newest_first면 최신순)으로 반환
+
+        반환 형태: [{"article": Article, "analysis": 가장 최근 분석 결과 또는 None, "score": 관련도}]
+        since/until(datetime)을 주면 그 사이에 게시된 기사만 찾고(게시 시각 색인 사용),
+        api_sources(예: ["naver"])를 주면 그 API에서 가져온 기사만 찾는다.
+        """
+        tokens = list(dict.fromkeys(tokenize(query)))
+        if not tokens:
+            return []
+        placeholders = ",".join("?" * len(tokens))
+        filters, filter_params = "", []
+        if since is not None:
+            filters += " AND a.published_at >= ?"
+            filter_params.append(since.timestamp())
+        if until is not None:
+            filters += " AND a.published_at < ?"
+            filter_params.append(until.timestamp())
+        if api_sources is not None:
+            filters += f" AND a.api_source IN ({','.join('?' * len(api_sources))})"
+            filter_params.extend(api_sources)
+
+        with self._lock:
+            total = self._conn.execute("SELECT COUNT(*) FROM articles").fetchone()[0]
+            document_frequency = dict(self._conn.execute(
+                f"SELECT token, COUNT(*) FROM postings WHERE token IN ({placeholders}) GROUP BY token", tokens
+            ).fetchall())
+            if len(document_frequency) < len(tokens):
+                return []  # 어느 기사에도 없는 토큰이 있으면 모든 토큰을 가진 기사도 없음
+            postings = self._conn.execute(
+                f"SELECT p.article_id, p.token, p.count, a.published_at FROM postings p "
+                f"JOIN articles a ON a.id = p.article_id WHERE p.token IN ({placeholders}){filters}",
+                tokens + filter_params
+            ).fetchall()
+
+            scores, matched, published = {}, {}, {}
+            for article_id, token, count, published_at in postings:
+                df = document_frequency[token]
+                idf = math.log(1 + (total - df + 0.5) / (df + 0.5))
+                scores[article_id] = scores.get(article_id, 0.0) + idf * count * (BM25_K1 + 1) / (count + BM25_K1)
+                matched[article_id] = matched.get(article_id, 0) + 1
+                published[article_id] = published_at or 0.0
+            candidates = [article_id for article_id, hits in matched.items() if hits == len(tokens)]
+            if newest_first:
+                candidates.sort(key=lambda article_id: (-published[article_id], -scores[article_id]))
+            else:
+                candidates.sort(key=lambda article_id: (-scores[article_id], -published[article_id]))
+            candidates = candidates[:limit]
+            if not candidates:
+                return []
+
+            id_placeholders = ",".join("?" * len(candidates))
+            rows = {row[0]: row for row in self._conn.execute(
+                f"SELECT id, title, description, url, source, api_source, published_at FROM articles "
+                f"WHERE id IN ({id_placeholders})", candidates
+            )}
+            latest = {row[0]: row[1:] for row in self._conn.execute(
+                f"SELECT article_id, summary, sentiment, keywords FROM analyses WHERE id IN "
+                f"(SELECT MAX(id) FROM analyses WHERE article_id IN ({id_placeholders}) GROUP BY article_id)",
+                candidates
+            )}
+
+        results = []
+        for article_id in candidates:
+            _, title, description, url, source, api_source, published_at = rows[article_id]
+            article = Article(title, description, url, source, api_source,
+                              datetime.fromtimestamp(published_at, timezone.utc) if published_at else None)
+            analysis = self._analysis_from_row(latest[article_id]) if article_id in latest else None
+            results.append({"article": article, "analysis": analysis, "score": scores[article_id]})
+        return results
+
+    def stats(self):
+        """저장된 기사 수, 분석 수, 색인된 토큰 종류 수"""
+        with self._lock:
+            return {
+                "articles": self._conn.execute("SELECT COUNT(*) FROM articles").fetchone()[0],
+                "analyses": self._conn.execute("SELECT COUNT(*) FROM analyses").fetchone()[0],
+                "tokens": self._conn.execute("SELECT COUNT(DISTINCT token) FROM postings").fetchone()[0]
+            }
+
+    def close(self):
+        """데이터베이스 연결 종료"""
+        with self._lock:
+            self._conn.close()
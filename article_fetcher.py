@@ -0,0 +1,346 @@
+# article_fetcher.py
+"""검색 결과 기사 주소에서 원문 본문을 가져오는 병렬 수집기 (사이트별 동시 연결 제한, 크기 제한, 스트리밍 HTML 파싱)
+
+검색 API가 주는 짧은 설명 대신 원문 본문으로 요약할 수 있도록, 분석을 시작할 때 모든 기사의
+본문을 미리 요청해 두고 AI 분석 스레드는 자기 기사의 본문이 도착하기만 기다린다.
+가져온 본문은 SQLite에 보관해 같은 기사를 다시 내려받지 않는다.
+"""
+import codecs
+import os
+import re
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import nullcontext
+from html.parser import HTMLParser
+from urllib.parse import urlsplit
+
+DEFAULT_BODY_DB_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "article_bodies.sqlite3")
+BODY_TTL_SECONDS = 7 * 24 * 3600  # 분석 캐시와 같은 7일
+BODY_MAX_ENTRIES = 5000
+DEFAULT_PER_DOMAIN_LIMIT = 4  # 같은 사이트에 동시에 여는 연결 수 (네이버 뉴스 기사는 대부분 한 사이트)
+DEFAULT_FETCH_WORKERS = 8
+MAX_BODY_BYTES = 2 * 1024 * 1024  # 페이지를 이 크기까지만 읽음
+MAX_BODY_CHARS = 6000  # 본문은 이 길이까지만 모음 (모이면 나머지는 내려받지 않음)
+FETCH_TIMEOUT = (5.0, 10.0)  # (연결, 읽기) 타임아웃(초)
+FETCH_DEADLINE_SECONDS = 15.0  # 한 페이지를 읽는 전체 시간 한도
+RETRY_FAILED_AFTER = 300  # 가져오기에 실패한 주소는 이 시간(초)이 지나야 다시 시도
+MAX_FAILED_URLS = 1000  # 실패 기록을 남겨 둘 최대 주소 수 (오래 실행되는 프로세스에서 메모리 제한)
+CHUNK_SIZE = 16 * 1024
+ENCODING_SNIFF_BYTES = 2048  # 문자 인코딩을 찾아볼 문서 앞부분 크기
+POOL_HOSTS = 32  # 연결 풀을 유지할 사이트 수
+USER_AGENT = "Mozilla/5.0 (compatible; NewsSummaryAgent/1.0)"
+
+# 본문이 아닌 영역 (메뉴, 광고, 스크립트 등)
+SKIP_TAGS = {"script", "style", "noscript", "nav", "header", "footer", "aside", "form", "iframe", "svg",
+             "button", "select", "template", "figcaption"}
+BLOCK_TAGS = {"p", "div", "article", "section", "li", "br", "td", "blockquote", "pre",
+              "h1", "h2", "h3", "h4", "h5", "h6"}
+VOID_TAGS = {"br", "img", "meta", "link", "input", "hr", "source", "wbr", "area", "base", "col", "embed"}
+# id/class에 이런 이름이 들어간 요소를 본문 영역으로 봄 (네이버 뉴스의 dic_area, newsct_article 등)
+# content, text, news처럼 거의 모든 컨테이너에 붙는 이름은 메뉴나 목록까지 본문으로 보게 하므로 넣지 않음
+CONTENT_HINT = re.compile(
+    r"article|dic_area|newsct|story[-_]?body|news[-_]?body|post[-_]?(?:body|content)|entry[-_]?content|main[-_]?content",
+    re.I)
+MIN_BLOCK_CHARS = 20  # 이보다 짧은 줄(메뉴, 버튼 글자)은 본문에서 뺌
+MIN_CONTENT_CHARS = 200  # 본문 영역에서 이만큼 모이지 않으면 페이지 전체의 긴 줄을 사용
+CHARSET_PATTERN = re.compile(rb'charset=["\']?([A-Za-z0-9_\-]+)', re.I)
+
+class MainTextParser(HTMLParser):
+    """HTML 조각을 받는 대로 처리하며 본문 후보 줄을 모으는 파서
+
+    feed()를 여러 번 불러 스트리밍으로 파싱하고, 본문 영역에서 max_chars만큼 모이면
+    enough가 True가 되어 나머지를 내려받지 않아도 된다.
+    """
+
+    def __init__(self, max_chars=MAX_BODY_CHARS):
+        super().__init__(convert_charrefs=True)
+        self.max_chars = max_chars
+        self.blocks = []  # (줄, 본문 영역 여부)
+        self.content_chars = 0
+        self._stack = []  # 열린 요소 (태그, 본문 영역 여부, 건너뛸 영역 여부)
+        self._buffer = []
+
+    @property
+    def enough(self):
+        return self.content_chars >= self.max_chars
+
+    @property
+    def _in_content(self):
+        return any(content for _, content, _ in self._stack)
+
+    @property
+    def _skipping(self):
+        return any(skip for _, _, skip in self._stack)
+
+    def handle_starttag(self, tag, attrs):
+        if tag in BLOCK_TAGS:
+            self._flush()
+        if tag in VOID_TAGS:
+            return
+        attributes = dict(attrs)
+        hint = f"{attributes.get('id') or ''} {attributes.get('class') or ''}"
+        self._stack.append((tag, tag == "article" or bool(CONTENT_HINT.search(hint)), tag in SKIP_TAGS))
+
+    def handle_endtag(self, tag):
+        if tag in BLOCK_TAGS:
+            self._flush()
+        # 닫히지 않은 요소가 있어도 같은 태그를 찾을 때까지 정리
+        for depth in range(len(self._stack) - 1, -1, -1):
+            if self._stack[depth][0] == tag:
+                del self._stack[depth:]
+                break
+
+    def handle_data(self, data):
+        if not self._skipping:
+            self._buffer.append(data)
+
+    def close(self):
+        super().close()
+        self._flush()
+
+    def _flush(self):
+        text = ' '.join(''.join(self._buffer).split())
+        self._buffer = []
+        if len(text) < MIN_BLOCK_CHARS:
+            return
+        in_content = self._in_content
+        self.blocks.append((text, in_content))
+        if in_content:
+            self.content_chars += len(text)
+
+    def main_text(self):
+        """본문 영역의 줄 (충분하지 않으면 페이지 전체의 긴 줄)을 max_chars 이내로 이어 붙인 본문"""
+        lines = [text for text, in_content in self.blocks if in_content]
+        if sum(len(line) for line in lines) < MIN_CONTENT_CHARS:
+            lines = [text for text, _ in self.blocks]
+        # 같은 문장이 여러 영역에 반복되면 한 번만 사용
+        return "\n".join(dict.fromkeys(lines))[:self.max_chars]
+
+def detect_encoding(content_type, head):
+    """Content-Type 헤더나 문서 앞부분의 <meta charset>으로 문자 인코딩 결정 (모르면 UTF-8)"""
+    for source in ((content_type or '').encode('latin-1', 'ignore'), head[:ENCODING_SNIFF_BYTES * 2]):
+        match = CHARSET_PATTERN.search(source)
+        if match:
+            try:
+                return codecs.lookup(match.group(1).decode('ascii')).name
+            except LookupError:
+                continue
+    return "utf-8"
+
+def extract_main_text(chunks, content_type=None, max_bytes=MAX_BODY_BYTES, max_chars=MAX_BODY_CHARS, deadline=None):
+    """바이트 조각을 받는 대로 해독·파싱해 본문 추출 (max_bytes나 deadline에 닿거나 본문이 차면 중단)"""
+    parser = MainTextParser(max_chars)
+    decoder = None
+    head = b''  # 인코딩을 정할 만큼(<meta charset>이 나올 만큼) 모일 때까지 앞부분을 보관
+    received = 0
+    for chunk in chunks:
+        if not chunk:
+            continue
+        chunk = chunk[:max_bytes - received]
+        received += len(chunk)
+        if decoder is None:
+            head += chunk
+            if len(head) < ENCODING_SNIFF_BYTES and received < max_bytes:
+                continue
+            decoder = codecs.getincrementaldecoder(detect_encoding(content_type, head))(errors='replace')
+            chunk = head
+        parser.feed(decoder.decode(chunk))
+        if parser.enough or received >= max_bytes or (deadline and time.monotonic() > deadline):
+            break
+    if decoder is None and head:
+        decoder = codecs.getincrementaldecoder(detect_encoding(content_type, head))(errors='replace')
+        parser.feed(decoder.decode(head))
+    if decoder is not None:
+        parser.feed(decoder.decode(b'', final=True))
+    parser.close()
+    return parser.main_text()
+
+class BodyStore:
+    """주소별 원문 본문을 보관하는 SQLite 저장소 (본문을 찾지 못한 페이지는 빈 문자열로 기록)"""
+
+    def __init__(self, path, ttl_seconds=BODY_TTL_SECONDS, max_entries=BODY_MAX_ENTRIES):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS bodies (
+                    url TEXT PRIMARY KEY,
+                    body TEXT NOT NULL,
+                    fetched_at REAL NOT NULL
+                )
+            """)
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_bodies_fetched_at ON bodies (fetched_at)")
+
+    def get(self, url):
+        """보관된 본문 반환 (없거나 만료되면 None)"""
+        with self._lock:
+            row = self._conn.execute("SELECT body, fetched_at FROM bodies WHERE url = ?", (url,)).fetchone()
+        if row is None or (self.ttl_seconds and time.time() - row[1] > self.ttl_seconds):
+            return None
+        return row[0]
+
+    def set(self, url, body):
+        """본문 저장 후 용량을 넘으면 가장 오래전에 가져온 것부터 제거"""
+        with self._lock, self._conn:
+            self._conn.execute("INSERT OR REPLACE INTO bodies (url, body, fetched_at) VALUES (?, ?, ?)",
+                               (url, body, time.time()))
+            count = self._conn.execute("SELECT COUNT(*) FROM bodies").fetchone()[0]
+            if count > self.max_entries:
+                self._conn.execute("DELETE FROM bodies WHERE url IN "
+                                   "(SELECT url FROM bodies ORDER BY fetched_at ASC LIMIT ?)",
+                                   (count - self.max_entries,))
+
+    def count(self):
+        """보관된 본문 수"""
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM bodies").fetchone()[0]
+
+    def clear(self):
+        """보관된 본문 모두 삭제"""
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM bodies")
+
+    def close(self):
+        """데이터베이스 연결 종료"""
+        with self._lock:
+            self._conn.close()
+
+class ArticleFetcher:
+    """기사 원문을 스레드 풀로 미리 가져오고, 같은 주소의 요청은 하나로 합치는 수집기
+
+    사이트(호스트)마다 per_domain_limit개까지만 동시에 연결해 한 언론사에 요청이 몰리지 않게 한다.
+    """
+
+    def __init__(self, store, client_registry, per_domain_limit=DEFAULT_PER_DOMAIN_LIMIT,
+                 max_workers=DEFAULT_FETCH_WORKERS, max_bytes=MAX_BODY_BYTES, max_chars=MAX_BODY_CHARS, metrics=None):
+        self.store = store
+        self.client_registry = client_registry
+        self.per_domain_limit = per_domain_limit
+        self.max_workers = max_workers
+        self.max_bytes = max_bytes
+        self.max_chars = max_chars
+        self.metrics = metrics
+        self.stats = {"fetched": 0, "stored": 0, "failed": 0, "bytes": 0}
+        self.last_error = None
+        self._executor = None
+        self._in_flight = {}  # 주소 -> Future
+        self._failed_at = {}  # 주소 -> 마지막 실패 시각
+        self._domain_slots = {}  # 호스트 -> BoundedSemaphore
+        self._lock = threading.Lock()
+
+    def configure(self, per_domain_limit):
+        """사이트별 동시 연결 수 변경 (진행 중인 요청은 이전 한도로 끝냄)"""
+        with self._lock:
+            if per_domain_limit != self.per_domain_limit:
+                self.per_domain_limit = per_domain_limit
+                self._domain_slots = {}
+
+    def prefetch(self, urls):
+        """주소들의 본문을 백그라운드에서 가져오기 시작 (이미 보관됐거나 진행 중이면 건너뜀)"""
+        for url in dict.fromkeys(urls):
+            if url:
+                self._submit(url)
+
+    def get(self, url):
+        """본문 반환 (진행 중이면 끝날 때까지 기다림, 가져오지 못하면 None)"""
+        if not url:
+            return None
+        return self._submit(url).result()
+
+    def close(self):
+        """작업 스레드 종료 (대기 중인 요청은 취소)"""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def _submit(self, url):
+        with self._lock:
+            future = self._in_flight.get(url)
+            failed_at = self._failed_at.get(url)
+            if future is None and failed_at is not None and time.monotonic() - failed_at < RETRY_FAILED_AFTER:
+                future = Future()
+                future.set_result(None)
+            elif future is None:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(max_workers=self.max_workers,
+                                                        thread_name_prefix="article-fetcher")
+                future = self._executor.submit(self._fetch, url)
+                self._in_flight[url] = future
+                future.add_done_callback(lambda _: self._forget(url))
+            return future
+
+    def _forget(self, url):
+        with self._lock:
+            self._in_flight.pop(url, None)
+
+    def _domain_slot(self, url):
+        host = urlsplit(url).hostname or ""
+        with self._lock:
+            slot = self._domain_slots.get(host)
+            if slot is None:
+                slot = self._domain_slots[host] = threading.BoundedSemaphore(self.per_domain_limit)
+            return slot
+
+    def _fetch(self, url):
+        body = self.store.get(url)
+        if body is not None:
+            self._count("stored")
+            return body or None
+        try:
+            with self._domain_slot(url), (self.metrics.span("body_fetch") if self.metrics else nullcontext()):
+                body = self.download(url)
+        except Exception as e:
+            # 일시적인 오류일 수 있으므로 저장하지 않고 RETRY_FAILED_AFTER 뒤에 다시 시도
+            with self._lock:
+                self._remember_failure(url)
+            self._count("failed")
+            self.last_error = f"{urlsplit(url).hostname}: {e}"
+            return None
+        self._count("fetched")
+        self.store.set(url, body)
+        return body or None
+
+    def _remember_failure(self, url):
+        """실패 시각 기록 (다시 시도할 때가 지났거나 MAX_FAILED_URLS를 넘는 오래된 기록은 정리, 잠금을 잡은 상태에서 호출)"""
+        now = time.monotonic()
+        self._failed_at.pop(url, None)
+        self._failed_at[url] = now  # 기록 순서 = 실패 시각 순서
+        while self._failed_at:
+            oldest_url, failed_at = next(iter(self._failed_at.items()))
+            if now - failed_at < RETRY_FAILED_AFTER and len(self._failed_at) <= MAX_FAILED_URLS:
+                break
+            del self._failed_at[oldest_url]
+
+    def _count(self, key, amount=1):
+        with self._lock:
+            self.stats[key] += amount
+
+    def download(self, url):
+        """페이지를 스트리밍으로 읽으며 본문 추출 (HTML이 아니면 빈 문자열, 실패 시 예외 발생)"""
+        session = self.client_registry.get_session('articles', pool_connections=POOL_HOSTS)
+        with session.get(url, headers={"User-Agent": USER_AGENT, "Accept": "text/html,application/xhtml+xml"},
+                         timeout=FETCH_TIMEOUT, stream=True) as response:
+            if response.status_code != 200:
+                raise RuntimeError(f"응답 코드 {response.status_code}")
+            content_type = response.headers.get('Content-Type', '')
+            if content_type and 'html' not in content_type:
+                return ""
+
+            received = [0]
+
+            def chunks():
+                for chunk in response.iter_content(CHUNK_SIZE):
+                    received[0] += len(chunk)
+                    yield chunk
+
+            try:
+                return extract_main_text(chunks(), content_type, self.max_bytes, self.max_chars,
+                                         time.monotonic() + FETCH_DEADLINE_SECONDS)
+            finally:
+                self._count("bytes", received[0])
@@ -0,0 +1,96 @@
+# articles.py
+"""뉴스 API 응답을 한 번에 정리해 담는 기사 레코드 (태그 제거, HTML 엔티티 해제, 시각 파싱)"""
+import html
+import re
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+
+TAG_PATTERN = re.compile(r'<[^>]+>')
+
+def clean_text(text):
+    """HTML 태그(<b> 등)를 없애고 엔티티(&quot; 등)를 풀어 공백을 하나로 정리"""
+    return ' '.join(html.unescape(TAG_PATTERN.sub('', text or '')).split())
+
+def parse_timestamp(value):
+    """네이버의 RFC 822 pubDate와 NewsAPI의 ISO 8601 publishedAt을 시간대 포함 datetime으로 변환
+
+    해석할 수 없으면 None을 반환하고, 시간대가 없는 값은 UTC로 간주한다.
+    """
+    if not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    except ValueError:
+        try:
+            parsed = parsedate_to_datetime(value)
+        except (TypeError, ValueError):
+            return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed
+
+class Article:
+    """검색 이후 모든 단계(중복 제거, 분석, 화면, 북마크, CLI)가 함께 쓰는 기사 레코드
+
+    기사 수가 많은 대량 검색에서도 메모리를 적게 쓰도록 __slots__를 사용한다.
+    """
+    __slots__ = ('title', 'description', 'url', 'source', 'api_source', 'published_at', 'body')
+
+    def __init__(self, title, description, url, source, api_source, published_at=None, body=None):
+        self.title = title
+        self.description = description
+        self.url = url
+        self.source = source
+        self.api_source = api_source
+        self.published_at = published_at
+        self.body = body  # 원문에서 가져온 본문 (원문 분석용 사본에만 채움, with_body 참고)
+
+    def __repr__(self):
+        return f"Article({self.api_source}, {self.title!r}, {self.url!r})"
+
+    @property
+    def published_date(self):
+        """화면 표시용 게시일 (YYYY-MM-DD, 없으면 '정보 없음')"""
+        return self.published_at.strftime('%Y-%m-%d') if self.published_at else '정보 없음'
+
+    def with_body(self, body):
+        """본문을 붙인 사본 (검색 캐시가 세션 간에 공유하는 레코드는 고치지 않음)"""
+        return Article(self.title, self.description, self.url, self.source, self.api_source, self.published_at, body)
+
+    def to_dict(self):
+        """JSON으로 내보낼 수 있는 사전 (게시 시각은 ISO 8601)"""
+        return {
+            'title': self.title,
+            'description': self.description,
+            'url': self.url,
+            'source': self.source,
+            'api_source': self.api_source,
+            'publishedAt': self.published_at.isoformat() if self.published_at else None
+        }
+
+def article_from_dict(data):
+    """to_dict() 결과를 다시 기사 레코드로 변환 (본문은 포함하지 않음)"""
+    return Article(data['title'], data['description'], data['url'], data['source'], data['api_source'],
+                   parse_timestamp(data.get('publishedAt')))
+
+def article_from_naver(item):
+    """네이버 뉴스 검색 결과 항목을 기사 레코드로 변환"""
+    return Article(
+        title=clean_text(item.get('title')),
+        description=clean_text(item.get('description')),
+        url=item.get('link', ''),
+        source=item.get('source', '네이버 뉴스'),
+        api_source='naver',
+        published_at=parse_timestamp(item.get('pubDate'))
+    )
+
+def article_from_newsapi(article):
+    """NewsAPI 검색 결과 항목을 기사 레코드로 변환"""
+    return Article(
+        title=clean_text(article.get('title')),
+        description=clean_text(article.get('description')),
+        url=article.get('url', ''),
+        source=(article.get('source') or {}).get('name') or 'NewsAPI',
+        api_source='newsapi',
+        published_at=parse_timestamp(article.get('publishedAt'))
+    )
@@ -0,0 +1,280 @@
+# benchmark.py
+"""로컬 대역 서버로 뉴스 파이프라인의 처리량과 지연 시간을 측정하는 오프라인 벤치마크
+
+사용 예:
+    python benchmark.py --keywords 3 --count 10 --llm-latency 0.4 --rate-429 0.05
+    python benchmark.py --scenarios baseline,concurrent --json results.json
+
+시나리오마다 새 분석/검색 캐시와 클라이언트 풀을 만들어 서로 영향을 주지 않게 하고,
+기사별 완료 지연(p50/p95/p99), 초당 처리 기사 수, 기사당 LLM 호출 수를 보고한다.
+단계별(검색, LLM 호출, 파싱 등) 소요 시간 분포는 --json 결과에 함께 저장한다.
+요청 제한 상태(429 재시도, 줄어든 동시 요청 한도)와 로컬 기사 아카이브도 시나리오마다 새로 시작한다.
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from analysis_cache import AnalysisCache
+from archive import ArticleArchive
+from article_fetcher import ArticleFetcher, BodyStore
+from client_pool import ClientRegistry
+from metrics import StageMetrics, percentile
+from news_pipeline import NewsPipeline, PipelineConfig, SUMMARY_LENGTH_GUIDES
+from resilience import ResilienceRegistry
+from search_cache import SearchCache
+from shared_cache import SingleFlight
+from stub_servers import EndpointBehavior, StubServer
+from token_usage import TokenUsageLog
+
+# 시나리오 이름 -> (설명, PipelineConfig 덮어쓸 값, 실행 옵션)
+SCENARIOS = {
+    "baseline": ("순차 분석 (동시 요청 1개)", {"max_concurrency": 1}, {}),
+    "concurrent": ("기사별 동시 분석", {}, {}),
+    "batched": ("여러 기사를 한 요청으로 묶음", {"enable_batching": True}, {}),
+    "cached": ("같은 키워드 재실행 (분석/검색 캐시 적중)", {}, {"warm_runs": 1}),
+    "multi-source": ("네이버 + NewsAPI 통합 검색", {"news_source": "all"}, {}),
+    "streaming": ("요약 토큰 스트리밍", {}, {"streaming": True}),
+    "triaged": ("관련도 상위 절반만 분석", {"enable_triage": True}, {"triage_ratio": 0.5}),
+    "local-extras": ("감정/키워드는 로컬 계산, AI는 요약만", {"local_sentiment_keywords": True}, {}),
+    "full-text": ("원문 본문을 가져와 분석 (수집과 분석 겹침)", {"fetch_full_text": True}, {}),
+    "digest": ("주제별로 묶어 주제마다 한 번 요약 + 전체 브리핑", {}, {"digest": True}),
+    "shared-sessions": ("세션 4개가 같은 키워드를 동시에 검색 (진행 중 작업 공유)", {}, {"sessions": 4}),
+    "timeline": ("네이버 + NewsAPI 최신순 통합 타임라인 (받는 대로 최신 기사부터 분석)",
+                 {"news_source": "all", "sort": "date", "unified_timeline": True}, {"timeline": True}),
+    "archive-first": ("캐시를 비운 뒤 재실행, 로컬 아카이브에서 먼저 찾기", {"archive_first": True},
+                      {"warm_runs": 1, "cold_caches": True}),
+}
+
+def run_digest_keyword(pipeline, keyword):
+    """키워드 하나를 검색해 주제별 묶음 요약 (모든 기사의 완료 시각은 브리핑까지 끝난 시각)"""
+    started_at = time.perf_counter()
+    result = pipeline.digest_keyword(keyword)
+    elapsed = time.perf_counter() - started_at
+    return [elapsed] * len(result["articles"]), [], result["errors"]
+
+def run_timeline_keyword(pipeline, keyword, streaming=False):
+    """최신순 통합 타임라인을 받는 대로 분석하며 기사별 완료 시각과 첫 토큰 시각을 기록"""
+    started_at = time.perf_counter()
+    latencies, first_delta = {}, {}
+
+    def on_result(i, analysis):
+        latencies[i] = time.perf_counter() - started_at
+
+    def on_delta(i, text):
+        first_delta.setdefault(i, time.perf_counter() - started_at)
+
+    _, analyses, errors = pipeline.analyze_timeline(keyword, on_delta=on_delta if streaming else None,
+                                                    on_result=on_result)
+    errors += [analysis['error'] for analysis in analyses if analysis.get('error')]
+    return list(latencies.values()), list(first_delta.values()), errors
+
+def run_keyword(pipeline, keyword, streaming=False):
+    """키워드 하나를 검색·분석하며 기사별 완료 시각과 첫 토큰 시각을 기록 (관련도 선별로 건너뛴 기사는 제외)"""
+    started_at = time.perf_counter()
+    news_results, _, errors, _ = pipeline.search_or_archive(keyword)
+    selected, _ = pipeline.triage(keyword, news_results)
+    latencies, first_delta = {}, {}
+
+    def on_result(i, analysis):
+        latencies[i] = time.perf_counter() - started_at
+
+    def on_delta(i, text):
+        first_delta.setdefault(i, time.perf_counter() - started_at)
+
+    analyses = pipeline.analyze_articles(news_results, on_result=on_result,
+                                         on_delta=on_delta if streaming else None, selected=selected)
+    errors += [analysis['error'] for analysis in analyses if analysis and analysis.get('error')]
+    return list(latencies.values()), list(first_delta.values()), errors
+
+def run_sessions(pipeline, keyword, sessions):
+    """여러 세션이 같은 키워드를 동시에 검색·분석 (기사 지연은 세션마다 따로 집계)"""
+    with ThreadPoolExecutor(max_workers=sessions) as executor:
+        outcomes = list(executor.map(lambda _: run_keyword(pipeline, keyword), range(sessions)))
+    return tuple(sum((outcome[part] for outcome in outcomes), []) for part in range(3))
+
+def run_scenario(name, stub, keywords, base_config, limits=None):
+    """시나리오 하나를 새 캐시와 클라이언트 풀로 실행하고 측정 결과 반환"""
+    description, overrides, options = SCENARIOS[name]
+    if "triage_ratio" in options:
+        # 대역 서버 기사는 모두 검색어를 포함하므로 최소 관련도 대신 상위 비율로 선별
+        overrides = {**overrides, "triage_min_score": 0.0,
+                     "triage_top_n": max(1, int(base_config["display_count"] * options["triage_ratio"]))}
+    with tempfile.TemporaryDirectory() as cache_dir:
+        registry = ClientRegistry()
+        token_usage = TokenUsageLog()
+        resilience = ResilienceRegistry(limits, quota_path=None)
+        stage_metrics = StageMetrics()
+        fetcher = ArticleFetcher(BodyStore(os.path.join(cache_dir, "bodies.sqlite3")), registry,
+                                 metrics=stage_metrics)
+        pipeline = NewsPipeline(
+            PipelineConfig(**{**base_config, **overrides}),
+            analysis_cache=AnalysisCache(os.path.join(cache_dir, "analysis.sqlite3")),
+            search_cache=SearchCache(),
+            client_registry=registry,
+            token_usage=token_usage,
+            resilience=resilience,
+            metrics=stage_metrics,
+            fetcher=fetcher,
+            archive=ArticleArchive(os.path.join(cache_dir, "archive.sqlite3"))
+        )
+        try:
+            # 캐시 시나리오는 먼저 한 번 돌려 캐시를 채운 뒤 측정
+            for _ in range(options.get("warm_runs", 0)):
+                for keyword in keywords:
+                    run_keyword(pipeline, keyword)
+            if options.get("cold_caches"):
+                # 캐시가 만료되거나 앱을 다시 띄운 상황: 아카이브만 남기고 캐시와 공유 결과를 비움
+                pipeline.analysis_cache.clear()
+                pipeline.search_cache.clear()
+                pipeline.shared = SingleFlight()
+
+            counts_before, throttled_before = stub.state.snapshot()
+            # 캐시를 채운 실행의 재시도는 측정에서 빼도록 누적 통계를 기록해 둠
+            retries_before = sum(guard["retries"] for guard in resilience.status())
+            token_usage.clear()
+            stage_metrics.clear()
+            latencies, first_deltas, errors = [], [], []
+            started_at = time.perf_counter()
+            for keyword in keywords:
+                if options.get("timeline"):
+                    keyword_latencies, keyword_first_deltas, keyword_errors = run_timeline_keyword(
+                        pipeline, keyword, options.get("streaming", False))
+                elif options.get("digest"):
+                    keyword_latencies, keyword_first_deltas, keyword_errors = run_digest_keyword(pipeline, keyword)
+                elif options.get("sessions", 1) > 1:
+                    keyword_latencies, keyword_first_deltas, keyword_errors = run_sessions(
+                        pipeline, keyword, options["sessions"])
+                else:
+                    keyword_latencies, keyword_first_deltas, keyword_errors = run_keyword(
+                        pipeline, keyword, options.get("streaming", False))
+                latencies += keyword_latencies
+                first_deltas += keyword_first_deltas
+                errors += keyword_errors
+            elapsed = time.perf_counter() - started_at
+            counts_after, throttled_after = stub.state.snapshot()
+            usage = token_usage.summary()
+            guards = resilience.status()
+            stages = stage_metrics.summary()
+            shared = pipeline.shared.stats()
+        finally:
+            pipeline.analysis_cache.close()
+            pipeline.archive.close()
+            fetcher.close()
+            fetcher.store.close()
+            registry.close()
+
+    def delta(counts_a, counts_b, endpoints):
+        return sum(counts_b.get(endpoint, 0) - counts_a.get(endpoint, 0) for endpoint in endpoints)
+
+    llm_endpoints = ("openai", "anthropic")
+    articles = len(latencies)
+    return {
+        "scenario": name,
+        "description": description,
+        "articles": articles,
+        "elapsed": elapsed,
+        "articles_per_sec": articles / elapsed if elapsed else 0.0,
+        "p50": percentile(latencies, 50),
+        "p95": percentile(latencies, 95),
+        "p99": percentile(latencies, 99),
+        "first_delta_p50": percentile(first_deltas, 50) if first_deltas else None,
+        "llm_calls": delta(counts_before, counts_after, llm_endpoints),
+        "llm_calls_per_article": delta(counts_before, counts_after, llm_endpoints) / articles if articles else 0.0,
+        "search_calls": delta(counts_before, counts_after, ("naver", "newsapi")),
+        "article_fetches": delta(counts_before, counts_after, ("article",)),
+        "input_tokens_per_article": usage["input_tokens"] / articles if articles else 0.0,
+        "output_tokens_per_article": usage["output_tokens"] / articles if articles else 0.0,
+        "estimated_cost": usage["cost"],
+        "throttled": delta(throttled_before, throttled_after, llm_endpoints + ("naver", "newsapi")),
+        "retries": sum(guard["retries"] for guard in guards) - retries_before,
+        "min_concurrency_limit": min(guard["concurrency_limit"] for guard in guards
+                                     if guard["provider"] in llm_endpoints),
+        "errors": len(errors),
+        # 기사를 하나도 받지 못했거나 모두 실패하면 처리량 수치는 의미가 없으므로 실패로 표시
+        "failed": not articles or len(errors) >= articles,
+        "stages": stages,
+        "shared": shared
+    }
+
+def format_table(results):
+    """측정 결과를 고정폭 텍스트 표로 변환"""
+    header = (f"{'시나리오':<14}{'기사':>6}{'초당 기사':>10}{'p50(s)':>9}{'p95(s)':>9}{'p99(s)':>9}"
+              f"{'첫 토큰':>9}{'LLM/기사':>10}{'입력/기사':>10}{'429':>6}{'재시도':>7}{'오류':>6}")
+    lines = [header, "-" * len(header)]
+    for result in results:
+        first_delta = f"{result['first_delta_p50']:.3f}" if result["first_delta_p50"] is not None else "-"
+        lines.append(
+            f"{result['scenario']:<14}{result['articles']:>6}{result['articles_per_sec']:>10.2f}"
+            f"{result['p50']:>9.3f}{result['p95']:>9.3f}{result['p99']:>9.3f}{first_delta:>9}"
+            f"{result['llm_calls_per_article']:>10.2f}{result['input_tokens_per_article']:>10.0f}"
+            f"{result['throttled']:>6}{result['retries']:>7}{result['errors']:>6}"
+        )
+    return "\n".join(lines)
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="로컬 대역 서버를 사용한 뉴스 파이프라인 벤치마크")
+    parser.add_argument('--scenarios', default=",".join(SCENARIOS),
+                        help=f"실행할 시나리오 (쉼표 구분, 기본: 전체 = {','.join(SCENARIOS)})")
+    parser.add_argument('--keywords', type=int, default=3, help="측정에 사용할 키워드 수")
+    parser.add_argument('--count', type=int, default=10, help="키워드당 분석할 뉴스 개수")
+    parser.add_argument('--model', choices=['openai', 'anthropic'], default='openai', help="AI 모델 공급자")
+    parser.add_argument('--length', choices=list(SUMMARY_LENGTH_GUIDES), default='보통', help="요약 길이")
+    parser.add_argument('--concurrency', type=int, default=4, help="동시 분석 요청 수")
+    parser.add_argument('--batch-token-budget', type=int, default=4000, help="묶음당 토큰 예산")
+    parser.add_argument('--search-latency', type=float, default=0.08, help="뉴스 검색 API 평균 지연(초)")
+    parser.add_argument('--llm-latency', type=float, default=0.3, help="LLM API 평균 지연(초)")
+    parser.add_argument('--jitter', type=float, default=0.1, help="지연의 ± 범위(초)")
+    parser.add_argument('--rate-429', type=float, default=0.0, help="LLM API가 429를 돌려줄 확률")
+    parser.add_argument('--retry-after', type=float, default=0.2, help="429 응답의 Retry-After(초)")
+    parser.add_argument('--llm-rpm', type=int, default=6000, help="LLM 공급자별 분당 최대 요청 수 (토큰 버킷)")
+    parser.add_argument('--seed', type=int, default=0, help="지연/429 난수 시드")
+    parser.add_argument('--json', help="결과를 JSON으로 저장할 경로")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    names = [name.strip() for name in args.scenarios.split(",") if name.strip()]
+    unknown = [name for name in names if name not in SCENARIOS]
+    if unknown:
+        print(f"알 수 없는 시나리오: {', '.join(unknown)}", file=sys.stderr)
+        return 2
+
+    search_behavior = EndpointBehavior(args.search_latency, min(args.jitter, args.search_latency))
+    llm_behavior = EndpointBehavior(args.llm_latency, args.jitter, args.rate_429, args.retry_after)
+    behaviors = {"naver": search_behavior, "newsapi": search_behavior, "article": search_behavior,
+                 "openai": llm_behavior, "anthropic": llm_behavior}
+    keywords = [f"벤치마크 키워드 {i + 1}" for i in range(args.keywords)]
+
+    results = []
+    with StubServer(behaviors, seed=args.seed) as stub:
+        base_config = dict(
+            stub.pipeline_urls(),
+            naver_client_id="bench", naver_client_secret="bench", newsapi_key="bench",
+            openai_api_key="bench", anthropic_api_key="bench",
+            model_provider=args.model, display_count=args.count, summary_length=args.length,
+            max_concurrency=args.concurrency, batch_token_budget=args.batch_token_budget
+        )
+        limits = {"openai": {"requests_per_minute": args.llm_rpm},
+                  "anthropic": {"requests_per_minute": args.llm_rpm}}
+        for name in names:
+            result = run_scenario(name, stub, keywords, base_config, limits)
+            results.append(result)
+            print(f"{name}: {result['articles']}개 기사, {result['elapsed']:.2f}초"
+                  + (f" — 실패 (오류 {result['errors']}개)" if result["failed"] else ""), file=sys.stderr)
+
+    print(format_table(results))
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({"settings": vars(args), "results": results}, f, ensure_ascii=False, indent=2)
+    failed = [result["scenario"] for result in results if result["failed"]]
+    if failed:
+        print(f"모든 기사가 실패한 시나리오: {', '.join(failed)}", file=sys.stderr)
+        return 1
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,121 @@
+# bookmark_store.py
+"""북마크를 세션이 끝나도 유지하는 SQLite 기반 저장소 (URL 고유 인덱스 + 제목/요약 전문 검색)"""
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime
+
+DEFAULT_BOOKMARK_DB_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "bookmarks.sqlite3")
+
+# trigram 토크나이저는 3글자 이상 검색어만 색인으로 찾을 수 있음
+FTS_MIN_TERM_LENGTH = 3
+
+class BookmarkStore:
+    """URL 기준으로 중복 없이 북마크를 저장하고 최신순 페이지 단위로 조회
+
+    조사가 붙는 한국어에서도 부분 일치로 찾을 수 있도록 FTS5 trigram 색인을 사용하고,
+    FTS5를 지원하지 않는 SQLite에서는 LIKE 검색으로 대신한다.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS bookmarks (
+                    id INTEGER PRIMARY KEY,
+                    url TEXT NOT NULL,
+                    title TEXT NOT NULL,
+                    summary TEXT NOT NULL DEFAULT '',
+                    source TEXT NOT NULL DEFAULT '',
+                    api_source TEXT NOT NULL DEFAULT '',
+                    saved_at TEXT NOT NULL,
+                    created_at REAL NOT NULL
+                )
+            """)
+            self._conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_bookmarks_url ON bookmarks (url)")
+            self.fts_enabled = self._create_fts_index()
+
+    def _create_fts_index(self):
+        # 외부 콘텐츠 FTS 테이블을 트리거로 bookmarks와 동기화
+        try:
+            self._conn.execute("""
+                CREATE VIRTUAL TABLE IF NOT EXISTS bookmarks_fts USING fts5(
+                    title, summary, content='bookmarks', content_rowid='id', tokenize='trigram'
+                )
+            """)
+        except sqlite3.OperationalError:
+            return False
+        self._conn.executescript("""
+            CREATE TRIGGER IF NOT EXISTS bookmarks_ai AFTER INSERT ON bookmarks BEGIN
+                INSERT INTO bookmarks_fts (rowid, title, summary) VALUES (new.id, new.title, new.summary);
+            END;
+            CREATE TRIGGER IF NOT EXISTS bookmarks_ad AFTER DELETE ON bookmarks BEGIN
+                INSERT INTO bookmarks_fts (bookmarks_fts, rowid, title, summary)
+                VALUES ('delete', old.id, old.title, old.summary);
+            END;
+        """)
+        return True
+
+    def add(self, title, url, summary="", source="", api_source=""):
+        """북마크 저장 (같은 URL이 이미 있으면 저장하지 않고 False 반환)"""
+        with self._lock, self._conn:
+            cursor = self._conn.execute(
+                "INSERT OR IGNORE INTO bookmarks (url, title, summary, source, api_source, saved_at, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (url, title, summary, source, api_source, datetime.now().strftime('%Y-%m-%d %H:%M:%S'), time.time())
+            )
+            return cursor.rowcount == 1
+
+    def delete(self, bookmark_id):
+        """북마크 하나 삭제"""
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM bookmarks WHERE id = ?", (bookmark_id,))
+
+    def clear(self):
+        """모든 북마크 삭제"""
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM bookmarks")
+            if self.fts_enabled:
+                self._conn.execute("INSERT INTO bookmarks_fts (bookmarks_fts) VALUES ('delete-all')")
+
+    def count(self, query=""):
+        """검색어에 맞는 북마크 수 (검색어가 없으면 전체)"""
+        where, params = self._search_clause(query)
+        with self._lock:
+            return self._conn.execute(f"SELECT COUNT(*) FROM bookmarks WHERE {where}", params).fetchone()[0]
+
+    def list(self, query="", limit=10, offset=0):
+        """검색어에 맞는 북마크를 최신순으로 limit개씩 반환"""
+        where, params = self._search_clause(query)
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, url, title, summary, source, api_source, saved_at FROM bookmarks "
+                f"WHERE {where} ORDER BY id DESC LIMIT ? OFFSET ?",
+                params + [limit, offset]
+            ).fetchall()
+        columns = ("id", "url", "title", "summary", "source", "api_source", "saved_at")
+        return [dict(zip(columns, row)) for row in rows]
+
+    def close(self):
+        """데이터베이스 연결 종료"""
+        with self._lock:
+            self._conn.close()
+
+    def _search_clause(self, query):
+        # 공백으로 나눈 모든 검색어를 포함하는 북마크 (AND 검색)
+        terms = query.split()
+        if not terms:
+            return "1", []
+        if self.fts_enabled and all(len(term) >= FTS_MIN_TERM_LENGTH for term in terms):
+            match = " ".join('"{}"'.format(term.replace('"', '""')) for term in terms)
+            return "id IN (SELECT rowid FROM bookmarks_fts WHERE bookmarks_fts MATCH ?)", [match]
+        conditions, params = [], []
+        for term in terms:
+            pattern = "%{}%".format(term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_"))
+            conditions.append("(title LIKE ? ESCAPE '\\' OR summary LIKE ? ESCAPE '\\')")
+            params += [pattern, pattern]
+        return " AND ".join(conditions), params
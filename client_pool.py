@@ -0,0 +1,119 @@
+# client_pool.py
+"""공급자와 API 키별로 재사용하는 HTTP/SDK 클라이언트 레지스트리"""
+import hashlib
+import sys
+import threading
+import time
+
+import anthropic
+import httpx
+import openai
+import requests
+from requests.adapters import HTTPAdapter
+
+def httpx_module_for(client_class):
+    """SDK의 httpx 클라이언트 클래스가 실제로 상속하는 httpx 호환 패키지 (Limits, Timeout을 여기서 만들어야 함)
+
+    SDK 버전에 따라 httpx 대신 httpx2 같은 다른 패키지의 Client를 쓰므로, 최상위 httpx의 설정 객체를
+    넘기면 타입이 맞지 않아 모든 요청이 실패한다.
+    """
+    for base in client_class.__mro__:
+        module = sys.modules.get(base.__module__.split('.')[0])
+        if base.__name__ == "Client" and hasattr(module, "Limits") and hasattr(module, "Timeout"):
+            return module
+    return httpx
+
+RETIRED_CLIENT_GRACE = 600  # 설정이 바뀌어 물러난 클라이언트를 닫기 전에 기다리는 시간(초), 진행 중인 요청이 끝날 여유
+
+class ClientRegistry:
+    """keep-alive 연결 풀을 가진 클라이언트를 (공급자, API 키) 단위로 보관
+
+    Streamlit 재실행이나 기사마다 클라이언트를 새로 만들면 매번 TCP/TLS 연결을
+    다시 맺게 되므로, 한 번 만든 클라이언트를 설정이 바뀔 때까지 재사용한다.
+    레지스트리는 여러 세션이 공유하므로, 설정이 바뀌어도 다른 세션이 쓰고 있을 수 있는 기존
+    클라이언트는 바로 닫지 않고 RETIRED_CLIENT_GRACE초가 지난 뒤에 닫는다.
+    """
+
+    def __init__(self, pool_size=10, connect_timeout=5.0, read_timeout=60.0):
+        self.pool_size = pool_size
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self._clients = {}
+        self._retired = []  # (물러난 시각, 클라이언트)
+        self._lock = threading.Lock()
+
+    @property
+    def requests_timeout(self):
+        """requests 호출에 넘길 (연결, 읽기) 타임아웃"""
+        return (self.connect_timeout, self.read_timeout)
+
+    def configure(self, pool_size, connect_timeout, read_timeout):
+        """풀 크기나 타임아웃이 바뀌면 다음 요청부터 새 클라이언트 생성 (기존 클라이언트는 유예 시간 뒤에 닫음)"""
+        settings = (pool_size, connect_timeout, read_timeout)
+        now = time.monotonic()
+        with self._lock:
+            if settings != (self.pool_size, self.connect_timeout, self.read_timeout):
+                self.pool_size, self.connect_timeout, self.read_timeout = settings
+                self._retired.extend((now, client) for client in self._clients.values())
+                self._clients.clear()
+            expired = [client for retired_at, client in self._retired if now - retired_at >= RETIRED_CLIENT_GRACE]
+            self._retired = [(retired_at, client) for retired_at, client in self._retired
+                             if now - retired_at < RETIRED_CLIENT_GRACE]
+        for client in expired:
+            client.close()
+
+    def get_openai(self, api_key, base_url=None):
+        """API 키(와 API 주소)별 OpenAI 클라이언트 반환"""
+        return self._get_or_create(("openai", base_url), api_key, lambda: openai.OpenAI(
+            api_key=api_key,
+            base_url=base_url,
+            max_retries=0,  # 재시도는 resilience 계층이 공급자 단위로 처리
+            http_client=self._new_httpx_client(openai.DefaultHttpxClient)
+        ))
+
+    def get_anthropic(self, api_key, base_url=None):
+        """API 키(와 API 주소)별 Anthropic 클라이언트 반환"""
+        return self._get_or_create(("anthropic", base_url), api_key, lambda: anthropic.Anthropic(
+            api_key=api_key,
+            base_url=base_url,
+            max_retries=0,  # 재시도는 resilience 계층이 공급자 단위로 처리
+            http_client=self._new_httpx_client(anthropic.DefaultHttpxClient)
+        ))
+
+    def get_session(self, provider, pool_connections=1):
+        """공급자별 requests 세션 반환 (인증 정보는 요청마다 전달, 여러 사이트에 접속하면 pool_connections로 호스트 수 지정)"""
+        return self._get_or_create(provider, "", lambda: self._new_requests_session(pool_connections))
+
+    def close(self):
+        """보관 중인 모든 클라이언트의 연결 풀 종료 (물러난 클라이언트 포함)"""
+        with self._lock:
+            old_clients = list(self._clients.values()) + [client for _, client in self._retired]
+            self._clients.clear()
+            self._retired = []
+        for client in old_clients:
+            client.close()
+
+    def _get_or_create(self, provider, api_key, factory):
+        # 원본 키 대신 해시를 사전 키로 사용
+        key = (provider, hashlib.sha256(api_key.encode('utf-8')).hexdigest())
+        with self._lock:
+            client = self._clients.get(key)
+            if client is None:
+                client = factory()
+                self._clients[key] = client
+            return client
+
+    def _new_httpx_client(self, client_class):
+        # SDK 기본 설정(리다이렉트 등)을 유지하도록 각 SDK의 httpx 클라이언트 클래스 사용
+        http = httpx_module_for(client_class)
+        return client_class(
+            limits=http.Limits(max_connections=self.pool_size, max_keepalive_connections=self.pool_size),
+            timeout=http.Timeout(self.read_timeout, connect=self.connect_timeout)
+        )
+
+    def _new_requests_session(self, pool_connections=1):
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=self.pool_size)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        return session
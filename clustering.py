@@ -0,0 +1,81 @@
+# clustering.py
+"""검색 결과를 같은 사건끼리 묶는 주제 군집화 (해시 TF-IDF 벡터 + 코사인 유사도, NumPy)
+
+인기 키워드의 기사 대부분은 몇 개의 사건을 반복해서 다루므로, 다이제스트 모드는 기사마다 요약하는 대신
+군집마다 대표 기사 몇 개로 한 번씩만 요약한다.
+"""
+import zlib
+
+import numpy as np
+
+from relevance import article_tokens, term_matrix
+
+HASH_DIMENSIONS = 4096  # 어휘 크기와 관계없이 기사 수 × 이 차원으로 메모리를 제한
+DEFAULT_CLUSTER_THRESHOLD = 0.3  # 군집 중심과 이 이상 비슷하면 같은 사건으로 봄
+REFINE_PASSES = 2  # 처음 배정 뒤 가장 가까운 중심으로 다시 배정하는 횟수 (입력 순서 영향 완화)
+
+def normalize_rows(matrix):
+    """행마다 길이 1로 정규화 (영벡터는 그대로)"""
+    return matrix / np.linalg.norm(matrix, axis=1, keepdims=True).clip(min=1e-12)
+
+def hashed_term_matrix(documents, dimensions=HASH_DIMENSIONS):
+    """문서별 토큰 목록을 (문서 수 × dimensions) 빈도 행렬로 변환 (토큰 -> 열 번호는 실행마다 같은 crc32 해시)"""
+    columns = {token: zlib.crc32(token.encode('utf-8')) % dimensions
+               for tokens in documents for token in tokens}
+    return term_matrix(documents, columns, columns=dimensions)
+
+def vectorize(articles, dimensions=HASH_DIMENSIONS):
+    """기사별 해시 TF-IDF 벡터 (행마다 길이 1로 정규화, float32)"""
+    tf = hashed_term_matrix([article_tokens(article) for article in articles], dimensions)
+    document_frequency = (tf > 0).sum(axis=0)
+    idf = np.log((1 + len(articles)) / (1 + document_frequency)) + 1
+    return normalize_rows((tf * idf).astype(np.float32))
+
+def cluster_articles(articles, threshold=DEFAULT_CLUSTER_THRESHOLD):
+    """기사를 주제별로 묶어 [기사 순번 목록] 목록 반환 (큰 군집부터, 군집 안에서는 중심에 가까운 기사부터)
+
+    입력 순서대로 가장 비슷한 군집 중심에 넣거나(유사도 threshold 이상) 새 군집을 만든 뒤,
+    모든 기사를 가장 가까운 중심으로 다시 배정해 순서에 따른 차이를 줄인다.
+    """
+    if not articles:
+        return []
+    vectors = vectorize(articles)
+    sums = np.zeros_like(vectors)  # 군집별 벡터 합 (앞쪽 count개만 사용)
+    centroids = np.zeros_like(vectors)  # 길이 1로 정규화한 sums
+    labels = np.empty(len(articles), dtype=np.intp)
+    count = 0
+    for i, vector in enumerate(vectors):
+        if count:
+            similarity = centroids[:count] @ vector
+            best = int(np.argmax(similarity))
+            if similarity[best] >= threshold:
+                labels[i] = best
+                sums[best] += vector
+                centroids[best] = sums[best] / max(np.linalg.norm(sums[best]), 1e-12)
+                continue
+        labels[i] = count
+        sums[count] = centroids[count] = vector
+        count += 1
+
+    for _ in range(REFINE_PASSES):
+        centroids = normalize_rows(np.stack([vectors[labels == c].sum(axis=0) for c in range(count)]))
+        similarity = vectors @ centroids.T
+        best = similarity.argmax(axis=1)
+        # 가장 가까운 중심과도 threshold 미만이면 원래 군집에 그대로 둠
+        keep = similarity[np.arange(len(articles)), best] < threshold
+        new_labels = np.where(keep, labels, best)
+        if np.array_equal(new_labels, labels):
+            break
+        labels = new_labels
+        # 비게 된 군집 번호는 당겨서 0..count-1로 다시 매김
+        used, labels = np.unique(labels, return_inverse=True)
+        count = len(used)
+
+    centroids = normalize_rows(np.stack([vectors[labels == c].sum(axis=0) for c in range(count)]))
+    centrality = (vectors * centroids[labels]).sum(axis=1)
+    clusters = []
+    for c in range(count):
+        members = np.flatnonzero(labels == c)
+        clusters.append(members[np.argsort(-centrality[members], kind='stable')].tolist())
+    clusters.sort(key=lambda members: (-len(members), members[0]))
+    return clusters
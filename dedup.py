@@ -0,0 +1,110 @@
+# dedup.py
+"""여러 뉴스 소스의 기사에서 같은 URL과 거의 같은 내용(통신사 전재 등)을 걸러내는 모듈"""
+import hashlib
+import heapq
+import html
+import re
+import urllib.parse
+
+SIMHASH_BITS = 64
+
+TRACKING_PARAMS = ('utm_', 'fbclid', 'gclid')
+
+def normalize_url(url):
+    """비교용 URL 정규화 (스킴/www/추적 파라미터/프래그먼트/끝 슬래시 무시)"""
+    parts = urllib.parse.urlsplit(url.strip())
+    host = parts.netloc.lower()
+    if host.startswith('www.'):
+        host = host[4:]
+    query = [(k, v) for k, v in urllib.parse.parse_qsl(parts.query)
+             if not k.lower().startswith(TRACKING_PARAMS)]
+    return urllib.parse.urlunsplit(('', host, parts.path.rstrip('/'), urllib.parse.urlencode(sorted(query)), ''))
+
+def clean_for_fingerprint(text):
+    """태그와 HTML 엔티티, 문장부호를 제거하고 공백을 하나로 정리"""
+    text = html.unescape(re.sub(r'<[^>]+>', ' ', text or ''))
+    text = re.sub(r'[^\w\s]', ' ', text.lower())
+    return ' '.join(text.split())
+
+def simhash(text, shingle_size=3):
+    """글자 n-gram 기반 64비트 SimHash (조사가 붙는 한국어에서도 안정적)"""
+    compact = text.replace(' ', '')
+    if len(compact) < shingle_size:
+        shingles = [compact] if compact else []
+    else:
+        shingles = [compact[i:i + shingle_size] for i in range(len(compact) - shingle_size + 1)]
+
+    weights = [0] * SIMHASH_BITS
+    for shingle in shingles:
+        value = int.from_bytes(hashlib.blake2b(shingle.encode('utf-8'), digest_size=8).digest(), 'big')
+        for bit in range(SIMHASH_BITS):
+            weights[bit] += 1 if value >> bit & 1 else -1
+
+    fingerprint = 0
+    for bit, weight in enumerate(weights):
+        if weight > 0:
+            fingerprint |= 1 << bit
+    return fingerprint
+
+def hamming_distance(a, b):
+    """두 지문 사이의 다른 비트 수"""
+    return bin(a ^ b).count('1')
+
+def iter_unique_articles(articles, max_distance=7):
+    """URL이 같거나 제목+설명의 SimHash가 가까운 기사를 건너뛰며 처음 나온 기사만 내보내는 제너레이터
+
+    지문을 max_distance + 1개 밴드로 나누면 거리가 max_distance 이하인 두 지문은
+    적어도 한 밴드가 일치하므로(비둘기집 원리) 그 후보끼리만 거리를 계산한다.
+    입력을 하나씩 읽으므로 스트림(다른 제너레이터)에도 쓸 수 있다.
+    """
+    band_count = max_distance + 1
+    band_bits = SIMHASH_BITS // band_count
+    band_mask = (1 << band_bits) - 1
+    seen_urls = set()
+    bands = {}  # (밴드 번호, 밴드 값) -> 해당 밴드를 가진 지문 목록
+
+    for article in articles:
+        url = normalize_url(article.url)
+        if url and url in seen_urls:
+            continue
+
+        text = clean_for_fingerprint(f"{article.title} {article.description}")
+        fingerprint = simhash(text) if text else None
+        if fingerprint is not None:
+            candidates = set()
+            for band in range(band_count):
+                candidates.update(bands.get((band, fingerprint >> (band * band_bits) & band_mask), ()))
+            if any(hamming_distance(fingerprint, other) <= max_distance for other in candidates):
+                continue
+            for band in range(band_count):
+                bands.setdefault((band, fingerprint >> (band * band_bits) & band_mask), []).append(fingerprint)
+
+        if url:
+            seen_urls.add(url)
+        yield article
+
+def deduplicate_articles(articles, max_distance=7):
+    """URL이 같거나 제목+설명의 SimHash가 가까운 기사를 제거 (먼저 나온 기사 유지)
+
+    (남은 기사 목록, 제거된 기사 수)를 반환한다.
+    """
+    unique = list(iter_unique_articles(articles, max_distance))
+    return unique, len(articles) - len(unique)
+
+def interleave(*sources):
+    """여러 소스의 결과를 번갈아 합쳐 한 소스가 앞자리를 독차지하지 않도록 함"""
+    merged = []
+    for i in range(max((len(source) for source in sources), default=0)):
+        for source in sources:
+            if i < len(source):
+                merged.append(source[i])
+    return merged
+
+def merge_newest_first(*sources):
+    """각자 최신순으로 정렬된 기사 스트림들을 게시 시각 기준으로 합쳐 최신 기사부터 내보내는 제너레이터 (힙 병합)
+
+    소스마다 다음 기사 하나씩만 보고 고르므로, 한 소스의 다음 페이지는 그 앞의 기사를 모두 내보낸 뒤에야
+    요청된다. 게시 시각이 없는 기사는 가장 오래된 것으로 본다.
+    """
+    return heapq.merge(*sources, key=lambda article: article.published_at.timestamp() if article.published_at
+                       else float('-inf'), reverse=True)
@@ -0,0 +1,182 @@
+# local_analysis.py
+"""LLM 호출 없이 CPU에서 기사 묶음 전체의 감정(사전 기반)과 키워드(TF-IDF)를 한 번에 계산하는 로컬 분석기
+
+AI 모델은 요약만 만들고, 감정/키워드는 이 모듈이 검색 결과 전체를 한 묶음으로 계산해
+출력 토큰과 응답 시간을 줄이는 데 쓴다. 결과 형식은 AI 분석 결과와 같다
+('긍정 - 이유', '키워드1, 키워드2, ...').
+"""
+import re
+
+import numpy as np
+
+from relevance import TITLE_WEIGHT, term_matrix
+
+WORD_PATTERN = re.compile(r'[0-9A-Za-z][0-9A-Za-z\-+.]*[0-9A-Za-z+]|[0-9A-Za-z]|[가-힣]+')
+
+# 긴 것부터 떼어 내는 조사/어미 (명사 뒤에 붙는 흔한 형태만)
+KOREAN_SUFFIXES = sorted([
+    "은", "는", "이", "가", "을", "를", "의", "에", "와", "과", "도", "만", "로", "으로", "에서", "에게", "께서",
+    "까지", "부터", "보다", "처럼", "이나", "나", "이며", "며", "이고", "하고", "에는", "에서는", "으로는", "로는",
+    "에도", "이라", "라고", "이라고", "들", "들이", "들은", "들을", "들의", "했다", "한다", "하는", "하며", "해",
+    "했", "된다", "됐다", "되는", "이다", "였다", "이었다", "되지", "하지", "되어", "하여", "해서", "되면", "하면",
+    "되고", "라는", "이라는", "에서도", "으로도"
+], key=len, reverse=True)
+
+STOPWORDS = {
+    "기자", "뉴스", "기사", "사진", "제공", "오늘", "어제", "내일", "이번", "지난", "올해", "작년", "관련", "대한",
+    "위해", "통해", "대해", "따르면", "밝혔다", "말했다", "있다", "없다", "것으로", "이라며", "그리고", "하지만",
+    "또한", "한편", "등", "및", "더", "수", "것", "중", "전", "후", "약", "그", "이", "저",
+    "않아", "않았다", "않는", "않고", "않을", "못했다", "있는", "없는", "했다", "한다", "된다", "있을", "없이",
+    "the", "a", "an", "and", "or", "of", "to", "in", "on", "for", "with", "by", "at", "from", "as", "is", "are",
+    "was", "were", "be", "been", "it", "its", "this", "that", "these", "those", "has", "have", "had", "will",
+    "would", "can", "could", "said", "says", "new", "more", "after", "over", "about", "than", "into", "but", "not",
+}
+
+# 감정 사전: 한국어는 어절 첫머리의 어근 + 허용된 접미사/조사, 영어는 활용형까지 적은 단어와 통째로 일치
+# (부분 일치는 'fell' -> 'fellow', '최고' -> '최고경영자', '사고' -> '조사고발'처럼 엉뚱한 단어까지 잡으므로 쓰지 않음.
+#  그 대가로 '교통사고'처럼 어절 중간에 붙은 합성어는 놓친다)
+POSITIVE_TERMS = [
+    "성장", "상승", "증가", "호조", "개선", "회복", "흑자", "최고", "돌파", "성공", "확대", "호평", "수혜", "강세",
+    "급등", "합의", "혁신", "기대", "수상", "달성", "협력", "유치", "인기", "호황", "반등", "최대", "흥행", "안정",
+]
+NEGATIVE_TERMS = [
+    "하락", "감소", "위기", "우려", "적자", "부진", "침체", "손실", "사고", "논란", "갈등", "비판", "피해", "약세",
+    "급락", "폭락", "파산", "소송", "중단", "해고", "의혹", "사망", "악화", "불안", "경고", "철수", "지연", "결함",
+    "리콜", "유출", "제재", "실패", "붕괴", "적발", "혐의",
+]
+POSITIVE_WORDS = [
+    "grow", "grows", "grew", "growing", "growth", "gain", "gains", "gained", "surge", "surges", "surged", "surging",
+    "rise", "rises", "rising", "rose", "beat", "beats", "profit", "profits", "profitable", "success", "successful",
+    "improve", "improves", "improved", "improving", "improvement", "boost", "boosts", "boosted", "strong", "stronger",
+    "rally", "rallies", "rallied", "upgrade", "upgrades", "upgraded", "record high", "recover", "recovers",
+    "recovered", "recovery",
+]
+NEGATIVE_WORDS = [
+    "fall", "falls", "falling", "fell", "fallen", "drop", "drops", "dropped", "dropping", "decline", "declines",
+    "declined", "declining", "loss", "losses", "crisis", "concern", "concerns", "lawsuit", "lawsuits", "crash",
+    "crashes", "crashed", "weak", "weaker", "weakness", "risk", "risks", "fraud", "delay", "delays", "delayed",
+    "plunge", "plunges", "plunged", "slump", "slumps", "slumped", "downgrade", "downgrades", "downgraded", "layoff",
+    "layoffs", "fail", "fails", "failed", "failure", "recall", "recalls", "recalled", "breach", "breaches", "fined",
+]
+
+LEXICON = {**{term: 1 for term in POSITIVE_TERMS + POSITIVE_WORDS},
+           **{term: -1 for term in NEGATIVE_TERMS + NEGATIVE_WORDS}}
+LEXICON_PATTERN = re.compile(
+    r"(?<![가-힣])(?P<term>"
+    + "|".join(re.escape(term) for term in sorted(POSITIVE_TERMS + NEGATIVE_TERMS, key=len, reverse=True))
+    + r")(?P<tail>[가-힣]*)|\b(?P<word>"
+    + "|".join(re.escape(word) for word in sorted(POSITIVE_WORDS + NEGATIVE_WORDS, key=len, reverse=True))
+    + r")\b"
+)
+# 한국어 어근 뒤에 붙어도 같은 뜻으로 보는 파생 접미사 ('증가세', '최고치', '기대감', '안정적인', '흑자전환')와 용언 활용 첫 글자 ('증가했다')
+KOREAN_TERM_SUFFIXES = sorted(["세", "치", "률", "율", "폭", "감", "적", "적인", "전환"], key=len, reverse=True)
+KOREAN_VERB_ENDINGS = tuple("하한할함해했되된될됨돼됐")
+# 감정 표현 바로 뒤의 부정·해소 표현은 극성을 뒤집음 ('개선되지 않았다', '우려 해소')
+NEGATION_PATTERN = re.compile(r"[가-힣]{0,3}\s*(?:않|못|없|아니|해소|완화|극복|불식)|\s+(?:not|no longer)\b")
+ENGLISH_NEGATION_PATTERN = re.compile(r"\b(?:not|no|never|without)\s+(?:\w+\s+)?$")
+
+DEFAULT_KEYWORD_COUNT = 5
+
+def strip_suffix(word):
+    """한글 단어 끝의 조사/어미를 떼어 낸 어근 (두 글자 이상 남을 때만)"""
+    for suffix in KOREAN_SUFFIXES:
+        if word.endswith(suffix) and len(word) - len(suffix) >= 2:
+            return word[:-len(suffix)]
+    return word
+
+def extract_terms(text):
+    """키워드 후보 (비교용 소문자 키, 표시용 원래 형태) 목록"""
+    terms = []
+    for word in WORD_PATTERN.findall(text or ''):
+        if '가' <= word[0] <= '힣':
+            word = strip_suffix(word)
+        key = word.lower()
+        if len(word) < 2 or key in STOPWORDS or key.replace('.', '').isdigit():
+            continue
+        terms.append((key, word))
+    return terms
+
+def extract_keywords(articles, top_k=DEFAULT_KEYWORD_COUNT):
+    """기사 묶음 전체를 말뭉치로 한 TF-IDF 상위 top_k개 키워드 (기사별 목록, 입력 순서)
+
+    제목에 나온 단어는 TITLE_WEIGHT배로 세고, 묶음의 거의 모든 기사에 나오는 단어는 IDF로 낮춘다.
+    """
+    if not articles:
+        return []
+    documents, display = [], {}
+    for article in articles:
+        terms = extract_terms(article.title) * TITLE_WEIGHT + extract_terms(article.description)
+        for key, word in terms:
+            display.setdefault(key, word)
+        documents.append([key for key, _ in terms])
+    vocabulary = {key: i for i, key in enumerate(display)}
+    if not vocabulary:
+        return [[] for _ in articles]
+
+    tf = term_matrix(documents, vocabulary)
+    document_frequency = (tf > 0).sum(axis=0)
+    idf = np.log((1 + len(articles)) / (1 + document_frequency)) + 1
+    weights = tf / np.maximum(tf.sum(axis=1, keepdims=True), 1) * idf
+    ranked = np.argsort(-weights, axis=1, kind='stable')[:, :top_k]
+
+    keys = list(vocabulary)
+    return [[display[keys[j]] for j in row if weights[i, j] > 0] for i, row in enumerate(ranked)]
+
+def korean_tail_allowed(tail):
+    """감정 어근 뒤에 붙은 글자가 조사/어미/파생 접미사뿐인지 ('최고경영자'의 '경영자' 같은 합성어는 거름)"""
+    if not tail or tail in KOREAN_SUFFIXES or tail.startswith(KOREAN_VERB_ENDINGS):
+        return True
+    for suffix in KOREAN_TERM_SUFFIXES:
+        if tail.startswith(suffix):
+            rest = tail[len(suffix):]
+            return not rest or rest in KOREAN_SUFFIXES
+    return False
+
+def find_sentiment_terms(text):
+    """글에 나온 감정 표현을 (긍정 표현 목록, 부정 표현 목록)으로 반환 (뒤따르는 부정·해소 표현 반영)"""
+    lowered = (text or '').lower()
+    positive, negative = [], []
+    for match in LEXICON_PATTERN.finditer(lowered):
+        if match.group('term'):
+            if not korean_tail_allowed(match.group('tail')):
+                continue
+            term, end = match.group('term'), match.end('term')
+        else:
+            term, end = match.group('word'), match.end()
+        polarity = LEXICON[term]
+        if NEGATION_PATTERN.match(lowered, end) or ENGLISH_NEGATION_PATTERN.search(lowered, 0, match.start()):
+            polarity = -polarity
+            term = f"{term}(반대 의미)"
+        (positive if polarity > 0 else negative).append(term)
+    return positive, negative
+
+def analyze_sentiments(articles):
+    """기사별 (긍정/부정/중립 레이블, 이유) 목록 (제목 표현은 TITLE_WEIGHT배로 반영)"""
+    found = [(find_sentiment_terms(article.title), find_sentiment_terms(article.description)) for article in articles]
+    counts = np.array([[len(title[0]) * TITLE_WEIGHT + len(body[0]), len(title[1]) * TITLE_WEIGHT + len(body[1])]
+                       for title, body in found], dtype=np.int64).reshape(-1, 2)
+    balance = counts[:, 0] - counts[:, 1]
+    labels = np.where(balance > 0, "긍정", np.where(balance < 0, "부정", "중립"))
+
+    results = []
+    for label, (title, body) in zip(labels.tolist(), found):
+        positive = list(dict.fromkeys(title[0] + body[0]))
+        negative = list(dict.fromkeys(title[1] + body[1]))
+        parts = []
+        if positive:
+            parts.append(f"긍정 표현: {', '.join(positive[:3])}")
+        if negative:
+            parts.append(f"부정 표현: {', '.join(negative[:3])}")
+        results.append((label, " / ".join(parts) or "뚜렷한 감정 표현이 없음"))
+    return results
+
+def analyze_locally(articles, include_sentiment=True, include_keywords=True, keyword_count=DEFAULT_KEYWORD_COUNT):
+    """기사 묶음의 감정/키워드를 AI 분석 결과와 같은 형식의 사전 목록으로 반환 (입력 순서)"""
+    results = [{} for _ in articles]
+    if include_sentiment:
+        for result, (label, reason) in zip(results, analyze_sentiments(articles)):
+            result["sentiment"] = f"{label} - {reason}"
+    if include_keywords:
+        for result, keywords in zip(results, extract_keywords(articles, keyword_count)):
+            result["keywords"] = ", ".join(keywords) if keywords else "키워드 없음"
+    return results
@@ -0,0 +1,180 @@
+# metrics.py
+"""검색, AI 호출, 응답 파싱, 화면 표시 등 단계별 소요 시간 기록과 내보내기 (구조화 로그, Prometheus 텍스트)
+
+단계 이름과 레이블(공급자 등)별로 최근 소요 시간을 모아 p50/p95/p99를 계산하고,
+토큰 사용량·캐시 적중·재시도 통계와 함께 Prometheus 텍스트 형식으로 내보낸다.
+"""
+import json
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+METRIC_PREFIX = "news_agent"
+DEFAULT_MAX_SAMPLES = 2000  # 단계·레이블 조합별로 백분위수 계산에 쓰는 최근 기록 수
+DEFAULT_MAX_EVENTS = 1000  # 화면과 내려받기용으로 보관하는 최근 기록 수
+QUANTILES = (0.5, 0.95, 0.99)
+
+def percentile(values, pct):
+    """선형 보간 백분위수 (값이 없으면 0)"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    position = (len(ordered) - 1) * pct / 100
+    lower = int(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+class StageMetrics:
+    """여러 스레드가 함께 쓰는 단계별 소요 시간 기록
+
+    log_path를 주면 기록 한 건마다 JSON 한 줄을 덧붙인다(구조화 로그).
+    """
+
+    def __init__(self, max_samples=DEFAULT_MAX_SAMPLES, max_events=DEFAULT_MAX_EVENTS, log_path=None):
+        self.max_samples = max_samples
+        self._series = {}  # (단계, 레이블 튜플) -> {"labels", "durations": deque, "count", "errors", "total"}
+        self._events = deque(maxlen=max_events)
+        self._lock = threading.Lock()
+        self._log = open(log_path, 'a', encoding='utf-8') if log_path else None
+
+    @contextmanager
+    def span(self, stage, **labels):
+        """with 블록의 소요 시간을 단계 기록으로 남김 (예외가 나면 오류로 세고 다시 발생)"""
+        started_at = time.perf_counter()
+        try:
+            yield
+        except BaseException as e:
+            self.record(stage, time.perf_counter() - started_at, error=type(e).__name__, **labels)
+            raise
+        self.record(stage, time.perf_counter() - started_at, **labels)
+
+    def record(self, stage, duration, error=None, **labels):
+        """단계 한 건의 소요 시간(초) 기록 (레이블 값이 None이면 생략)"""
+        labels = {key: str(value) for key, value in labels.items() if value is not None}
+        event = {"time": time.time(), "stage": stage, "duration": duration, **labels}
+        if error:
+            event["error"] = error
+        key = (stage, tuple(sorted(labels.items())))
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = {"labels": labels, "durations": deque(maxlen=self.max_samples),
+                                              "count": 0, "errors": 0, "total": 0.0}
+            series["durations"].append(duration)
+            series["count"] += 1
+            series["total"] += duration
+            if error:
+                series["errors"] += 1
+            self._events.append(event)
+            if self._log:
+                self._log.write(json.dumps(event, ensure_ascii=False) + "\n")
+                self._log.flush()
+
+    def summary(self):
+        """단계·레이블별 호출 수, 오류 수, 평균과 p50/p95/p99 소요 시간 (단계 이름순)"""
+        with self._lock:
+            snapshot = [(stage, dict(series["labels"]), list(series["durations"]), series["count"], series["errors"],
+                         series["total"]) for (stage, _), series in self._series.items()]
+        snapshot.sort(key=lambda row: (row[0], sorted(row[1].items())))
+        rows = []
+        for stage, labels, durations, count, errors, total in snapshot:
+            rows.append({
+                "stage": stage, "labels": labels, "count": count, "errors": errors,
+                "total": total, "avg": total / count if count else 0.0,
+                **{f"p{int(q * 100)}": percentile(durations, q * 100) for q in QUANTILES}
+            })
+        return rows
+
+    def events(self):
+        """최근 기록 (오래된 것부터)"""
+        with self._lock:
+            return list(self._events)
+
+    def events_jsonl(self):
+        """최근 기록을 JSON Lines 문자열로 반환 (내려받기용)"""
+        return "".join(json.dumps(event, ensure_ascii=False) + "\n" for event in self.events())
+
+    def clear(self):
+        """기록 삭제 (로그 파일은 그대로 둠)"""
+        with self._lock:
+            self._series.clear()
+            self._events.clear()
+
+    def close(self):
+        """구조화 로그 파일 닫기"""
+        with self._lock:
+            if self._log:
+                self._log.close()
+                self._log = None
+
+def stage_name(row):
+    """summary() 한 행의 표시용 이름 (예: 'llm openai/single')"""
+    return " ".join([row["stage"], "/".join(row["labels"].values())]).strip()
+
+def format_labels(labels):
+    """Prometheus 레이블 표기 ({key="value",...}, 레이블이 없으면 빈 문자열)"""
+    if not labels:
+        return ""
+    pairs = []
+    for key, value in labels.items():
+        value = str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        pairs.append(f'{key}="{value}"')
+    return "{" + ",".join(pairs) + "}"
+
+def prometheus_text(stage_metrics, token_usage=None, search_cache=None, analysis_cache=None, resilience=None,
+                    single_flight=None):
+    """단계별 소요 시간, 토큰 사용량, 캐시 적중, 공급자별 재시도, 세션 간 작업 공유 통계를 Prometheus 텍스트 형식으로 변환"""
+    lines = []
+
+    def metric(name, kind, help_text, samples):
+        lines.append(f"# HELP {METRIC_PREFIX}_{name} {help_text}")
+        lines.append(f"# TYPE {METRIC_PREFIX}_{name} {kind}")
+        for suffix, labels, value in samples:
+            lines.append(f"{METRIC_PREFIX}_{name}{suffix}{format_labels(labels)} {value:g}")
+
+    rows = stage_metrics.summary()
+    samples = []
+    for row in rows:
+        labels = {"stage": row["stage"], **row["labels"]}
+        for q in QUANTILES:
+            samples.append(("", {**labels, "quantile": f"{q:g}"}, row[f"p{int(q * 100)}"]))
+        samples.append(("_sum", labels, row["total"]))
+        samples.append(("_count", labels, row["count"]))
+    metric("stage_duration_seconds", "summary", "Time spent per pipeline stage", samples)
+    metric("stage_errors_total", "counter", "Failed pipeline stage executions",
+           [("", {"stage": row["stage"], **row["labels"]}, row["errors"]) for row in rows])
+
+    if token_usage is not None:
+        summary = token_usage.summary()
+        metric("llm_tokens_total", "counter", "Tokens used by AI calls",
+               [("", {"type": kind}, summary[f"{kind}_tokens"]) for kind in ("input", "output", "cached")])
+        metric("llm_calls_total", "counter", "AI calls with recorded usage", [("", {}, summary["calls"])])
+        metric("llm_cost_usd_total", "counter", "Estimated AI cost in USD", [("", {}, summary["cost"])])
+
+    caches = [("search", search_cache), ("analysis", analysis_cache)]
+    cache_samples = []
+    for name, cache in caches:
+        if cache is not None:
+            stats = cache.stats()
+            cache_samples.append(("", {"cache": name, "result": "hit"}, stats["hits"]))
+            cache_samples.append(("", {"cache": name, "result": "miss"}, stats["misses"]))
+            if "stale_hits" in stats:
+                cache_samples.append(("", {"cache": name, "result": "stale"}, stats["stale_hits"]))
+    if cache_samples:
+        metric("cache_requests_total", "counter", "Cache lookups by result", cache_samples)
+
+    if resilience is not None:
+        statuses = resilience.status()
+        for key, help_text in (("calls", "Outbound API calls"), ("retries", "Retried API calls"),
+                               ("throttled", "Throttled (429) API responses"), ("failures", "Failed API calls"),
+                               ("rejected", "Calls rejected by an open circuit or quota")):
+            metric(f"api_{key}_total", "counter", help_text,
+                   [("", {"provider": status["provider"]}, status[key]) for status in statuses])
+
+    if single_flight is not None:
+        stats = single_flight.stats()
+        metric("shared_requests_total", "counter", "Search and analysis requests by how they were served across sessions",
+               [("", {"result": result}, stats[result]) for result in ("executed", "joined", "remote")])
+
+    return "\n".join(lines) + "\n"
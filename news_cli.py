@@ -0,0 +1,205 @@
+# news_cli.py
+"""키워드 파일을 받아 뉴스 검색과 AI 분석을 일괄 실행하고 결과를 JSONL로 내보내는 CLI
+
+사용 예:
+    python news_cli.py keywords.txt -o results.jsonl --source all --model openai
+
+API 키는 환경 변수(NAVER_CLIENT_ID, NAVER_CLIENT_SECRET, NEWSAPI_KEY,
+OPENAI_API_KEY, ANTHROPIC_API_KEY)에서 읽는다.
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from clustering import DEFAULT_CLUSTER_THRESHOLD
+from metrics import StageMetrics, prometheus_text, stage_name
+from news_pipeline import DEFAULT_DIGEST_MAX_CLUSTERS, NewsPipeline, PipelineConfig, SUMMARY_LENGTH_GUIDES
+from relevance import TRIAGE_METHODS
+from shared_cache import SHARED_DB_ENV, SingleFlight, SQLiteBackend
+
+def read_keywords(path):
+    """키워드 파일 읽기 (한 줄에 하나, 빈 줄과 #으로 시작하는 줄은 무시, '-'는 표준 입력)"""
+    stream = sys.stdin if path == '-' else open(path, encoding='utf-8')
+    try:
+        keywords = []
+        for line in stream:
+            line = line.strip()
+            if line and not line.startswith('#') and line not in keywords:
+                keywords.append(line)
+        return keywords
+    finally:
+        if stream is not sys.stdin:
+            stream.close()
+
+def build_config(args):
+    """명령행 인자와 환경 변수로 파이프라인 설정 생성"""
+    return PipelineConfig(
+        news_source=args.source,
+        naver_client_id=os.environ.get('NAVER_CLIENT_ID', ''),
+        naver_client_secret=os.environ.get('NAVER_CLIENT_SECRET', ''),
+        newsapi_key=os.environ.get('NEWSAPI_KEY', ''),
+        newsapi_language=args.language,
+        model_provider=args.model,
+        openai_api_key=os.environ.get('OPENAI_API_KEY', ''),
+        anthropic_api_key=os.environ.get('ANTHROPIC_API_KEY', ''),
+        display_count=args.count,
+        sort='date' if args.timeline else args.sort,
+        unified_timeline=args.timeline,
+        summary_length=args.length,
+        include_sentiment=not args.no_sentiment,
+        include_keywords=not args.no_keywords,
+        local_sentiment_keywords=args.local_analysis,
+        max_concurrency=args.concurrency,
+        enable_batching=args.batch,
+        batch_token_budget=args.batch_token_budget,
+        max_description_tokens=args.max_description_tokens,
+        enable_triage=args.triage,
+        triage_method=args.triage_method,
+        triage_top_n=args.triage_top_n,
+        triage_min_score=args.triage_min_score,
+        fetch_full_text=args.full_text,
+        max_body_tokens=args.max_body_tokens,
+        digest_threshold=args.digest_threshold,
+        digest_max_clusters=args.digest_max_clusters,
+        digest_briefing=not args.no_briefing,
+        archive_results=not args.no_archive,
+        archive_first=args.archive_first,
+        archive_max_age_hours=args.archive_max_age_hours
+    )
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="뉴스 검색 및 AI 요약 일괄 실행 (결과는 JSONL로 스트리밍)")
+    parser.add_argument('keyword_file', help="키워드 파일 경로 (한 줄에 하나, '-'는 표준 입력)")
+    parser.add_argument('-o', '--output', default='-', help="결과 JSONL 파일 경로 (기본: 표준 출력)")
+    parser.add_argument('--source', choices=['naver', 'newsapi', 'all'], default='naver', help="뉴스 소스")
+    parser.add_argument('--model', choices=['openai', 'anthropic'], default='openai', help="AI 모델 공급자")
+    parser.add_argument('--count', type=int, default=5, help="키워드당 분석할 뉴스 개수")
+    parser.add_argument('--sort', choices=['sim', 'date'], default='sim', help="정렬 기준 (정확도순/최신순)")
+    parser.add_argument('--timeline', action='store_true',
+                        help="소스별 최신순 결과를 게시 시각으로 합쳐 최신 기사부터 받는 대로 분석 (--sort date로 동작)")
+    parser.add_argument('--language', default='ko', help="NewsAPI 언어")
+    parser.add_argument('--length', choices=list(SUMMARY_LENGTH_GUIDES), default='보통', help="요약 길이")
+    parser.add_argument('--no-sentiment', action='store_true', help="감정 분석 제외")
+    parser.add_argument('--no-keywords', action='store_true', help="키워드 추출 제외")
+    parser.add_argument('--local-analysis', action='store_true',
+                        help="감정/키워드를 로컬 엔진(감정 사전, TF-IDF)으로 계산하고 AI는 요약만 생성")
+    parser.add_argument('--concurrency', type=int, default=4, help="키워드당 동시 분석 요청 수")
+    parser.add_argument('--keyword-concurrency', type=int, default=2, help="동시에 처리할 키워드 수")
+    parser.add_argument('--batch', action='store_true', help="여러 기사를 한 요청으로 묶어서 분석")
+    parser.add_argument('--batch-token-budget', type=int, default=4000, help="묶음당 토큰 예산")
+    parser.add_argument('--triage', action='store_true', help="검색어 관련도가 낮은 기사는 요약하지 않음")
+    parser.add_argument('--triage-method', choices=list(TRIAGE_METHODS), default='bm25', help="관련도 계산 방식")
+    parser.add_argument('--triage-top-n', type=int, default=0, help="관련도 상위 몇 개만 요약할지 (0이면 제한 없음)")
+    parser.add_argument('--triage-min-score', type=float, default=0.2, help="요약할 최소 관련도 (0~1)")
+    parser.add_argument('--llm-rpm', type=int, help="AI 모델 분당 최대 요청 수 (기본: 공급자별 기본값)")
+    parser.add_argument('--max-description-tokens', type=int, default=300, help="프롬프트에 넣는 기사 내용의 최대 토큰 수")
+    parser.add_argument('--full-text', action='store_true', help="기사 주소에서 원문 본문을 가져와 분석")
+    parser.add_argument('--max-body-tokens', type=int, default=1500, help="프롬프트에 넣는 원문 본문의 최대 토큰 수")
+    parser.add_argument('--digest', action='store_true',
+                        help="기사마다 요약하는 대신 비슷한 기사를 주제별로 묶어 요약 (키워드당 JSON 한 줄)")
+    parser.add_argument('--digest-threshold', type=float, default=DEFAULT_CLUSTER_THRESHOLD,
+                        help="같은 주제로 묶을 최소 유사도 (0~1)")
+    parser.add_argument('--digest-max-clusters', type=int, default=DEFAULT_DIGEST_MAX_CLUSTERS, help="요약할 최대 주제 수")
+    parser.add_argument('--no-briefing', action='store_true', help="주제별 요약을 모은 전체 브리핑 생략")
+    parser.add_argument('--archive-first', action='store_true',
+                        help="로컬 아카이브에서 먼저 찾고, 맞는 기사가 없는 키워드만 API로 검색")
+    parser.add_argument('--archive-max-age-hours', type=int, default=0,
+                        help="아카이브에서 찾을 기사의 최대 게시 경과 시간 (0이면 제한 없음)")
+    parser.add_argument('--no-archive', action='store_true', help="검색한 기사와 분석 결과를 로컬 아카이브에 저장하지 않음")
+    parser.add_argument('--shared-db', default=os.environ.get(SHARED_DB_ENV),
+                        help=f"같은 검색·분석을 다른 프로세스(앱 등)와 한 번만 수행하도록 함께 쓸 SQLite 파일 (기본: ${SHARED_DB_ENV})")
+    parser.add_argument('--metrics-log', help="단계별 소요 시간을 JSON Lines로 덧붙일 파일 경로")
+    parser.add_argument('--prometheus', help="실행이 끝난 뒤 지표를 Prometheus 텍스트 형식으로 저장할 경로")
+    parser.add_argument('--stages', action='store_true', help="단계별 소요 시간(p50/p95)을 표준 오류로 출력")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    config = build_config(args)
+    config_errors = config.validate()
+    if config_errors:
+        for message in config_errors:
+            print(f"설정 오류: {message}", file=sys.stderr)
+        return 2
+
+    keywords = read_keywords(args.keyword_file)
+    pipeline = NewsPipeline(config, metrics=StageMetrics(log_path=args.metrics_log),
+                            shared=SingleFlight(SQLiteBackend(args.shared_db) if args.shared_db else None))
+    if args.llm_rpm:
+        pipeline.resilience.guard(config.model_provider).configure(requests_per_minute=args.llm_rpm)
+    output = sys.stdout if args.output == '-' else open(args.output, 'w', encoding='utf-8')
+    write_lock = threading.Lock()
+    totals = {"articles": 0, "failed": 0, "skipped": 0}
+    started_at = time.time()
+
+    def write_record(record):
+        # 분석이 끝나는 대로 한 줄씩 기록하고 바로 flush
+        with write_lock:
+            output.write(json.dumps(record, ensure_ascii=False) + "\n")
+            output.flush()
+            totals["articles"] += 1
+            if record["analysis"] is None:
+                totals["skipped"] += 1
+            elif record["analysis"].get('error'):
+                totals["failed"] += 1
+
+    def run_digest(keyword):
+        result = pipeline.digest_keyword(keyword)
+        articles = [{"rank": i + 1, **news.to_dict()} for i, news in enumerate(result["articles"])]
+        topics = [{**{key: value for key, value in topic.items() if key != "articles"},
+                   "articles": [articles[i] for i in topic["articles"]]} for topic in result["topics"]]
+        with write_lock:
+            output.write(json.dumps({"keyword": keyword, "briefing": result["briefing"], "topics": topics,
+                                     "other": [articles[i] for i in result["other"]]}, ensure_ascii=False) + "\n")
+            output.flush()
+            totals["articles"] += len(articles)
+            totals["failed"] += sum(len(topic["articles"]) for topic in topics if topic.get('error'))
+        for message in result["errors"]:
+            print(f"[{keyword}] {message}", file=sys.stderr)
+
+    def run_keyword(keyword):
+        def on_result(rank, item):
+            write_record({"keyword": keyword, "rank": rank + 1,
+                          "original": item["original"].to_dict(), "analysis": item["analysis"],
+                          "relevance": item["relevance"]})
+
+        result = pipeline.process_keyword(keyword, on_result=on_result)
+        for message in result["errors"]:
+            print(f"[{keyword}] {message}", file=sys.stderr)
+
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, args.keyword_concurrency)) as executor:
+            run = run_digest if args.digest else run_keyword
+            for future in [executor.submit(run, keyword) for keyword in keywords]:
+                future.result()
+    finally:
+        if output is not sys.stdout:
+            output.close()
+        pipeline.metrics.close()
+
+    elapsed = time.time() - started_at
+    print(f"키워드 {len(keywords)}개, 기사 {totals['articles']}개 처리 완료 "
+          f"(실패 {totals['failed']}개, 관련도 낮아 생략 {totals['skipped']}개, {elapsed:.1f}초)", file=sys.stderr)
+    usage = pipeline.token_usage.summary()
+    print(f"AI 호출 {usage['calls']}회, 입력 {usage['input_tokens']} / 출력 {usage['output_tokens']} 토큰 "
+          f"예상 비용 ${usage['cost']:.4f}", file=sys.stderr)
+    for guard in pipeline.resilience.status():
+        if guard["throttled"] or guard["retries"] or guard["rejected"]:
+            print(f"{guard['provider']}: 429 {guard['throttled']}회, 재시도 {guard['retries']}회, "
+                  f"차단 {guard['rejected']}회", file=sys.stderr)
+    if args.stages:
+        for row in pipeline.metrics.summary():
+            print(f"{stage_name(row)}: {row['count']}회 (오류 {row['errors']}회), "
+                  f"p50 {row['p50']:.3f}초 / p95 {row['p95']:.3f}초", file=sys.stderr)
+    if args.prometheus:
+        with open(args.prometheus, 'w', encoding='utf-8') as f:
+            f.write(prometheus_text(pipeline.metrics, pipeline.token_usage, pipeline.search_cache,
+                                    pipeline.analysis_cache, pipeline.resilience, pipeline.shared))
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
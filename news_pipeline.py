@@ -0,0 +1,1441 @@
+# news_pipeline.py
+"""뉴스 검색 → 표준화 → AI 분석 파이프라인 (Streamlit 없이 가져다 쓸 수 있는 모듈)"""
+import json
+import os
+import queue
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from functools import partial
+from itertools import islice
+
+from analysis_cache import AnalysisCache, make_analysis_key
+from archive import DEFAULT_ARCHIVE_DB_PATH, ArticleArchive
+from article_fetcher import DEFAULT_BODY_DB_PATH, ArticleFetcher, BodyStore
+from articles import Article, article_from_dict, article_from_naver, article_from_newsapi
+from client_pool import ClientRegistry
+from clustering import DEFAULT_CLUSTER_THRESHOLD, cluster_articles
+from dedup import deduplicate_articles, interleave, iter_unique_articles, merge_newest_first
+from local_analysis import analyze_locally
+from metrics import StageMetrics
+from relevance import score_articles, select_relevant, tokenize
+from resilience import CircuitOpenError, QuotaExceededError, ResilienceRegistry, parse_retry_after
+from search_cache import SearchCache
+from shared_cache import SingleFlight
+from token_usage import TokenUsageLog, usage_from_anthropic, usage_from_openai
+
+# 분석 결과 캐시 기본 설정 (앱과 CLI가 같은 파일을 공유)
+DEFAULT_ANALYSIS_CACHE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "analysis_cache.sqlite3")
+ANALYSIS_CACHE_TTL_SECONDS = 7 * 24 * 3600  # 7일
+ANALYSIS_CACHE_MAX_ENTRIES = 5000
+
+# AI 모델 공급자별 모델 이름
+AI_MODELS = {
+    "openai": "gpt-4o-mini",
+    "anthropic": "claude-3-haiku-20240307"
+}
+
+ANALYSIS_FAILED_SUMMARY = "분석을 생성할 수 없습니다."
+
+# 프롬프트에 넣는 기사 제목/내용의 최대 토큰 수 (내용 한도는 PipelineConfig에서 조정)
+MAX_TITLE_TOKENS = 80
+DEFAULT_DESCRIPTION_TOKENS = 300
+DEFAULT_BODY_TOKENS = 1500  # 원문 본문으로 분석할 때의 한도
+
+# 네이버 뉴스 검색 API 한도 (요청당 최대 100개, start는 1~1000)
+NAVER_PAGE_SIZE = 100
+NAVER_MAX_START = 1000
+# NewsAPI everything 한도 (요청당 최대 100개, 넘으면 요청 전체를 거부)
+NEWSAPI_MAX_PAGE_SIZE = 100
+
+# 주제별 묶음 요약에서 요약할 최대 군집 수 (나머지 군집의 기사는 '기타'로 모음)
+DEFAULT_DIGEST_MAX_CLUSTERS = 8
+
+@dataclass
+class PipelineConfig:
+    """검색과 분석에 필요한 모든 설정 (API 키 포함)"""
+    news_source: str = "naver"  # naver | newsapi | all
+    naver_client_id: str = ""
+    naver_client_secret: str = ""
+    newsapi_key: str = ""
+    newsapi_language: str = "ko"
+    model_provider: str = "openai"  # openai | anthropic
+    openai_api_key: str = ""
+    anthropic_api_key: str = ""
+    display_count: int = 5
+    sort: str = "sim"  # sim | date
+    unified_timeline: bool = False  # 최신순일 때 소스별 결과를 게시 시각으로 합친 하나의 타임라인으로 받으며 분석
+    summary_length: str = "보통"
+    include_sentiment: bool = True
+    include_keywords: bool = True
+    local_sentiment_keywords: bool = False  # 감정/키워드는 로컬 엔진으로 계산하고 AI는 요약만 생성
+    max_concurrency: int = 4
+    enable_batching: bool = False
+    batch_token_budget: int = 4000
+    search_cache_ttl: int = 300
+    serve_stale_search: bool = False
+    max_description_tokens: int = DEFAULT_DESCRIPTION_TOKENS  # 프롬프트에 넣는 기사 내용의 토큰 한도
+    anthropic_prompt_cache: bool = True  # Anthropic 시스템 프롬프트에 cache_control 표시
+    # 검색 결과의 짧은 설명 대신 기사 주소에서 가져온 원문 본문으로 분석
+    fetch_full_text: bool = False
+    max_body_tokens: int = DEFAULT_BODY_TOKENS  # 프롬프트에 넣는 원문 본문의 토큰 한도
+    # 분석 전 로컬 관련도 선별 (검색어 관련도가 낮은 기사는 요약하지 않음)
+    enable_triage: bool = False
+    triage_method: str = "bm25"  # bm25 | tfidf
+    triage_top_n: int = 0  # 관련도 상위 몇 개만 분석할지 (0이면 제한 없음)
+    triage_min_score: float = 0.2  # 분석할 최소 관련도 (0~1)
+    # 주제별 묶음 요약 (기사마다 분석하는 대신 비슷한 기사를 묶어 군집마다 한 번 요약)
+    digest_threshold: float = DEFAULT_CLUSTER_THRESHOLD  # 같은 주제로 묶을 최소 유사도 (0~1)
+    digest_max_clusters: int = DEFAULT_DIGEST_MAX_CLUSTERS  # 요약할 최대 군집 수
+    digest_briefing: bool = True  # 군집 요약을 모아 전체 브리핑 한 번 더 생성
+    # 로컬 아카이브 (검색·분석한 기사를 계속 쌓아 두고 API 호출 없이 다시 찾음)
+    archive_results: bool = True  # 검색된 기사와 분석 결과를 아카이브에 저장
+    archive_first: bool = False  # 검색할 때 아카이브에서 먼저 찾고, 맞는 기사가 없을 때만 API 호출
+    archive_max_age_hours: int = 0  # 아카이브에서 찾을 기사의 최대 게시 경과 시간 (0이면 제한 없음)
+    # API 주소 (벤치마크용 로컬 대역 서버 등으로 바꿀 때 사용, None이면 SDK 기본값)
+    naver_api_url: str = "https://openapi.naver.com"
+    newsapi_url: str = "https://newsapi.org"
+    openai_base_url: str = None
+    anthropic_base_url: str = None
+
+    @property
+    def ai_model(self):
+        return AI_MODELS[self.model_provider]
+
+    @property
+    def llm_sentiment(self):
+        """AI 모델에 감정 분석을 요청할지 여부"""
+        return self.include_sentiment and not self.local_sentiment_keywords
+
+    @property
+    def llm_keywords(self):
+        """AI 모델에 키워드 추출을 요청할지 여부"""
+        return self.include_keywords and not self.local_sentiment_keywords
+
+    @property
+    def content_token_limit(self):
+        """프롬프트에 넣는 기사 내용의 토큰 한도 (원문 분석이면 본문 한도)"""
+        return self.max_body_tokens if self.fetch_full_text else self.max_description_tokens
+
+    @property
+    def use_naver(self):
+        return self.news_source in ("naver", "all")
+
+    @property
+    def use_newsapi(self):
+        return self.news_source in ("newsapi", "all")
+
+    @property
+    def use_timeline(self):
+        return self.unified_timeline and self.sort == "date"
+
+    def validate(self):
+        """누락된 API 키 등 설정 오류 메시지 목록 반환 (문제가 없으면 빈 목록)"""
+        errors = []
+        if self.model_provider == "openai" and not self.openai_api_key:
+            errors.append("OpenAI API 키가 필요합니다.")
+        elif self.model_provider == "anthropic" and not self.anthropic_api_key:
+            errors.append("Anthropic API 키가 필요합니다.")
+        if self.use_naver and not (self.naver_client_id and self.naver_client_secret):
+            errors.append("네이버 API 설정(Client ID와 Secret)이 필요합니다.")
+        if self.use_newsapi and not self.newsapi_key:
+            errors.append("NewsAPI 키가 필요합니다.")
+        return errors
+
+class NewsAPIRequestError(Exception):
+    """뉴스 API가 200 이외의 응답을 반환했을 때 발생하는 예외 (재시도 판단용 상태 코드와 Retry-After 포함)"""
+
+    def __init__(self, message, status_code=None, retry_after=None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+def describe_search_error(api_name, error):
+    """검색 오류를 사용자에게 보여줄 메시지로 변환"""
+    if isinstance(error, (NewsAPIRequestError, CircuitOpenError, QuotaExceededError)):
+        return str(error)
+    return f"{api_name} 요청 중 오류 발생: {str(error)}"
+
+# 요약 길이별 지침 (단일 요약 프롬프트와 통합 분석 프롬프트가 함께 사용)
+SUMMARY_LENGTH_GUIDES = {
+    "짧게": "1-2문장으로 핵심만 간단히 요약해주세요.",
+    "보통": "3-4문장으로 요약해주세요. 핵심 정보만 간결하게 포함하세요.",
+    "자세히": "5-6문장으로 자세히 요약해주세요. 배경 정보와 세부 내용을 포함하세요.",
+}
+
+SENTIMENT_LABELS = ["긍정", "부정", "중립"]
+
+ANALYSIS_SYSTEM_PROMPT = "당신은 뉴스 분석 전문가입니다. 요약, 감정 분석, 키워드 추출을 정확하게 수행하고 JSON 객체 하나로만 답해주세요."
+
+class AnalysisParseError(ValueError):
+    """AI 응답이 분석 스키마와 맞지 않을 때 발생하는 예외"""
+
+def compact_text(text):
+    """연속된 공백과 줄바꿈을 공백 하나로 줄임"""
+    return ' '.join((text or '').split())
+
+def truncate_to_tokens(text, max_tokens):
+    """추정 토큰 수가 max_tokens를 넘지 않도록 뒤를 잘라냄 (잘렸으면 '…' 추가)"""
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    used = 1
+    for end, char in enumerate(text):
+        used += 1 if ord(char) >= 128 else 0.25
+        if used > max_tokens:
+            return text[:end].rstrip() + "…"
+    return text
+
+def prepare_article_text(news, max_description_tokens=DEFAULT_DESCRIPTION_TOKENS, use_body=False):
+    """프롬프트용 (제목, 내용) 공백 정리 및 토큰 한도 적용 (use_body이고 본문이 있으면 설명 대신 본문 사용)"""
+    content = news.body if use_body and news.body else news.description
+    return (truncate_to_tokens(compact_text(news.title), MAX_TITLE_TOKENS),
+            truncate_to_tokens(compact_text(content), max_description_tokens))
+
+def build_analysis_schema(include_sentiment=False, include_keywords=False):
+    """분석 옵션에 맞는 JSON 스키마 생성"""
+    properties = {"summary": {"type": "string"}}
+    if include_sentiment:
+        properties["sentiment"] = {
+            "type": "object",
+            "properties": {
+                "label": {"type": "string", "enum": SENTIMENT_LABELS},
+                "reason": {"type": "string"}
+            },
+            "required": ["label", "reason"],
+            "additionalProperties": False
+        }
+    if include_keywords:
+        properties["keywords"] = {"type": "array", "items": {"type": "string"}}
+
+    return {
+        "type": "object",
+        "properties": properties,
+        "required": list(properties),
+        "additionalProperties": False
+    }
+
+def get_analysis_fields(length, include_sentiment=False, include_keywords=False):
+    """분석 응답에 들어갈 필드 설명 목록 (요약 길이 지침 포함)"""
+    guide = SUMMARY_LENGTH_GUIDES.get(length, SUMMARY_LENGTH_GUIDES["자세히"])
+    fields = [f'- "summary": 기사를 {guide}']
+    if include_sentiment:
+        fields.append('- "sentiment": {"label": "긍정" | "부정" | "중립", "reason": 한 줄 이유}')
+    if include_keywords:
+        fields.append('- "keywords": 가장 중요한 키워드 5개 (문자열 배열)')
+    return fields
+
+def get_analysis_instructions(length, include_sentiment=False, include_keywords=False):
+    """기사와 관계없이 항상 같은 분석 지침 (시스템 프롬프트로 보내고 기사마다 달라지는 부분만 사용자 프롬프트로 보냄)"""
+    field_lines = "\n".join(get_analysis_fields(length, include_sentiment, include_keywords))
+    return (f"{ANALYSIS_SYSTEM_PROMPT}\n"
+            f"사용자가 보낸 뉴스 기사를 분석해서 아래 필드만 가진 JSON 객체로 답해주세요.\n"
+            f"필드:\n{field_lines}")
+
+def get_analysis_prompt(title, description):
+    """기사마다 달라지는 부분만 담은 사용자 프롬프트"""
+    return f"제목: {title}\n내용: {description}"
+
+def load_json_object(text):
+    """응답 텍스트에서 가장 바깥 JSON 객체를 꺼내 파싱 (코드 블록 등으로 감싼 경우 포함)"""
+    body = text.strip()
+    start, end = body.find("{"), body.rfind("}")
+    if start == -1 or end < start:
+        raise AnalysisParseError("응답에서 JSON 객체를 찾을 수 없습니다.")
+
+    try:
+        return json.loads(body[start:end + 1])
+    except json.JSONDecodeError as e:
+        raise AnalysisParseError(f"JSON 형식 오류: {e}")
+
+def parse_analysis_response(text, include_sentiment=False, include_keywords=False):
+    """AI의 JSON 응답을 스키마에 맞게 검증하고 화면 표시용 결과로 변환"""
+    return validate_analysis_data(load_json_object(text), include_sentiment, include_keywords)
+
+def validate_analysis_data(data, include_sentiment=False, include_keywords=False):
+    """파싱된 분석 객체를 스키마에 맞게 검증하고 화면 표시용 결과로 변환"""
+    expected = set(build_analysis_schema(include_sentiment, include_keywords)["properties"])
+    if not isinstance(data, dict) or set(data) != expected:
+        raise AnalysisParseError(f"응답 필드가 스키마와 다릅니다: {sorted(data) if isinstance(data, dict) else type(data).__name__}")
+
+    summary = data["summary"]
+    if not isinstance(summary, str) or not summary.strip():
+        raise AnalysisParseError("요약이 비어 있습니다.")
+    result = {"summary": summary.strip()}
+
+    if include_sentiment:
+        sentiment = data["sentiment"]
+        if (not isinstance(sentiment, dict) or sentiment.get("label") not in SENTIMENT_LABELS
+                or not isinstance(sentiment.get("reason"), str)):
+            raise AnalysisParseError(f"감정 분석 형식 오류: {sentiment}")
+        result["sentiment"] = f"{sentiment['label']} - {sentiment['reason'].strip()}"
+
+    if include_keywords:
+        keywords = data["keywords"]
+        if not isinstance(keywords, list) or not all(isinstance(kw, str) for kw in keywords):
+            raise AnalysisParseError(f"키워드 형식 오류: {keywords}")
+        keywords = [kw.strip() for kw in keywords if kw.strip()]
+        if not keywords:
+            raise AnalysisParseError("키워드가 비어 있습니다.")
+        result["keywords"] = ", ".join(keywords)
+
+    return result
+
+def build_batch_analysis_schema(include_sentiment=False, include_keywords=False):
+    """여러 기사를 한 번에 분석할 때의 JSON 스키마 (기사마다 id 포함)"""
+    item_schema = build_analysis_schema(include_sentiment, include_keywords)
+    item_schema["properties"] = {"id": {"type": "string"}, **item_schema["properties"]}
+    item_schema["required"] = list(item_schema["properties"])
+
+    return {
+        "type": "object",
+        "properties": {"articles": {"type": "array", "items": item_schema}},
+        "required": ["articles"],
+        "additionalProperties": False
+    }
+
+def get_batch_analysis_instructions(length, include_sentiment=False, include_keywords=False):
+    """묶음 분석의 고정 지침 (기사 목록과 분리해 시스템 프롬프트로 보냄)"""
+    fields = ['- "id": 기사 앞의 대괄호 안 ID를 그대로'] + get_analysis_fields(length, include_sentiment, include_keywords)
+    field_lines = "\n".join(fields)
+    return (f"{ANALYSIS_SYSTEM_PROMPT}\n"
+            f'사용자가 보낸 뉴스 기사들을 각각 분석해서 {{"articles": [...]}} 형태의 JSON 객체로 답해주세요.\n'
+            f"articles 배열에는 기사마다 아래 필드만 가진 객체를 하나씩 넣어주세요.\n"
+            f"필드:\n{field_lines}")
+
+def get_batch_analysis_prompt(batch):
+    """여러 기사를 ID와 함께 나열한 사용자 프롬프트 (batch: [(id, 제목, 내용)])"""
+    article_blocks = "\n\n".join(
+        f"[{article_id}]\n제목: {title}\n내용: {description}" for article_id, title, description in batch
+    )
+    return f"기사 {len(batch)}개:\n\n{article_blocks}"
+
+def build_anthropic_system(instructions, schema):
+    """Anthropic 시스템 프롬프트 블록 (지침과 스키마에 cache_control 표시)
+
+    공급자는 모델별 최소 길이(Haiku 2048토큰, 그 밖의 모델 1024토큰)보다 짧은 접두부를 캐시하지 않는다.
+    지금 지침과 스키마는 수백 토큰이라 캐시되지 않으며, 표시는 지침이 길어졌을 때를 위해 남겨 둔다.
+    """
+    return [{
+        "type": "text",
+        "text": f"{instructions}\n응답 JSON 스키마: {json.dumps(schema, ensure_ascii=False)}",
+        "cache_control": {"type": "ephemeral"}
+    }]
+
+def parse_batch_analysis_response(text, article_ids, include_sentiment=False, include_keywords=False):
+    """묶음 분석 응답을 기사 ID별 결과로 변환 (형식이 틀린 기사는 결과에서 빠짐)"""
+    data = load_json_object(text)
+    if not isinstance(data, dict) or not isinstance(data.get("articles"), list):
+        raise AnalysisParseError("묶음 응답에 articles 배열이 없습니다.")
+
+    results = {}
+    for item in data["articles"]:
+        if not isinstance(item, dict) or item.get("id") not in article_ids:
+            continue
+        article_id = item.pop("id")
+        try:
+            results[article_id] = validate_analysis_data(item, include_sentiment, include_keywords)
+        except AnalysisParseError:
+            continue
+    return results
+
+def extract_partial_summary(partial_json):
+    """스트리밍 중인 JSON 응답에서 지금까지 생성된 summary 문자열 추출"""
+    match = re.search(r'"summary"\s*:\s*"', partial_json)
+    if not match:
+        return ""
+
+    # 닫는 따옴표 전까지의 원문을 모으고 이스케이프 시퀀스는 JSON 규칙대로 해석
+    raw = []
+    i = match.end()
+    while i < len(partial_json):
+        char = partial_json[i]
+        if char == '"':
+            break
+        if char == '\\':
+            escape = partial_json[i:i + 6] if partial_json[i + 1:i + 2] == 'u' else partial_json[i:i + 2]
+            if len(escape) < (6 if escape[1:2] == 'u' else 2):
+                break  # 아직 덜 받은 이스케이프 시퀀스
+            raw.append(escape)
+            i += len(escape)
+            continue
+        raw.append(char)
+        i += 1
+
+    try:
+        return json.loads('"' + "".join(raw) + '"')
+    except json.JSONDecodeError:
+        return "".join(raw)
+
+# 묶음 분석 시 요약 길이별 예상 출력 토큰 수
+SUMMARY_OUTPUT_TOKENS = {"짧게": 80, "보통": 160, "자세히": 260}
+
+def estimate_tokens(text):
+    """토큰 수 대략 추정 (한글 등 비ASCII 문자는 글자당 1토큰, ASCII는 4글자당 1토큰)"""
+    ascii_count = sum(1 for char in text if ord(char) < 128)
+    return (len(text) - ascii_count) + ascii_count // 4 + 1
+
+def estimate_output_tokens(length, include_sentiment=False, include_keywords=False):
+    """기사 한 건의 분석 결과에 필요한 예상 출력 토큰 수"""
+    tokens = SUMMARY_OUTPUT_TOKENS.get(length, SUMMARY_OUTPUT_TOKENS["자세히"]) + 10
+    if include_sentiment:
+        tokens += 40
+    if include_keywords:
+        tokens += 30
+    return tokens
+
+def pack_news_batches(indexed_news, length, include_sentiment=False, include_keywords=False,
+                      token_budget=4000, max_batch_size=8, max_description_tokens=DEFAULT_DESCRIPTION_TOKENS,
+                      use_body=False):
+    """입력과 예상 출력 토큰의 합이 예산을 넘지 않도록 (인덱스, 뉴스) 목록을 묶음으로 나눔"""
+    output_tokens = estimate_output_tokens(length, include_sentiment, include_keywords)
+    base_tokens = estimate_tokens(get_batch_analysis_instructions(length, include_sentiment, include_keywords)
+                                  + get_batch_analysis_prompt([]))
+
+    batches = []
+    current, used = [], base_tokens
+    for index, news in indexed_news:
+        title, description = prepare_article_text(news, max_description_tokens, use_body)
+        cost = estimate_tokens(title + description) + output_tokens + 10
+        if current and (used + cost > token_budget or len(current) >= max_batch_size):
+            batches.append(current)
+            current, used = [], base_tokens
+        current.append((index, news))
+        used += cost
+    if current:
+        batches.append(current)
+    return batches
+
+def build_batch_items(news_batch, max_description_tokens=DEFAULT_DESCRIPTION_TOKENS, use_body=False):
+    """묶음 안에서의 위치로 기사 ID(A1, A2, ...)를 붙인 (ID, 제목, 내용) 목록 생성"""
+    return [(f"A{position + 1}", *prepare_article_text(news, max_description_tokens, use_body))
+            for position, news in enumerate(news_batch)]
+
+# 주제별 묶음 요약 (다이제스트): 군집마다 대표 기사로 한 번 요약(map)한 뒤 전체 브리핑 한 번(reduce)
+DIGEST_REPRESENTATIVES = 5  # 군집 요약 프롬프트에 넣는 대표 기사 수
+DIGEST_SNIPPET_TOKENS = 150  # 대표 기사 하나의 내용 토큰 한도
+BRIEFING_OUTPUT_TOKENS = 600
+
+def build_digest_schema(include_sentiment=False, include_keywords=False):
+    """군집 요약의 JSON 스키마 (기사 분석 스키마 앞에 주제 제목 headline 추가)"""
+    schema = build_analysis_schema(include_sentiment, include_keywords)
+    schema["properties"] = {"headline": {"type": "string"}, **schema["properties"]}
+    schema["required"] = list(schema["properties"])
+    return schema
+
+def get_digest_instructions(length, include_sentiment=False, include_keywords=False):
+    """군집 요약의 고정 지침 (군집마다 같으므로 시스템 프롬프트로 보냄)"""
+    fields = ['- "headline": 기사들이 함께 다루는 사건을 나타내는 한 줄 제목'] + get_analysis_fields(
+        length, include_sentiment, include_keywords)
+    field_lines = "\n".join(fields)
+    return (f"{ANALYSIS_SYSTEM_PROMPT}\n"
+            f"사용자가 보낸 기사들은 같은 사건을 다룬 기사 묶음의 대표 기사입니다. 개별 기사가 아니라 "
+            f"묶음 전체를 하나의 기사로 보고 분석해서 아래 필드만 가진 JSON 객체로 답해주세요.\n"
+            f"필드:\n{field_lines}")
+
+def get_digest_prompt(keyword, items, total):
+    """군집의 대표 기사를 나열한 사용자 프롬프트 (items: [(제목, 내용)], total: 군집의 전체 기사 수)"""
+    article_blocks = "\n\n".join(
+        f"[{position + 1}]\n제목: {title}\n내용: {description}" for position, (title, description) in enumerate(items)
+    )
+    return f"검색어: {keyword}\n같은 주제의 기사 {total}개 중 대표 기사 {len(items)}개:\n\n{article_blocks}"
+
+def parse_digest_response(text, include_sentiment=False, include_keywords=False):
+    """군집 요약 응답을 검증해 {"headline", "summary", ...} 표시용 결과로 변환"""
+    data = load_json_object(text)
+    headline = data.pop("headline", None) if isinstance(data, dict) else None
+    if not isinstance(headline, str) or not headline.strip():
+        raise AnalysisParseError("주제 제목이 비어 있습니다.")
+    return {"headline": headline.strip(), **validate_analysis_data(data, include_sentiment, include_keywords)}
+
+BRIEFING_SCHEMA = {
+    "type": "object",
+    "properties": {"briefing": {"type": "string"}},
+    "required": ["briefing"],
+    "additionalProperties": False
+}
+
+BRIEFING_INSTRUCTIONS = (f"{ANALYSIS_SYSTEM_PROMPT}\n"
+                         "사용자가 보낸 주제별 요약을 종합해서 검색어에 대한 전체 동향을 3-5문장으로 브리핑해주세요. "
+                         "기사가 많은 주제를 먼저 다루고, 주제 사이의 관계가 있으면 함께 설명하세요.\n"
+                         '필드:\n- "briefing": 전체 동향 브리핑')
+
+def get_briefing_prompt(keyword, topics):
+    """주제별 요약을 나열한 브리핑 사용자 프롬프트 (topics: [(제목, 기사 수, 요약)])"""
+    topic_blocks = "\n\n".join(
+        f"[{position + 1}] {headline} (기사 {count}개)\n{summary}"
+        for position, (headline, count, summary) in enumerate(topics)
+    )
+    return f"검색어: {keyword}\n주제 {len(topics)}개:\n\n{topic_blocks}"
+
+def parse_briefing_response(text):
+    """브리핑 응답에서 브리핑 문장 추출"""
+    data = load_json_object(text)
+    briefing = data.get("briefing") if isinstance(data, dict) else None
+    if not isinstance(briefing, str) or not briefing.strip():
+        raise AnalysisParseError("브리핑이 비어 있습니다.")
+    return briefing.strip()
+
+def analyze_news_concurrently(news_list, analyze_func, max_workers=4, on_progress=None, on_delta=None, on_result=None):
+    """스레드 풀로 여러 뉴스를 동시에 분석 (결과는 입력 순서 유지)
+
+    Streamlit 요소는 메인 스레드에서만 갱신할 수 있으므로 작업 스레드는 이벤트를
+    큐에 넣고, 콜백(on_progress, on_delta, on_result)은 모두 메인 스레드에서 호출한다.
+    """
+    results = [None] * len(news_list)
+    if not news_list:
+        return results
+
+    events = queue.Queue()
+
+    def run(i, news):
+        try:
+            if on_delta:
+                analysis = analyze_func(news, on_delta=lambda text: events.put(('delta', i, text)))
+            else:
+                analysis = analyze_func(news)
+        except Exception as e:
+            analysis = {"summary": ANALYSIS_FAILED_SUMMARY, "error": str(e)}
+        events.put(('done', i, analysis))
+
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(news_list)))) as executor:
+        for i, news in enumerate(news_list):
+            executor.submit(run, i, news)
+
+        completed = 0
+        while completed < len(news_list):
+            # 쌓인 이벤트를 한 번에 꺼내 기사별 최신 토큰만 화면에 반영
+            batch = [events.get()]
+            while not events.empty():
+                batch.append(events.get_nowait())
+
+            latest_deltas = {}
+            for kind, i, payload in batch:
+                if kind == 'delta':
+                    latest_deltas[i] = payload
+                    continue
+                latest_deltas.pop(i, None)
+                results[i] = payload
+                completed += 1
+                if on_result:
+                    on_result(i, payload)
+                if on_progress:
+                    on_progress(completed, len(news_list))
+
+            for i, text in latest_deltas.items():
+                if results[i] is None:
+                    on_delta(i, text)
+
+    return results
+
+def analyze_stream_concurrently(articles, analyze_func, max_workers=4, on_article=None, on_delta=None,
+                                on_result=None):
+    """기사 스트림을 받는 대로 스레드 풀로 분석하고 (받은 순서의 기사 목록, 분석 결과 목록) 반환
+
+    스트림은 별도 스레드에서 읽으므로 뒤쪽 기사(다음 페이지)를 가져오는 동안에도 먼저 받은 기사의
+    분석과 화면 갱신이 계속된다. 콜백(on_article(순번, 기사), on_delta, on_result)은 모두 메인 스레드에서
+    호출하며, 스트림을 읽다가 난 예외는 받은 기사의 분석이 모두 끝난 뒤 다시 발생시킨다.
+    """
+    news_list, results = [], []
+    events = queue.Queue()
+
+    def read():
+        try:
+            for news in articles:
+                events.put(('article', None, news))
+        except Exception as e:
+            events.put(('end', None, e))
+        else:
+            events.put(('end', None, None))
+
+    def run(i, news):
+        try:
+            if on_delta:
+                analysis = analyze_func(news, on_delta=lambda text: events.put(('delta', i, text)))
+            else:
+                analysis = analyze_func(news)
+        except Exception as e:
+            analysis = {"summary": ANALYSIS_FAILED_SUMMARY, "error": str(e)}
+        events.put(('done', i, analysis))
+
+    reading, completed, read_error = True, 0, None
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+        threading.Thread(target=read, daemon=True).start()
+        while reading or completed < len(news_list):
+            batch = [events.get()]
+            while not events.empty():
+                batch.append(events.get_nowait())
+
+            latest_deltas = {}
+            for kind, i, payload in batch:
+                if kind == 'article':
+                    i = len(news_list)
+                    news_list.append(payload)
+                    results.append(None)
+                    if on_article:
+                        on_article(i, payload)
+                    executor.submit(run, i, payload)
+                elif kind == 'delta':
+                    latest_deltas[i] = payload
+                elif kind == 'done':
+                    latest_deltas.pop(i, None)
+                    results[i] = payload
+                    completed += 1
+                    if on_result:
+                        on_result(i, payload)
+                else:
+                    reading, read_error = False, payload
+
+            for i, text in latest_deltas.items():
+                if results[i] is None:
+                    on_delta(i, text)
+
+    if read_error is not None:
+        raise read_error
+    return news_list, results
+
+class NewsPipeline:
+    """설정과 공유 자원(캐시, 클라이언트 풀)을 묶어 뉴스 검색과 분석을 수행하는 파이프라인
+
+    Streamlit 앱은 재실행마다 사이드바 값으로 새 설정을 만들고 공유 자원을 넘겨주며,
+    CLI는 기본 자원으로 생성해 사용한다. 모든 외부 API 호출은 resilience의 공급자별
+    요청 제한과 재시도를 거치고, 단계별 소요 시간은 metrics에 기록된다. 원문 분석을 켜면
+    fetcher가 기사 본문을 미리 가져오는 동안 AI 분석이 함께 진행된다. 검색과 기사별 분석은 shared를
+    거쳐, 여러 세션(과 프로세스)이 같은 작업을 동시에 요청하면 한 번만 수행하고 결과를 나눠 받는다.
+    검색된 기사와 분석 결과는 archive에 쌓여 나중에 API 호출 없이 다시 찾을 수 있다.
+    """
+
+    def __init__(self, config, analysis_cache=None, search_cache=None, client_registry=None, token_usage=None,
+                 resilience=None, metrics=None, fetcher=None, shared=None, archive=None):
+        self.config = config
+        self.analysis_cache = analysis_cache or AnalysisCache(
+            DEFAULT_ANALYSIS_CACHE_PATH, ANALYSIS_CACHE_TTL_SECONDS, ANALYSIS_CACHE_MAX_ENTRIES
+        )
+        self.search_cache = search_cache or SearchCache()
+        self.client_registry = client_registry or ClientRegistry()
+        self.token_usage = token_usage or TokenUsageLog()
+        self.resilience = resilience or ResilienceRegistry()
+        self.metrics = metrics or StageMetrics()
+        self.fetcher = fetcher or ArticleFetcher(BodyStore(DEFAULT_BODY_DB_PATH), self.client_registry,
+                                                 metrics=self.metrics)
+        self.shared = shared or SingleFlight()
+        self.archive = archive or ArticleArchive(DEFAULT_ARCHIVE_DB_PATH)
+
+    # 뉴스 검색
+
+    def fetch_naver_news(self, keyword, display=5, sort='sim', start=1):
+        """네이버 뉴스 API를 호출해 기사 레코드 목록 반환 (실패 시 예외 발생)"""
+        url = f"{self.config.naver_api_url}/v1/search/news"
+        params = {'query': keyword, 'display': display, 'sort': sort, 'start': start}
+        headers = {
+            "X-Naver-Client-Id": self.config.naver_client_id,
+            "X-Naver-Client-Secret": self.config.naver_client_secret
+        }
+
+        session = self.client_registry.get_session('naver')
+
+        def request():
+            response = session.get(url, params=params, headers=headers, timeout=self.client_registry.requests_timeout)
+            if response.status_code != 200:
+                raise NewsAPIRequestError(f"네이버 API 요청 실패: 응답 코드 {response.status_code}",
+                                          response.status_code, parse_retry_after(response.headers.get('Retry-After')))
+            return response
+
+        with self.metrics.span("fetch", provider="naver"):
+            response = self.resilience.call('naver', request)
+
+        # 네이버 API 결과를 기사 레코드로 정리 (태그/엔티티 제거, pubDate 파싱)
+        return [article_from_naver(item) for item in response.json().get('items', [])]
+
+    def fetch_newsapi(self, keyword, page_size=5, sort_by='relevancy', language='ko', from_time=None):
+        """NewsAPI를 호출해 기사 레코드 목록 반환 (from_time이 있으면 그 이후 기사만, 실패 시 예외 발생)
+
+        page_size가 NewsAPI 한도보다 크면 한도만큼만 요청한다.
+        """
+        url = f"{self.config.newsapi_url}/v2/everything"
+
+        params = {
+            'q': keyword,
+            'pageSize': min(page_size, NEWSAPI_MAX_PAGE_SIZE),
+            'sortBy': 'relevancy' if sort_by == 'sim' else 'publishedAt',
+            'language': language,
+            'apiKey': self.config.newsapi_key
+        }
+        if from_time is not None:
+            params['from'] = from_time.astimezone(timezone.utc).strftime('%Y-%m-%dT%H:%M:%S')
+
+        session = self.client_registry.get_session('newsapi')
+
+        def request():
+            response = session.get(url, params=params, timeout=self.client_registry.requests_timeout)
+            if response.status_code != 200:
+                raise NewsAPIRequestError(f"NewsAPI 요청 실패: {response.status_code} - {response.text}",
+                                          response.status_code, parse_retry_after(response.headers.get('Retry-After')))
+            return response
+
+        with self.metrics.span("fetch", provider="newsapi"):
+            response = self.resilience.call('newsapi', request)
+
+        # NewsAPI 결과를 기사 레코드로 정리 (태그/엔티티 제거, publishedAt 파싱)
+        return [article_from_newsapi(article) for article in response.json().get('articles', [])]
+
+    def share_search(self, cache_key, fetch):
+        """다른 세션·프로세스의 같은 검색과 합쳐 업스트림 API를 한 번만 호출 (결과는 검색 캐시 유지 시간만큼 공유)"""
+        return self.shared.run(
+            "search:" + json.dumps(cache_key, ensure_ascii=False), fetch,
+            encode=lambda articles: [article.to_dict() for article in articles],
+            decode=lambda items: [article_from_dict(item) for item in items],
+            ttl=self.config.search_cache_ttl
+        )
+
+    def search_naver_news(self, keyword, display=5, sort='sim', start=1):
+        """캐시를 거쳐 네이버 뉴스 검색 (실패 시 예외 발생)"""
+        cache_key = ('naver', keyword.strip(), sort, display, start)
+        fetch = partial(self.fetch_naver_news, keyword, display, sort, start)
+        return self.search_cache.get_or_fetch(
+            cache_key, partial(self.share_search, cache_key, fetch),
+            ttl_seconds=self.config.search_cache_ttl, serve_stale=self.config.serve_stale_search
+        )
+
+    def iter_naver_pages(self, keyword, max_items, sort='sim'):
+        """네이버 뉴스를 start 오프셋으로 페이지(최대 100개)씩 가져오는 제너레이터
+
+        페이지를 받는 대로 표준 형태의 뉴스 목록을 내보내며, 결과가 페이지 크기보다
+        적게 오거나 API의 start 한도(1000)에 닿으면 멈춘다. (실패 시 예외 발생)
+        """
+        start = 1
+        while start <= NAVER_MAX_START and start <= max_items:
+            display = min(NAVER_PAGE_SIZE, max_items - start + 1)
+            page = self.search_naver_news(keyword, display, sort, start)
+            if page:
+                self.archive_articles(page)
+                yield page
+            if len(page) < display:
+                return
+            start += display
+
+    def collect_naver_news(self, keyword, max_items, sort='sim'):
+        """필요한 만큼 페이지를 이어 받아 최대 max_items개의 네이버 뉴스 반환"""
+        articles = []
+        for page in self.iter_naver_pages(keyword, max_items, sort):
+            articles.extend(page)
+        return articles
+
+    def search_newsapi(self, keyword, page_size=5, sort_by='relevancy', language='ko'):
+        """캐시를 거쳐 NewsAPI 검색 (실패 시 예외 발생)"""
+        cache_key = ('newsapi', keyword.strip(), sort_by, page_size, language)
+        fetch = partial(self.fetch_newsapi, keyword, page_size, sort_by, language)
+        return self.search_cache.get_or_fetch(
+            cache_key, partial(self.share_search, cache_key, fetch),
+            ttl_seconds=self.config.search_cache_ttl, serve_stale=self.config.serve_stale_search
+        )
+
+    def search(self, keyword):
+        """설정된 뉴스 소스로 검색 (두 소스를 모두 쓰면 동시에 검색 후 중복 제거)
+
+        (기사 목록, 제외된 중복 기사 수, 오류 메시지 목록)을 반환한다. use_timeline이면 iter_timeline의
+        최신순 통합 결과를 모두 받아 반환한다(중복 기사 수는 세지 않음).
+        """
+        config = self.config
+        if config.use_timeline:
+            errors = []
+            return list(self.iter_timeline(keyword, errors)), 0, errors
+        searches = []
+        if config.use_naver:
+            searches.append(("네이버 API", partial(self.collect_naver_news, keyword, config.display_count, config.sort)))
+        if config.use_newsapi:
+            searches.append(("NewsAPI", partial(self.search_newsapi, keyword, config.display_count,
+                                                config.sort, config.newsapi_language)))
+
+        with self.metrics.span("search", source=config.news_source), \
+                ThreadPoolExecutor(max_workers=len(searches)) as executor:
+            futures = [(api_name, executor.submit(search)) for api_name, search in searches]
+
+        source_results = []
+        errors = []
+        for api_name, future in futures:
+            try:
+                source_results.append(future.result())
+            except Exception as e:
+                errors.append(describe_search_error(api_name, e))
+
+        if len(searches) == 1:
+            articles, removed_count = (source_results[0] if source_results else []), 0
+        else:
+            # 소스를 번갈아 합친 뒤 분석 전에 중복을 제거하고 요청한 개수만 남김
+            with self.metrics.span("dedup"):
+                unique_articles, removed_count = deduplicate_articles(interleave(*source_results))
+            articles = unique_articles[:config.display_count]
+        if len(searches) > 1 or not config.use_naver:
+            self.archive_articles(articles)  # 네이버만 쓰면 iter_naver_pages에서 페이지마다 이미 저장
+        return articles, removed_count, errors
+
+    def iter_timeline(self, keyword, errors):
+        """설정된 소스를 모두 최신순으로 검색해 게시 시각 기준으로 합친 뒤 최신 기사부터 내보내는 제너레이터
+
+        소스마다 첫 페이지는 동시에 요청하고, 네이버의 다음 페이지는 그보다 새로운 기사를 모두 내보낸 뒤에야
+        요청한다. 중복 기사는 건너뛰고(먼저 나온 최신 기사 유지) 최대 display_count개까지 내보내며,
+        실패한 소스는 오류 메시지를 errors에 넣고 나머지 소스로 계속한다.
+        """
+        config = self.config
+        sources = []
+        if config.use_naver:
+            sources.append(("네이버 API", self.iter_naver_pages(keyword, config.display_count, 'date')))
+        if config.use_newsapi:
+            def newsapi_pages():
+                page = self.search_newsapi(keyword, config.display_count, 'date', config.newsapi_language)
+                self.archive_articles(page)
+                yield page
+            sources.append(("NewsAPI", newsapi_pages()))
+
+        def source_articles(api_name, first_page, pages):
+            try:
+                yield from first_page.result()
+                for page in pages:
+                    yield from page
+            except Exception as e:
+                errors.append(describe_search_error(api_name, e))
+
+        with self.metrics.span("search", source=config.news_source), \
+                ThreadPoolExecutor(max_workers=len(sources)) as executor:
+            first_pages = [executor.submit(next, pages, []) for _, pages in sources]
+        streams = [source_articles(api_name, first_page, pages)
+                   for (api_name, pages), first_page in zip(sources, first_pages)]
+        yield from islice(iter_unique_articles(merge_newest_first(*streams)), config.display_count)
+
+    def analyze_timeline(self, keyword, on_article=None, on_delta=None, on_result=None):
+        """최신순 통합 타임라인을 받는 대로 최신 기사부터 분석
+
+        on_article(순번, Article)은 기사가 도착할 때, on_delta/on_result는 analyze_articles와 같이 호출된다.
+        기사 목록 전체가 필요한 묶음 분석과 관련도 선별은 적용하지 않는다. 로컬 감정/키워드는 기사 전체로
+        계산하므로 타임라인이 끝난 뒤 합치고, 이때 on_result도 합친 결과로 마지막에 한꺼번에 호출한다.
+        (기사 목록, 분석 결과 목록, 검색 오류 메시지 목록)을 반환한다.
+        """
+        config = self.config
+        errors = []
+        add_local = config.local_sentiment_keywords and (config.include_sentiment or config.include_keywords)
+        news_list, analyses = analyze_stream_concurrently(self.iter_timeline(keyword, errors), self.analyze_news,
+                                                          config.max_concurrency, on_article, on_delta,
+                                                          None if add_local else on_result)
+        if add_local and news_list:
+            with self.metrics.span("local_analysis"):
+                local = analyze_locally(news_list, config.include_sentiment, config.include_keywords)
+            analyses = [{**analysis, **extras} for analysis, extras in zip(analyses, local)]
+            if on_result:
+                for i, analysis in enumerate(analyses):
+                    on_result(i, analysis)
+        return news_list, analyses, errors
+
+    # 로컬 아카이브
+
+    def archive_articles(self, articles):
+        """검색된 기사를 아카이브에 추가 (archive_results를 끄면 저장하지 않음)"""
+        if self.config.archive_results and articles:
+            with self.metrics.span("archive", kind="articles"):
+                self.archive.add_articles(articles)
+
+    def search_archive(self, keyword):
+        """아카이브에서 키워드에 맞는 지난 기사를 찾아 반환 (설정한 뉴스 소스와 게시 기간 안에서 최대 display_count개)"""
+        config = self.config
+        since = None
+        if config.archive_max_age_hours:
+            since = datetime.now(timezone.utc) - timedelta(hours=config.archive_max_age_hours)
+        api_sources = [source for source, used in (("naver", config.use_naver), ("newsapi", config.use_newsapi))
+                       if used]
+        with self.metrics.span("archive", kind="search"):
+            hits = self.archive.search(keyword, config.display_count, since=since, api_sources=api_sources,
+                                       newest_first=config.sort == 'date')
+        return [hit["article"] for hit in hits]
+
+    def search_or_archive(self, keyword):
+        """archive_first면 아카이브에서 먼저 찾고, 맞는 기사가 없으면 API로 검색
+
+        (기사 목록, 제외된 중복 기사 수, 오류 메시지 목록, 아카이브에서 찾았는지)를 반환한다.
+        """
+        if self.config.archive_first:
+            archived = self.search_archive(keyword)
+            if archived:
+                return archived, 0, [], True
+        return (*self.search(keyword), False)
+
+    # 기사 분석
+
+    def analyze_with_openai(self, news, on_delta=None):
+        """OpenAI API를 사용해 뉴스 기사 분석 (on_delta가 있으면 요약을 스트리밍으로 전달)"""
+        config = self.config
+        title, description = prepare_article_text(news, config.content_token_limit, config.fetch_full_text)
+
+        client = self.client_registry.get_openai(config.openai_api_key, config.openai_base_url)
+
+        # 요약, 감정, 키워드를 한 번의 요청으로 생성 (JSON 스키마 강제)
+        # 고정 지침은 시스템 프롬프트로, 기사 내용만 사용자 메시지로 보냄
+        request = dict(
+            model=AI_MODELS["openai"],
+            messages=[
+                {"role": "system", "content": get_analysis_instructions(config.summary_length, config.llm_sentiment,
+                                                                        config.llm_keywords)},
+                {"role": "user", "content": get_analysis_prompt(title, description)}
+            ],
+            temperature=0.3,
+            max_tokens=500,
+            response_format={
+                "type": "json_schema",
+                "json_schema": {
+                    "name": "news_analysis",
+                    "strict": True,
+                    "schema": build_analysis_schema(config.llm_sentiment, config.llm_keywords)
+                }
+            }
+        )
+
+        def stream_analysis():
+            # 재시도하면 처음부터 다시 받으므로 조각은 시도마다 새로 모음
+            chunks = []
+            usage = None
+            for chunk in client.chat.completions.create(stream=True, stream_options={"include_usage": True},
+                                                        **request):
+                if chunk.choices and chunk.choices[0].delta.content:
+                    chunks.append(chunk.choices[0].delta.content)
+                    partial_summary = extract_partial_summary("".join(chunks))
+                    if partial_summary:
+                        on_delta(partial_summary)
+                if getattr(chunk, 'usage', None):
+                    usage = chunk.usage  # 사용량은 마지막 청크에만 포함
+            return "".join(chunks), usage
+
+        kind = "stream" if on_delta else "single"
+        try:
+            started_at = time.perf_counter()
+            with self.metrics.span("llm", provider="openai", kind=kind):
+                if on_delta:
+                    content, usage = self.resilience.call('openai', stream_analysis)
+                else:
+                    response = self.resilience.call('openai', partial(client.chat.completions.create, **request))
+                    content = response.choices[0].message.content
+                    usage = response.usage
+            self.token_usage.record(AI_MODELS["openai"], kind, usage_from_openai(usage),
+                                    time.perf_counter() - started_at)
+
+            with self.metrics.span("parse", kind=kind):
+                return parse_analysis_response(content, config.llm_sentiment, config.llm_keywords)
+        except Exception as e:
+            return {"summary": ANALYSIS_FAILED_SUMMARY, "error": f"OpenAI API 요청 중 오류 발생: {str(e)}"}
+
+    def analyze_with_anthropic(self, news, on_delta=None):
+        """Anthropic API를 사용해 뉴스 기사 분석 (on_delta가 있으면 요약을 스트리밍으로 전달)"""
+        config = self.config
+        title, description = prepare_article_text(news, config.content_token_limit, config.fetch_full_text)
+
+        client = self.client_registry.get_anthropic(config.anthropic_api_key, config.anthropic_base_url)
+
+        request = dict(
+            model=AI_MODELS["anthropic"],
+            max_tokens=500,
+            system=self.get_anthropic_system(
+                get_analysis_instructions(config.summary_length, config.llm_sentiment, config.llm_keywords),
+                build_analysis_schema(config.llm_sentiment, config.llm_keywords)
+            ),
+            messages=[
+                {"role": "user", "content": get_analysis_prompt(title, description)},
+                # 응답이 JSON 객체로 시작하도록 미리 채움
+                {"role": "assistant", "content": "{"}
+            ]
+        )
+
+        def stream_analysis():
+            chunks = ["{"]
+            with client.messages.stream(**request) as stream:
+                for text in stream.text_stream:
+                    chunks.append(text)
+                    partial_summary = extract_partial_summary("".join(chunks))
+                    if partial_summary:
+                        on_delta(partial_summary)
+                usage = stream.get_final_message().usage
+            return "".join(chunks), usage
+
+        kind = "stream" if on_delta else "single"
+        try:
+            started_at = time.perf_counter()
+            with self.metrics.span("llm", provider="anthropic", kind=kind):
+                if on_delta:
+                    content, usage = self.resilience.call('anthropic', stream_analysis)
+                else:
+                    response = self.resilience.call('anthropic', partial(client.messages.create, **request))
+                    content = "{" + response.content[0].text
+                    usage = response.usage
+            self.token_usage.record(AI_MODELS["anthropic"], kind, usage_from_anthropic(usage),
+                                    time.perf_counter() - started_at)
+
+            with self.metrics.span("parse", kind=kind):
+                return parse_analysis_response(content, config.llm_sentiment, config.llm_keywords)
+        except Exception as e:
+            return {"summary": ANALYSIS_FAILED_SUMMARY, "error": f"Anthropic API 요청 중 오류 발생: {str(e)}"}
+
+    def get_anthropic_system(self, instructions, schema):
+        """설정에 따라 cache_control을 붙인 블록 또는 일반 문자열로 Anthropic 시스템 프롬프트 생성"""
+        blocks = build_anthropic_system(instructions, schema)
+        if self.config.anthropic_prompt_cache:
+            return blocks
+        return blocks[0]["text"]
+
+    def get_analysis_cache_key(self, news, full_text=None):
+        """선택된 모델과 기사 내용, 분석 옵션으로 분석 캐시 키 생성 (full_text를 주면 원문 분석 여부를 그 값으로)"""
+        config = self.config
+        return make_analysis_key(config.ai_model, news.title, news.description, config.summary_length,
+                                 config.llm_sentiment, config.llm_keywords,
+                                 config.fetch_full_text if full_text is None else full_text)
+
+    def analyze_news(self, news, on_delta=None):
+        """캐시를 먼저 확인하고, 없으면 선택된 AI 모델로 분석 후 저장
+
+        다른 세션이 같은 기사를 분석하는 중이면 새로 요청하지 않고 그 결과를 기다린다(이때는 스트리밍 없음).
+        """
+        cache_key = self.get_analysis_cache_key(news)
+        cached = self.lookup_analysis(cache_key)
+        if cached is not None:
+            return cached
+        news, cache_key = self.with_body(news, cache_key)
+        if news.body is None and self.config.fetch_full_text:
+            cached = self.lookup_analysis(cache_key)
+            if cached is not None:
+                return cached
+        return self.shared.run(f"analysis:{cache_key}", partial(self.analyze_and_cache, news, cache_key, on_delta),
+                               shareable=lambda analysis: not analysis.get('error'))
+
+    def lookup_analysis(self, cache_key):
+        """분석 캐시에서, 없으면 아카이브에서 같은 옵션의 분석 결과를 찾음 (아카이브에서 찾으면 캐시에 다시 저장)"""
+        cached = self.analysis_cache.get(cache_key)
+        if cached is None:
+            cached = self.archive.get_analysis(cache_key)
+            if cached is not None:
+                self.analysis_cache.set(cache_key, cached)
+        return cached
+
+    def store_analysis(self, news, cache_key, analysis):
+        """성공한 분석 결과를 분석 캐시와 아카이브에 저장"""
+        self.analysis_cache.set(cache_key, analysis)
+        if self.config.archive_results:
+            with self.metrics.span("archive", kind="analysis"):
+                self.archive.add_analysis(news, cache_key, analysis)
+
+    def with_body(self, news, cache_key=None):
+        """원문 분석이 켜져 있으면 본문을 붙인 기사 사본과 그 분석을 저장할 캐시 키 반환 (미리 요청했으면 도착할 때까지 기다림)
+
+        검색 결과 레코드는 세션 간에 공유되므로 고치지 않는다. 본문을 가져오지 못하면 원본 기사와
+        설명 기준의 캐시 키를 돌려줘, 설명으로 만든 분석이 원문 분석 키에 저장되지 않게 한다.
+        """
+        if not self.config.fetch_full_text:
+            return news, cache_key
+        body = self.fetcher.get(news.url)
+        if body is None:
+            return news, self.get_analysis_cache_key(news, full_text=False)
+        return news.with_body(body), cache_key
+
+    def analyze_and_cache(self, news, cache_key, on_delta=None):
+        """캐시를 거치지 않고 선택된 AI 모델로 분석한 뒤 결과 저장 (원문 분석이면 본문은 with_body로 미리 붙여서 전달)"""
+        if self.config.model_provider == "openai":
+            analysis = self.analyze_with_openai(news, on_delta)
+        else:  # anthropic
+            analysis = self.analyze_with_anthropic(news, on_delta)
+
+        # 실패한 분석은 캐시하지 않음
+        if not analysis.get('error'):
+            self.store_analysis(news, cache_key, analysis)
+        return analysis
+
+    def analyze_batch_with_openai(self, news_batch):
+        """OpenAI API 한 번의 요청으로 여러 기사 분석 (입력 순서대로, 형식이 틀린 기사는 None)"""
+        config = self.config
+        batch = build_batch_items(news_batch, config.content_token_limit, config.fetch_full_text)
+        client = self.client_registry.get_openai(config.openai_api_key, config.openai_base_url)
+
+        started_at = time.perf_counter()
+        with self.metrics.span("llm", provider="openai", kind="batch"):
+            response = self.resilience.call('openai', partial(
+                client.chat.completions.create,
+                model=AI_MODELS["openai"],
+                messages=[
+                    {"role": "system", "content": get_batch_analysis_instructions(
+                        config.summary_length, config.llm_sentiment, config.llm_keywords)},
+                    {"role": "user", "content": get_batch_analysis_prompt(batch)}
+                ],
+                temperature=0.3,
+                max_tokens=estimate_output_tokens(config.summary_length, config.llm_sentiment,
+                                                  config.llm_keywords) * len(batch) + 100,
+                response_format={
+                    "type": "json_schema",
+                    "json_schema": {
+                        "name": "news_batch_analysis",
+                        "strict": True,
+                        "schema": build_batch_analysis_schema(config.llm_sentiment, config.llm_keywords)
+                    }
+                }
+            ))
+        self.token_usage.record(AI_MODELS["openai"], "batch", usage_from_openai(response.usage),
+                                time.perf_counter() - started_at)
+
+        with self.metrics.span("parse", kind="batch"):
+            by_id = parse_batch_analysis_response(response.choices[0].message.content,
+                                                  {article_id for article_id, _, _ in batch},
+                                                  config.llm_sentiment, config.llm_keywords)
+        return [by_id.get(article_id) for article_id, _, _ in batch]
+
+    def analyze_batch_with_anthropic(self, news_batch):
+        """Anthropic API 한 번의 요청으로 여러 기사 분석 (입력 순서대로, 형식이 틀린 기사는 None)"""
+        config = self.config
+        batch = build_batch_items(news_batch, config.content_token_limit, config.fetch_full_text)
+        client = self.client_registry.get_anthropic(config.anthropic_api_key, config.anthropic_base_url)
+
+        started_at = time.perf_counter()
+        with self.metrics.span("llm", provider="anthropic", kind="batch"):
+            response = self.resilience.call('anthropic', partial(
+                client.messages.create,
+                model=AI_MODELS["anthropic"],
+                max_tokens=estimate_output_tokens(config.summary_length, config.llm_sentiment,
+                                                  config.llm_keywords) * len(batch) + 100,
+                system=self.get_anthropic_system(
+                    get_batch_analysis_instructions(config.summary_length, config.llm_sentiment,
+                                                    config.llm_keywords),
+                    build_batch_analysis_schema(config.llm_sentiment, config.llm_keywords)
+                ),
+                messages=[
+                    {"role": "user", "content": get_batch_analysis_prompt(batch)},
+                    {"role": "assistant", "content": "{"}
+                ]
+            ))
+        self.token_usage.record(AI_MODELS["anthropic"], "batch", usage_from_anthropic(response.usage),
+                                time.perf_counter() - started_at)
+
+        with self.metrics.span("parse", kind="batch"):
+            by_id = parse_batch_analysis_response("{" + response.content[0].text,
+                                                  {article_id for article_id, _, _ in batch},
+                                                  config.llm_sentiment, config.llm_keywords)
+        return [by_id.get(article_id) for article_id, _, _ in batch]
+
+    def analyze_news_in_batches(self, news_list, on_progress=None, on_result=None):
+        """캐시에 없는 기사만 토큰 예산에 맞춰 묶어 분석 (묶음이 실패하거나 빠진 기사는 개별 분석으로 대체)
+
+        콜백은 analyze_news_concurrently와 같이 호출한 스레드에서 실행된다.
+        """
+        config = self.config
+        results = [None] * len(news_list)
+        cache_keys = [self.get_analysis_cache_key(news) for news in news_list]
+
+        def report(i, analysis):
+            results[i] = analysis
+            if on_result:
+                on_result(i, analysis)
+            if on_progress:
+                on_progress(sum(result is not None for result in results), len(news_list))
+
+        # 캐시된 분석은 바로 전달
+        pending = []
+        for i, news in enumerate(news_list):
+            cached = self.lookup_analysis(cache_keys[i])
+            if cached is not None:
+                report(i, cached)
+            else:
+                pending.append((i, news))
+        if not pending:
+            return results
+        # 묶음 크기를 본문 길이로 정하므로 묶기 전에 본문이 모두 도착할 때까지 기다림
+        if config.fetch_full_text:
+            with_bodies = []
+            for i, news in pending:
+                news, cache_keys[i] = self.with_body(news, cache_keys[i])
+                with_bodies.append((i, news))
+            pending = with_bodies
+
+        if config.model_provider == "openai":
+            analyze_batch = self.analyze_batch_with_openai
+        else:  # anthropic
+            analyze_batch = self.analyze_batch_with_anthropic
+
+        def run_batch(batch):
+            analyses = {}
+            if len(batch) > 1:
+                try:
+                    for (i, news), analysis in zip(batch, analyze_batch([news for _, news in batch])):
+                        if analysis is not None:
+                            self.store_analysis(news, cache_keys[i], analysis)
+                            analyses[i] = analysis
+                except Exception:
+                    pass  # 묶음 요청 전체가 실패하면 아래에서 모두 개별 분석
+
+            for i, news in batch:
+                if i not in analyses:
+                    analyses[i] = self.analyze_and_cache(news, cache_keys[i])
+            return analyses
+
+        batches = pack_news_batches(pending, config.summary_length, config.llm_sentiment,
+                                    config.llm_keywords, config.batch_token_budget,
+                                    max_description_tokens=config.content_token_limit, use_body=config.fetch_full_text)
+        with ThreadPoolExecutor(max_workers=max(1, min(config.max_concurrency, len(batches)))) as executor:
+            futures = [executor.submit(run_batch, batch) for batch in batches]
+            for future in as_completed(futures):
+                for i, analysis in future.result().items():
+                    report(i, analysis)
+
+        return results
+
+    def triage(self, keyword, news_list):
+        """검색어 관련도로 분석할 기사 선별: (분석할 기사 순번 목록, 기사별 관련도 목록)
+
+        관련도 선별을 끄거나 검색어에 점수를 매길 토큰이 없으면(기호만 있는 검색어 등) 모든 기사를
+        분석 대상으로 반환한다.
+        """
+        config = self.config
+        if not config.enable_triage or not news_list or not tokenize(keyword):
+            return list(range(len(news_list))), None
+        with self.metrics.span("triage", method=config.triage_method):
+            scores = score_articles(keyword, news_list, config.triage_method)
+        return select_relevant(scores, config.triage_top_n, config.triage_min_score), scores.tolist()
+
+    def analyze_articles(self, news_list, on_progress=None, on_delta=None, on_result=None, selected=None):
+        """설정에 따라 묶음 또는 기사별 동시 분석 수행 (결과는 입력 순서 유지)
+
+        selected(기사 순번 목록)를 주면 그 기사만 분석하고 나머지 결과는 None으로 둔다.
+        on_delta/on_result의 순번은 news_list 기준이고, on_progress(완료 수, 전체 수)는 실제로 분석하는
+        (선택된) 기사 수 기준이다. 묶음 분석에서는 토큰 단위 스트리밍(on_delta)을 지원하지 않는다.
+        """
+        if selected is not None and len(selected) < len(news_list):
+            results = [None] * len(news_list)
+
+            def remap(callback):
+                return (lambda j, payload: callback(selected[j], payload)) if callback else None
+
+            analyses = self.analyze_articles([news_list[i] for i in selected], on_progress,
+                                             remap(on_delta), remap(on_result))
+            for i, analysis in zip(selected, analyses):
+                results[i] = analysis
+            return results
+
+        config = self.config
+        if config.fetch_full_text:
+            # 본문은 모두 미리 요청해 두고, 각 기사의 AI 분석이 시작될 때 자기 본문만 기다림
+            self.fetcher.prefetch(news.url for news in news_list)
+        if config.local_sentiment_keywords and (config.include_sentiment or config.include_keywords):
+            # 감정/키워드는 기사 묶음 전체로 로컬에서 먼저 계산하고 AI 요약이 도착하는 대로 합침
+            with self.metrics.span("local_analysis"):
+                local = analyze_locally(news_list, config.include_sentiment, config.include_keywords)
+            deliver = on_result
+            on_result = (lambda i, analysis: deliver(i, {**analysis, **local[i]})) if deliver else None
+        else:
+            local = None
+
+        if config.enable_batching:
+            analyses = self.analyze_news_in_batches(news_list, on_progress, on_result)
+        else:
+            analyses = analyze_news_concurrently(news_list, self.analyze_news, config.max_concurrency,
+                                                 on_progress, on_delta, on_result)
+        if local is None:
+            return analyses
+        return [{**analysis, **extras} for analysis, extras in zip(analyses, local)]
+
+    # 주제별 묶음 요약
+
+    def complete_json(self, instructions, prompt, schema, schema_name, max_tokens, kind):
+        """선택된 AI 모델에 JSON 응답 한 건을 요청해 응답 텍스트 반환 (요청 제한·재시도, 소요 시간과 토큰 기록)"""
+        config = self.config
+        provider = config.model_provider
+        started_at = time.perf_counter()
+        with self.metrics.span("llm", provider=provider, kind=kind):
+            if provider == "openai":
+                client = self.client_registry.get_openai(config.openai_api_key, config.openai_base_url)
+                response = self.resilience.call('openai', partial(
+                    client.chat.completions.create,
+                    model=AI_MODELS["openai"],
+                    messages=[
+                        {"role": "system", "content": instructions},
+                        {"role": "user", "content": prompt}
+                    ],
+                    temperature=0.3,
+                    max_tokens=max_tokens,
+                    response_format={
+                        "type": "json_schema",
+                        "json_schema": {"name": schema_name, "strict": True, "schema": schema}
+                    }
+                ))
+                content, usage = response.choices[0].message.content, usage_from_openai(response.usage)
+            else:  # anthropic
+                client = self.client_registry.get_anthropic(config.anthropic_api_key, config.anthropic_base_url)
+                response = self.resilience.call('anthropic', partial(
+                    client.messages.create,
+                    model=AI_MODELS["anthropic"],
+                    max_tokens=max_tokens,
+                    system=self.get_anthropic_system(instructions, schema),
+                    messages=[
+                        {"role": "user", "content": prompt},
+                        {"role": "assistant", "content": "{"}
+                    ]
+                ))
+                content, usage = "{" + response.content[0].text, usage_from_anthropic(response.usage)
+        self.token_usage.record(config.ai_model, kind, usage, time.perf_counter() - started_at)
+        return content
+
+    def summarize_cluster(self, keyword, cluster_news, total):
+        """군집의 대표 기사로 주제 제목과 요약(옵션에 따라 감정/키워드)을 한 번에 생성 (캐시 사용)"""
+        config = self.config
+        items = [prepare_article_text(news, min(DIGEST_SNIPPET_TOKENS, config.content_token_limit),
+                                      config.fetch_full_text) for news in cluster_news]
+        prompt = get_digest_prompt(keyword, items, total)
+        cache_key = make_analysis_key(config.ai_model, "digest", prompt, config.summary_length,
+                                      config.llm_sentiment, config.llm_keywords, config.fetch_full_text)
+        cached = self.analysis_cache.get(cache_key)
+        if cached is not None:
+            return cached
+        return self.shared.run(f"digest:{cache_key}",
+                               partial(self.summarize_and_cache, cluster_news, prompt, cache_key),
+                               shareable=lambda summary: not summary.get('error'))
+
+    def summarize_and_cache(self, cluster_news, prompt, cache_key):
+        """캐시를 거치지 않고 군집 요약을 생성한 뒤 결과 저장 (실패하면 첫 기사 제목과 오류를 담아 반환)"""
+        config = self.config
+        try:
+            content = self.complete_json(
+                get_digest_instructions(config.summary_length, config.llm_sentiment, config.llm_keywords), prompt,
+                build_digest_schema(config.llm_sentiment, config.llm_keywords), "news_digest",
+                estimate_output_tokens(config.summary_length, config.llm_sentiment, config.llm_keywords) + 60,
+                "digest"
+            )
+            with self.metrics.span("parse", kind="digest"):
+                summary = parse_digest_response(content, config.llm_sentiment, config.llm_keywords)
+        except Exception as e:
+            return {"headline": compact_text(cluster_news[0].title), "summary": ANALYSIS_FAILED_SUMMARY,
+                    "error": f"주제 요약 중 오류 발생: {str(e)}"}
+        self.analysis_cache.set(cache_key, summary)
+        return summary
+
+    def write_briefing(self, keyword, topics):
+        """주제별 요약을 모아 전체 동향 브리핑 생성 (topics: [(제목, 기사 수, 요약)], 캐시 사용)"""
+        config = self.config
+        prompt = get_briefing_prompt(keyword, topics)
+        cache_key = make_analysis_key(config.ai_model, "briefing", prompt, config.summary_length)
+        cached = self.analysis_cache.get(cache_key)
+        if cached is not None:
+            return cached["briefing"]
+
+        content = self.complete_json(BRIEFING_INSTRUCTIONS, prompt, BRIEFING_SCHEMA, "news_briefing",
+                                     BRIEFING_OUTPUT_TOKENS, "briefing")
+        with self.metrics.span("parse", kind="briefing"):
+            briefing = parse_briefing_response(content)
+        self.analysis_cache.set(cache_key, {"briefing": briefing})
+        return briefing
+
+    def digest(self, keyword, news_list, on_progress=None):
+        """기사를 주제별로 묶고 군집마다 한 번씩 요약(map)한 뒤 전체 브리핑(reduce)을 생성
+
+        기사 수와 관계없이 AI 호출은 군집 수(최대 digest_max_clusters) + 1번이다. 반환 형태:
+        {"keyword", "topics": [{"articles": [기사 순번, 대표 기사부터], "headline", "summary", ...}],
+         "other": [요약하지 않은 작은 군집의 기사 순번], "briefing": 브리핑 또는 None, "errors"}
+        on_progress(완료한 군집 수, 전체 군집 수)는 호출한 스레드에서 실행된다.
+        """
+        config = self.config
+        with self.metrics.span("cluster"):
+            clusters = cluster_articles(news_list, config.digest_threshold)
+        summarized = clusters[:config.digest_max_clusters]
+        other = sorted(i for members in clusters[config.digest_max_clusters:] for i in members)
+        representatives = [[news_list[i] for i in members[:DIGEST_REPRESENTATIVES]] for members in summarized]
+        if config.fetch_full_text:
+            self.fetcher.prefetch(news.url for group in representatives for news in group)
+
+        def summarize(c):
+            group = [self.with_body(news)[0] for news in representatives[c]]
+            return self.summarize_cluster(keyword, group, len(summarized[c]))
+
+        summaries = [None] * len(summarized)
+        if summarized:
+            with ThreadPoolExecutor(max_workers=max(1, min(config.max_concurrency, len(summarized)))) as executor:
+                futures = {executor.submit(summarize, c): c for c in range(len(summarized))}
+                for done, future in enumerate(as_completed(futures), 1):
+                    summaries[futures[future]] = future.result()
+                    if on_progress:
+                        on_progress(done, len(summarized))
+
+        if config.local_sentiment_keywords and (config.include_sentiment or config.include_keywords):
+            # 군집의 대표 기사를 하나로 이어 붙여 로컬 엔진으로 주제별 감정/키워드 계산
+            combined = [Article(" ".join(news.title for news in group), " ".join(news.description for news in group),
+                                group[0].url, group[0].source, group[0].api_source) for group in representatives]
+            with self.metrics.span("local_analysis"):
+                local = analyze_locally(combined, config.include_sentiment, config.include_keywords)
+            summaries = [{**summary, **extras} for summary, extras in zip(summaries, local)]
+
+        topics = [{"articles": members, **summary} for members, summary in zip(summarized, summaries)]
+        errors = [topic["error"] for topic in topics if topic.get("error")]
+        briefing = None
+        succeeded = [topic for topic in topics if not topic.get("error")]
+        if config.digest_briefing and len(succeeded) > 1:
+            try:
+                briefing = self.write_briefing(keyword, [(topic["headline"], len(topic["articles"]), topic["summary"])
+                                                         for topic in succeeded])
+            except Exception as e:
+                errors.append(f"전체 브리핑 생성 중 오류 발생: {str(e)}")
+        return {"keyword": keyword, "topics": topics, "other": other, "briefing": briefing, "errors": errors}
+
+    # 전체 흐름
+
+    def process_keyword(self, keyword, on_result=None):
+        """키워드 하나를 검색하고 모든 기사를 분석
+
+        on_result(기사 순번, {"original": Article, "analysis": 분석 결과, "relevance": 관련도})는
+        기사 분석이 끝나는 대로 호출되고, 관련도 선별로 건너뛴 기사는 분석이 모두 끝난 뒤
+        analysis가 None인 채로 호출된다. 전체 결과는 다음 형태의 사전으로 반환한다:
+        {"keyword", "articles": [{"original", "analysis", "relevance"}], "duplicate_count", "skipped_count",
+         "from_archive", "errors"} (archive_first면 아카이브에서 먼저 찾고, use_timeline이면 process_timeline 사용)
+        """
+        if self.config.use_timeline:
+            return self.process_timeline(keyword, on_result)
+        news_results, duplicate_count, errors, from_archive = self.search_or_archive(keyword)
+        selected, scores = self.triage(keyword, news_results)
+        scores = scores or [None] * len(news_results)
+
+        def report(i, analysis):
+            if on_result:
+                on_result(i, {"original": news_results[i], "analysis": analysis, "relevance": scores[i]})
+
+        analyses = self.analyze_articles(news_results, on_result=report, selected=selected)
+        for i, analysis in enumerate(analyses):
+            if analysis is None:
+                report(i, None)
+        return {
+            "keyword": keyword,
+            "articles": [{"original": news, "analysis": analysis, "relevance": score}
+                         for news, analysis, score in zip(news_results, analyses, scores)],
+            "duplicate_count": duplicate_count,
+            "skipped_count": len(news_results) - len(selected),
+            "from_archive": from_archive,
+            "errors": errors + [analysis['error'] for analysis in analyses if analysis and analysis.get('error')]
+        }
+
+    def process_timeline(self, keyword, on_result=None):
+        """process_keyword의 최신순 통합 타임라인 버전 (기사를 받는 대로 최신 기사부터 분석, 관련도 선별 없음)"""
+        arrived = []
+
+        def report(i, analysis):
+            if on_result:
+                on_result(i, {"original": arrived[i], "analysis": analysis, "relevance": None})
+
+        news_results, analyses, errors = self.analyze_timeline(
+            keyword, on_article=lambda i, news: arrived.append(news), on_result=report)
+        return {
+            "keyword": keyword,
+            "articles": [{"original": news, "analysis": analysis, "relevance": None}
+                         for news, analysis in zip(news_results, analyses)],
+            "duplicate_count": 0,
+            "skipped_count": 0,
+            "from_archive": False,
+            "errors": errors + [analysis['error'] for analysis in analyses if analysis.get('error')]
+        }
+
+    def digest_keyword(self, keyword, on_progress=None):
+        """키워드 하나를 검색하고 기사별 분석 대신 주제별 묶음 요약 생성
+
+        digest()의 결과에 "articles"(검색된 Article 목록), "duplicate_count", "from_archive"를 더하고
+        검색 오류를 errors에 합쳐 반환한다.
+        """
+        news_results, duplicate_count, errors, from_archive = self.search_or_archive(keyword)
+        result = self.digest(keyword, news_results, on_progress)
+        return {**result, "articles": news_results, "duplicate_count": duplicate_count, "from_archive": from_archive,
+                "errors": errors + result["errors"]}
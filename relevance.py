@@ -0,0 +1,106 @@
+# relevance.py
+"""검색어와 기사(제목+설명)의 관련도를 NumPy로 한 번에 계산하는 로컬 순위 매기기 (BM25, TF-IDF 코사인)
+
+LLM 분석 전에 검색어를 지나가듯 언급한 기사를 골라내 분석 요청 수와 대기 시간을 줄이는 데 쓴다.
+"""
+import re
+
+import numpy as np
+
+WORD_PATTERN = re.compile(r'[0-9a-z]+|[가-힣]+')
+TITLE_WEIGHT = 2  # 제목에 나온 토큰은 설명보다 두 배로 셈
+BM25_K1 = 1.2
+BM25_B = 0.75
+TRIAGE_METHODS = ("bm25", "tfidf")
+
+def is_hangul_syllable(token):
+    """한 글자짜리 한글 토큰인지 ('금', '쌀' 같은 검색어)"""
+    return len(token) == 1 and '가' <= token <= '힣'
+
+def tokenize(text, unigrams=False):
+    """영문/숫자는 단어 단위, 한글은 두 글자 조각(bigram)으로 나눈 토큰 목록
+
+    한국어는 조사가 붙어 단어 형태가 바뀌므로('반도체가', '반도체를') 글자 조각으로 나눠 어근이 겹치게 한다.
+    unigrams면 한글 글자 하나하나도 토큰으로 넣어 한 글자 검색어('금')가 '금값이' 같은 단어와도 맞게 한다.
+    """
+    tokens = []
+    for word in WORD_PATTERN.findall((text or '').lower()):
+        if '가' <= word[0] <= '힣' and len(word) > 1:
+            tokens.extend(word[i:i + 2] for i in range(len(word) - 1))
+            if unigrams:
+                tokens.extend(word)
+        else:
+            tokens.append(word)
+    return tokens
+
+def article_tokens(article, unigrams=False):
+    """기사의 제목(가중치 TITLE_WEIGHT)과 설명 토큰"""
+    return tokenize(article.title, unigrams) * TITLE_WEIGHT + tokenize(article.description, unigrams)
+
+def term_matrix(documents, vocabulary, columns=None):
+    """문서별 토큰 목록을 (문서 수 × 어휘 수) 빈도 행렬로 변환 (어휘에 없는 토큰은 무시)
+
+    columns를 주면 열 수를 고정한다(여러 토큰이 한 열을 나눠 쓰는 해시 어휘용).
+    """
+    rows, cols = [], []
+    for row, tokens in enumerate(documents):
+        for token in tokens:
+            col = vocabulary.get(token)
+            if col is not None:
+                rows.append(row)
+                cols.append(col)
+    matrix = np.zeros((len(documents), len(vocabulary) if columns is None else columns), dtype=np.float64)
+    np.add.at(matrix, (np.array(rows, dtype=np.intp), np.array(cols, dtype=np.intp)), 1.0)
+    return matrix
+
+def bm25_scores(query_tokens, documents, k1=BM25_K1, b=BM25_B):
+    """문서별 BM25 점수를 검색어가 가장 잘 맞았을 때의 점수로 나눈 0~1 값"""
+    vocabulary = {token: i for i, token in enumerate(dict.fromkeys(query_tokens))}
+    if not vocabulary or not documents:
+        return np.zeros(len(documents))
+    tf = term_matrix(documents, vocabulary)
+    lengths = np.array([len(tokens) for tokens in documents], dtype=np.float64)
+    average_length = lengths.mean() or 1.0
+
+    document_frequency = (tf > 0).sum(axis=0)
+    idf = np.log1p((len(documents) - document_frequency + 0.5) / (document_frequency + 0.5))
+    norm = k1 * (1 - b + b * lengths / average_length)
+    scores = (tf * (k1 + 1) / (tf + norm[:, None])) @ idf
+    return scores / (idf.sum() * (k1 + 1))
+
+def tfidf_scores(query_tokens, documents):
+    """문서와 검색어의 TF-IDF 코사인 유사도 (0~1)"""
+    vocabulary = {token: i for i, token in enumerate(dict.fromkeys(
+        token for tokens in [query_tokens, *documents] for token in tokens))}
+    if not query_tokens or not documents:
+        return np.zeros(len(documents))
+    tf = term_matrix([query_tokens, *documents], vocabulary)
+    document_frequency = (tf[1:] > 0).sum(axis=0)
+    idf = np.log((1 + len(documents)) / (1 + document_frequency)) + 1
+    weights = tf * idf
+    weights /= np.linalg.norm(weights, axis=1, keepdims=True).clip(min=1e-12)
+    return weights[1:] @ weights[0]
+
+def score_articles(keyword, articles, method="bm25"):
+    """기사별 검색어 관련도 (0~1, 입력 순서)
+
+    검색어에 한 글자짜리 한글 단어가 있으면 기사도 글자 단위 토큰까지 넣어 센다(두 글자 조각만으로는 맞지 않음).
+    """
+    query_tokens = tokenize(keyword)
+    unigrams = any(is_hangul_syllable(token) for token in query_tokens)
+    documents = [article_tokens(article, unigrams) for article in articles]
+    if method == "tfidf":
+        return tfidf_scores(query_tokens, documents)
+    return bm25_scores(query_tokens, documents)
+
+def select_relevant(scores, top_n=0, min_score=0.0):
+    """관련도가 min_score 이상인 기사 중 상위 top_n개(0이면 제한 없음)의 순번을 원래 순서대로 반환
+
+    검색어 토큰이 하나도 없는 기사(점수 0)는 항상 제외한다.
+    """
+    scores = np.asarray(scores)
+    candidates = np.flatnonzero((scores > 0) & (scores >= min_score))
+    if top_n and len(candidates) > top_n:
+        ranked = candidates[np.argsort(-scores[candidates], kind='stable')]
+        candidates = np.sort(ranked[:top_n])
+    return candidates.tolist()
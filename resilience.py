@@ -0,0 +1,436 @@
+# resilience.py
+"""외부 API 호출을 함께 보호하는 복원력 계층
+
+공급자(네이버, NewsAPI, OpenAI, Anthropic)마다 다음을 적용한다.
+- 토큰 버킷: 설정한 분당 요청 수를 넘지 않도록 요청 간격 조절
+- 재시도: 429/5xx/연결 오류는 Retry-After를 따르거나 지수 백오프(지터 포함) 후 다시 시도
+- AIMD 동시성 제한: 성공하면 동시 요청 수를 천천히 늘리고, 429를 받으면 절반으로 줄임
+- 서킷 브레이커: 서버 오류가 연속되면 잠시 호출을 막고 한 건으로 회복 여부 확인
+- 일일 한도: NewsAPI처럼 하루 요청 수가 정해진 API의 사용량 추적
+"""
+import json
+import math
+import os
+import random
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+
+import anthropic
+import openai
+import requests
+
+DEFAULT_QUOTA_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "api_quota.json")
+
+# 공급자별 기본 제한: 분당 요청 수, 버스트(연속 허용 요청 수), 최대 동시 요청 수
+DEFAULT_PROVIDER_LIMITS = {
+    "naver": {"requests_per_minute": 600, "burst": 10, "max_concurrency": 10},
+    "newsapi": {"requests_per_minute": 60, "burst": 5, "max_concurrency": 4},
+    "openai": {"requests_per_minute": 500, "burst": 10, "max_concurrency": 16},
+    "anthropic": {"requests_per_minute": 50, "burst": 5, "max_concurrency": 8},
+}
+
+# NewsAPI 무료 계정의 하루 요청 한도
+NEWSAPI_DAILY_LIMIT = 1000
+
+# 재시도할 HTTP 상태 코드 (529: Anthropic 과부하, 409 충돌은 다시 보내도 같으므로 제외)
+RETRYABLE_STATUS_CODES = {408, 429, 500, 502, 503, 504, 529}
+CONNECTION_ERRORS = (requests.ConnectionError, requests.Timeout,
+                     openai.APIConnectionError, anthropic.APIConnectionError)
+
+class CircuitOpenError(Exception):
+    """서킷 브레이커가 열려 있어 호출을 보내지 않았을 때 발생하는 예외"""
+
+class QuotaExceededError(Exception):
+    """일일 요청 한도를 모두 사용했을 때 발생하는 예외"""
+
+def parse_retry_after(value):
+    """Retry-After 헤더 값(초 또는 HTTP 날짜)을 기다릴 초로 변환 (해석할 수 없으면 None)"""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+
+def classify_error(error):
+    """예외를 (재시도 가능 여부, 429 여부, 서버 장애 여부, Retry-After 초)로 분류
+
+    requests 응답 오류는 status_code/retry_after 속성을, SDK 오류는 status_code와
+    response.headers를 읽는다. 연결/타임아웃 오류는 서버 장애로 본다.
+    """
+    if isinstance(error, CONNECTION_ERRORS):
+        return True, False, True, None
+    status = getattr(error, 'status_code', None)
+    if status not in RETRYABLE_STATUS_CODES:
+        return False, False, False, None
+    retry_after = getattr(error, 'retry_after', None)
+    if retry_after is None:
+        headers = getattr(getattr(error, 'response', None), 'headers', None) or {}
+        retry_after_ms = headers.get('retry-after-ms')
+        if retry_after_ms:
+            try:
+                retry_after = float(retry_after_ms) / 1000
+            except ValueError:
+                retry_after = None
+        if retry_after is None:
+            retry_after = parse_retry_after(headers.get('retry-after'))
+    return True, status == 429, status >= 500, retry_after
+
+class TokenBucket:
+    """초당 rate개씩 토큰이 차고 최대 capacity개까지 쌓이는 요청 간격 조절기
+
+    hold()로 정한 시각까지는 토큰이 있어도 모든 요청을 기다리게 해서
+    429의 Retry-After를 같은 공급자의 다른 요청에도 적용한다.
+    """
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = float(capacity)
+        self._updated_at = time.monotonic()
+        self._hold_until = 0.0
+        self._lock = threading.Lock()
+
+    def configure(self, rate, capacity):
+        """속도와 버스트 크기 변경 (쌓인 토큰은 새 용량을 넘지 않게 자름)"""
+        with self._lock:
+            self._refill(time.monotonic())
+            self.rate = rate
+            self.capacity = capacity
+            self._tokens = min(self._tokens, capacity)
+
+    def acquire(self):
+        """토큰 하나를 얻을 때까지 기다린 뒤 기다린 시간(초) 반환"""
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if now >= self._hold_until and self._tokens >= 1:
+                    self._tokens -= 1
+                    return waited
+                if now < self._hold_until:
+                    delay = self._hold_until - now
+                else:
+                    delay = (1 - self._tokens) / self.rate
+            time.sleep(delay)
+            waited += delay
+
+    def hold(self, seconds):
+        """지금부터 seconds초 동안 새 요청을 보내지 않음"""
+        with self._lock:
+            self._hold_until = max(self._hold_until, time.monotonic() + seconds)
+
+    def _refill(self, now):
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated_at) * self.rate)
+        self._updated_at = now
+
+class AIMDLimiter:
+    """합 증가/곱 감소(AIMD) 방식으로 조절하는 동시 요청 수 제한
+
+    성공할 때마다 한도를 1/한도만큼 늘려 대략 한 바퀴에 1씩 키우고, 429를 받으면
+    한도를 decrease_factor배로 줄인다. 같은 혼잡에 몰려 온 여러 429로 연달아 줄지 않도록
+    cooldown초 안의 감소는 한 번만 반영한다.
+    """
+
+    def __init__(self, max_limit, min_limit=1, decrease_factor=0.5, cooldown=1.0):
+        self.max_limit = max_limit
+        self.min_limit = min_limit
+        self.decrease_factor = decrease_factor
+        self.cooldown = cooldown
+        self.limit = float(max_limit)
+        self.in_flight = 0
+        self._last_decrease = 0.0
+        self._condition = threading.Condition()
+
+    def configure(self, max_limit):
+        """최대 동시 요청 수 변경"""
+        with self._condition:
+            self.max_limit = max_limit
+            self.limit = min(self.limit, float(max_limit))
+            self._condition.notify_all()
+
+    @contextmanager
+    def slot(self):
+        """현재 한도 안에서 자리가 날 때까지 기다렸다가 요청 하나를 실행"""
+        with self._condition:
+            while self.in_flight >= max(self.min_limit, int(self.limit)):
+                self._condition.wait()
+            self.in_flight += 1
+        try:
+            yield
+        finally:
+            with self._condition:
+                self.in_flight -= 1
+                self._condition.notify()
+
+    def on_success(self):
+        """성공한 요청 반영 (한도를 조금씩 늘림)"""
+        with self._condition:
+            if self.limit < self.max_limit:
+                self.limit = min(float(self.max_limit), self.limit + 1 / self.limit)
+                self._condition.notify_all()
+
+    def on_throttle(self):
+        """429 응답 반영 (한도를 크게 줄임)"""
+        with self._condition:
+            now = time.monotonic()
+            if now - self._last_decrease < self.cooldown:
+                return
+            self._last_decrease = now
+            self.limit = max(float(self.min_limit), self.limit * self.decrease_factor)
+
+class CircuitBreaker:
+    """서버 장애가 failure_threshold번 연속되면 reset_timeout초 동안 호출을 막는 차단기
+
+    시간이 지나면 요청 한 건만 시험 삼아 보내고(half-open), 성공하면 다시 닫고
+    실패하면 다시 연다.
+    """
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+    def __init__(self, name, failure_threshold=5, reset_timeout=30.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def before_call(self):
+        """호출해도 되는지 확인 (막혀 있으면 CircuitOpenError 발생)"""
+        with self._lock:
+            if self.state == self.OPEN:
+                remaining = self.reset_timeout - (time.monotonic() - self._opened_at)
+                if remaining > 0:
+                    raise CircuitOpenError(
+                        f"{self.name} API 오류가 계속되어 요청을 잠시 멈췄습니다 ({math.ceil(remaining)}초 후 다시 시도)"
+                    )
+                self.state = self.HALF_OPEN
+                self._probing = False
+            if self.state == self.HALF_OPEN:
+                if self._probing:
+                    raise CircuitOpenError(f"{self.name} API 회복 여부를 확인하는 중입니다")
+                self._probing = True
+
+    def release_probe(self):
+        """시험 요청을 보내지 못하고 포기했을 때 다음 요청이 다시 시험할 수 있게 함"""
+        with self._lock:
+            self._probing = False
+
+    def record_success(self):
+        """성공한 호출 반영 (서버가 정상이므로 닫음)"""
+        with self._lock:
+            self.state = self.CLOSED
+            self.failures = 0
+            self._probing = False
+
+    def record_failure(self):
+        """서버 장애 반영"""
+        with self._lock:
+            self.failures += 1
+            self._probing = False
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                self.state = self.OPEN
+                self._opened_at = time.monotonic()
+
+class DailyQuota:
+    """UTC 날짜별 요청 수를 세어 하루 한도를 넘지 않게 하는 추적기
+
+    path를 주면 사용량을 JSON 파일에 저장해 앱과 CLI를 다시 실행해도 이어서 센다.
+    """
+
+    def __init__(self, name, limit, path=None):
+        self.name = name
+        self.limit = limit
+        self.path = path
+        self._lock = threading.Lock()
+        self._day, self._used = self._today(), 0
+        if path:
+            self._load()
+
+    @staticmethod
+    def _today():
+        return datetime.now(timezone.utc).strftime('%Y-%m-%d')
+
+    def consume(self):
+        """요청 한 건 사용 (한도를 다 썼으면 QuotaExceededError 발생)"""
+        with self._lock:
+            self._roll_over()
+            if self._used >= self.limit:
+                raise QuotaExceededError(
+                    f"{self.name} 일일 요청 한도({self.limit:,}회)를 모두 사용했습니다 (UTC 자정에 초기화)"
+                )
+            self._used += 1
+            self._save()
+
+    def usage(self):
+        """(오늘 사용한 요청 수, 한도)"""
+        with self._lock:
+            self._roll_over()
+            return self._used, self.limit
+
+    def _roll_over(self):
+        today = self._today()
+        if today != self._day:
+            self._day, self._used = today, 0
+
+    def _load(self):
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                saved = json.load(f).get(self.name, {})
+        except (OSError, ValueError):
+            return
+        if saved.get('day') == self._day:
+            self._used = int(saved.get('used', 0))
+
+    def _save(self):
+        if not self.path:
+            return
+        try:
+            try:
+                with open(self.path, encoding='utf-8') as f:
+                    data = json.load(f)
+            except (OSError, ValueError):
+                data = {}
+            data[self.name] = {'day': self._day, 'used': self._used}
+            with open(self.path, 'w', encoding='utf-8') as f:
+                json.dump(data, f)
+        except OSError:
+            pass  # 저장하지 못해도 메모리의 사용량으로 계속 셈
+
+class ProviderGuard:
+    """공급자 하나의 호출을 토큰 버킷, AIMD 제한, 서킷 브레이커, 일일 한도, 재시도로 감쌈"""
+
+    def __init__(self, name, requests_per_minute, burst, max_concurrency, daily_quota=None,
+                 max_retries=4, base_delay=0.5, max_delay=30.0, failure_threshold=5, reset_timeout=30.0):
+        self.name = name
+        self.requests_per_minute = requests_per_minute
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.bucket = TokenBucket(requests_per_minute / 60, burst)
+        self.limiter = AIMDLimiter(max_concurrency)
+        self.breaker = CircuitBreaker(name, failure_threshold, reset_timeout)
+        self.quota = daily_quota
+        self._stats_lock = threading.Lock()
+        self._stats = {"calls": 0, "retries": 0, "throttled": 0, "failures": 0, "rejected": 0, "waited": 0.0}
+
+    def configure(self, requests_per_minute=None, burst=None, max_concurrency=None):
+        """분당 요청 수, 버스트, 최대 동시 요청 수 변경 (None인 값은 유지)"""
+        if requests_per_minute is not None or burst is not None:
+            self.requests_per_minute = requests_per_minute or self.requests_per_minute
+            self.bucket.configure(self.requests_per_minute / 60, burst or self.bucket.capacity)
+        if max_concurrency is not None:
+            self.limiter.configure(max_concurrency)
+
+    def backoff(self, attempt):
+        """attempt번째 재시도 전 대기 시간 (full jitter 지수 백오프)"""
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+    def call(self, func):
+        """func()를 제한 안에서 실행하고 일시적인 실패는 재시도 (끝내 실패하면 마지막 예외 발생)"""
+        attempt = 0
+        while True:
+            try:
+                self.breaker.before_call()
+            except CircuitOpenError:
+                self._count("rejected")
+                raise
+            if self.quota:
+                try:
+                    self.quota.consume()
+                except QuotaExceededError:
+                    # half-open 시험 요청을 보내지 않았으므로 성공/실패 대신 시험 자리만 돌려놓음
+                    self.breaker.release_probe()
+                    self._count("rejected")
+                    raise
+
+            with self.limiter.slot():
+                self._count("waited", self.bucket.acquire())
+                self._count("calls")
+                try:
+                    result = func()
+                except Exception as e:
+                    error = e
+                else:
+                    self.breaker.record_success()
+                    self.limiter.on_success()
+                    return result
+
+            retryable, throttled, server_failure, retry_after = classify_error(error)
+            if server_failure:
+                self.breaker.record_failure()
+            else:
+                # 429나 인증 오류 같은 4xx는 성공이 아니므로 실패 횟수를 되돌리거나 서킷을 닫지 않고 시험 자리만 돌려놓음
+                self.breaker.release_probe()
+            if throttled:
+                self._count("throttled")
+                self.limiter.on_throttle()
+                if retry_after:
+                    self.bucket.hold(min(retry_after, self.max_delay))
+            if not retryable:
+                raise error
+            # Retry-After가 너무 길거나 재시도 횟수를 다 쓰면 기다리지 않고 실패로 돌려줌
+            if attempt >= self.max_retries or (retry_after or 0) > self.max_delay:
+                self._count("failures")
+                raise error
+            self._count("retries")
+            time.sleep(retry_after if retry_after is not None else self.backoff(attempt))
+            attempt += 1
+
+    def status(self):
+        """현재 상태와 누적 통계 (화면과 로그 표시용)"""
+        with self._stats_lock:
+            stats = dict(self._stats)
+        quota_used, quota_limit = self.quota.usage() if self.quota else (None, None)
+        return {
+            "provider": self.name,
+            "requests_per_minute": self.requests_per_minute,
+            "concurrency_limit": int(self.limiter.limit),
+            "max_concurrency": self.limiter.max_limit,
+            "in_flight": self.limiter.in_flight,
+            "circuit": self.breaker.state,
+            "quota_used": quota_used,
+            "quota_limit": quota_limit,
+            **stats
+        }
+
+    def _count(self, key, amount=1):
+        with self._stats_lock:
+            self._stats[key] += amount
+
+class ResilienceRegistry:
+    """공급자별 ProviderGuard 보관소 (앱은 세션 간에, CLI는 실행 동안 공유)"""
+
+    def __init__(self, limits=None, newsapi_daily_limit=NEWSAPI_DAILY_LIMIT, quota_path=DEFAULT_QUOTA_PATH):
+        merged = {provider: dict(values) for provider, values in DEFAULT_PROVIDER_LIMITS.items()}
+        for provider, values in (limits or {}).items():
+            merged.setdefault(provider, {}).update(values)
+        self._guards = {}
+        for provider, values in merged.items():
+            quota = DailyQuota("NewsAPI", newsapi_daily_limit, quota_path) if provider == "newsapi" else None
+            self._guards[provider] = ProviderGuard(provider, daily_quota=quota, **values)
+
+    def guard(self, provider):
+        """공급자의 ProviderGuard 반환"""
+        return self._guards[provider]
+
+    def call(self, provider, func):
+        """공급자 제한 안에서 func() 실행"""
+        return self._guards[provider].call(func)
+
+    def status(self):
+        """모든 공급자의 상태 목록"""
+        return [guard.status() for guard in self._guards.values()]
@@ -0,0 +1,100 @@
+# search_cache.py
+"""뉴스 검색 결과 TTL 캐시 (동시 요청 병합, 만료 결과 선제공 지원)"""
+import threading
+import time
+from concurrent.futures import Future
+
+class SearchCache:
+    """(소스, 키워드, 정렬, 개수, 언어) 키로 검색 결과를 메모리에 보관하는 캐시
+
+    같은 키로 동시에 들어온 요청은 하나의 업스트림 호출로 합쳐지고,
+    serve_stale을 켜면 만료된 결과를 바로 돌려주면서 백그라운드에서 갱신한다.
+    """
+
+    def __init__(self, ttl_seconds=300, stale_ttl_seconds=3600, max_entries=500):
+        self.ttl_seconds = ttl_seconds
+        self.stale_ttl_seconds = stale_ttl_seconds
+        self.max_entries = max_entries
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self._entries = {}   # key -> (결과, 가져온 시각)
+        self._inflight = {}  # key -> 진행 중인 업스트림 호출의 Future
+        self._lock = threading.Lock()
+
+    def get_or_fetch(self, key, fetch, ttl_seconds=None, serve_stale=False):
+        """캐시된 결과를 반환하거나 fetch()로 가져와 저장 (fetch의 예외는 그대로 전달)"""
+        ttl = self.ttl_seconds if ttl_seconds is None else ttl_seconds
+        now = time.time()
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, fetched_at = entry
+                age = now - fetched_at
+                if age <= ttl:
+                    self.hits += 1
+                    return list(value)
+                if serve_stale and age <= self.stale_ttl_seconds:
+                    self.stale_hits += 1
+                    if key not in self._inflight:
+                        self._start_fetch(key, fetch, background=True)
+                    return list(value)
+
+            future = self._inflight.get(key)
+            if future is None:
+                self.misses += 1
+                future = self._start_fetch(key, fetch, background=False)
+                owner = True
+            else:
+                self.coalesced += 1
+                owner = False
+
+        if owner:
+            self._run_fetch(key, fetch, future)
+        return list(future.result())
+
+    def _start_fetch(self, key, fetch, background):
+        """진행 중 호출로 등록 (잠금을 잡은 상태에서 호출)"""
+        future = Future()
+        self._inflight[key] = future
+        if background:
+            threading.Thread(target=self._run_fetch, args=(key, fetch, future), daemon=True).start()
+        return future
+
+    def _run_fetch(self, key, fetch, future):
+        """업스트림 호출 후 결과를 저장하고 대기 중인 요청에 전달"""
+        try:
+            value = fetch()
+        except BaseException as e:
+            with self._lock:
+                self._inflight.pop(key, None)
+            future.set_exception(e)
+            return
+
+        with self._lock:
+            self._entries[key] = (list(value), time.time())
+            self._inflight.pop(key, None)
+            # 용량 초과 시 가장 오래전에 가져온 결과부터 제거
+            while len(self._entries) > self.max_entries:
+                oldest = min(self._entries, key=lambda k: self._entries[k][1])
+                del self._entries[oldest]
+        future.set_result(value)
+
+    def clear(self):
+        """저장된 결과와 통계 초기화 (진행 중인 호출은 유지)"""
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.stale_hits = self.misses = self.coalesced = 0
+
+    def stats(self):
+        """적중/만료 제공/미스/병합 횟수와 저장된 항목 수 반환"""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "stale_hits": self.stale_hits,
+                "misses": self.misses,
+                "coalesced": self.coalesced,
+                "entries": len(self._entries)
+            }
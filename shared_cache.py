@@ -0,0 +1,213 @@
+# shared_cache.py
+"""여러 세션이 같은 검색·분석을 한 번만 수행하도록 하는 공유 계층 (single-flight)
+
+같은 키의 작업이 이미 진행 중이면 새 요청은 직접 수행하지 않고 그 결과를 기다려 함께 받는다.
+한 프로세스 안의 세션끼리는 Future로, 여러 프로세스(여러 Streamlit 서버, CLI) 사이에서는 backend에
+둔 임대(lease) 키와 결과 키로 조정한다. backend는 get/set/add/delete만 있으면 되므로 Redis 같은
+외부 저장소로 바꿀 수 있고, 기본은 프로세스 안의 MemoryBackend, 같은 호스트의 여러 프로세스는
+파일 하나를 함께 쓰는 SQLiteBackend를 사용한다.
+"""
+import json
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import Future
+
+DEFAULT_LEASE_SECONDS = 120  # 수행 중인 프로세스가 죽어도 이 시간이 지나면 다른 프로세스가 이어받음
+DEFAULT_RESULT_TTL = 300  # 끝난 작업의 결과를 backend에 남겨 두는 시간
+DEFAULT_POLL_INTERVAL = 0.1  # 다른 프로세스의 결과를 기다릴 때 확인 간격
+MEMORY_BACKEND_MAX_ENTRIES = 10000
+# 여러 프로세스가 함께 쓸 SQLiteBackend 파일 경로를 담는 환경 변수 (없으면 프로세스 안에서만 공유)
+SHARED_DB_ENV = "NEWS_AGENT_SHARED_DB"
+
+class MemoryBackend:
+    """프로세스 안에서만 공유되는 기본 backend (만료된 값은 읽거나 가득 찼을 때 제거)"""
+
+    def __init__(self, max_entries=MEMORY_BACKEND_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._data = {}  # key -> (값, 만료 시각)
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """저장된 값 반환 (없거나 만료되면 None)"""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            if entry[1] <= time.time():
+                del self._data[key]
+                return None
+            return entry[0]
+
+    def set(self, key, value, ttl):
+        """ttl초 동안 유지되는 값 저장 (같은 키는 덮어씀)"""
+        with self._lock:
+            self._data[key] = (value, time.time() + ttl)
+            self._evict()
+
+    def add(self, key, value, ttl):
+        """키가 없을 때만 저장하고 저장했는지 반환 (임대 획득에 사용)"""
+        now = time.time()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None and entry[1] > now:
+                return False
+            self._data[key] = (value, now + ttl)
+            self._evict()
+            return True
+
+    def delete(self, key):
+        """값 삭제 (없으면 무시)"""
+        with self._lock:
+            self._data.pop(key, None)
+
+    def _evict(self):
+        """용량을 넘으면 만료된 값을 지우고, 그래도 넘으면 곧 만료될 값부터 제거 (잠금을 잡은 상태에서 호출)"""
+        if len(self._data) <= self.max_entries:
+            return
+        now = time.time()
+        for key in [key for key, (_, expires_at) in self._data.items() if expires_at <= now]:
+            del self._data[key]
+        overflow = len(self._data) - self.max_entries
+        if overflow > 0:
+            for key in sorted(self._data, key=lambda k: self._data[k][1])[:overflow]:
+                del self._data[key]
+
+class SQLiteBackend:
+    """같은 호스트의 여러 프로세스가 SQLite 파일 하나로 공유하는 backend (값은 JSON으로 저장)"""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS shared (
+                    key TEXT PRIMARY KEY,
+                    value TEXT NOT NULL,
+                    expires_at REAL NOT NULL
+                )
+            """)
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_shared_expires_at ON shared (expires_at)")
+
+    def get(self, key):
+        """저장된 값 반환 (없거나 만료되면 None)"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value FROM shared WHERE key = ? AND expires_at > ?", (key, time.time())
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def set(self, key, value, ttl):
+        """ttl초 동안 유지되는 값 저장 (같은 키는 덮어쓰고, 만료된 행은 함께 정리)"""
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM shared WHERE expires_at <= ?", (now,))
+            self._conn.execute("INSERT OR REPLACE INTO shared (key, value, expires_at) VALUES (?, ?, ?)",
+                               (key, json.dumps(value, ensure_ascii=False), now + ttl))
+
+    def add(self, key, value, ttl):
+        """키가 없을 때만 저장하고 저장했는지 반환 (여러 프로세스 사이에서도 한 곳만 성공)"""
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM shared WHERE key = ? AND expires_at <= ?", (key, now))
+            cursor = self._conn.execute("INSERT OR IGNORE INTO shared (key, value, expires_at) VALUES (?, ?, ?)",
+                                        (key, json.dumps(value, ensure_ascii=False), now + ttl))
+            return cursor.rowcount == 1
+
+    def delete(self, key):
+        """값 삭제 (없으면 무시)"""
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM shared WHERE key = ?", (key,))
+
+    def close(self):
+        """데이터베이스 연결 종료"""
+        with self._lock:
+            self._conn.close()
+
+class SingleFlight:
+    """같은 키의 작업을 세션과 프로세스를 통틀어 한 번만 수행하고 결과를 기다리는 모든 요청에 나눠 줌
+
+    run()의 encode/decode는 backend에 넣을 수 있는 JSON 값과 결과 사이의 변환이다(기본은 그대로).
+    """
+
+    def __init__(self, backend=None, lease_seconds=DEFAULT_LEASE_SECONDS, result_ttl=DEFAULT_RESULT_TTL,
+                 poll_interval=DEFAULT_POLL_INTERVAL):
+        self.backend = backend or MemoryBackend()
+        self.lease_seconds = lease_seconds
+        self.result_ttl = result_ttl
+        self.poll_interval = poll_interval
+        self.executed = 0  # 직접 수행한 작업 수
+        self.joined = 0  # 같은 프로세스에서 진행 중인 작업에 합류한 요청 수
+        self.remote = 0  # 다른 프로세스(또는 방금 끝난 작업)의 결과를 받은 요청 수
+        self._inflight = {}  # key -> 진행 중인 작업의 Future
+        self._lock = threading.Lock()
+
+    def run(self, key, compute, shareable=None, encode=None, decode=None, ttl=None):
+        """key의 결과를 반환 (아무도 수행 중이 아니면 compute()를 직접 수행, compute의 예외는 그대로 전달)
+
+        결과는 ttl초(기본 result_ttl, 0이면 보관하지 않음) 동안 backend에 남는다. shareable(결과)가 False인
+        결과(실패한 분석 등)는 함께 기다리던 요청에만 전달하고 backend에는 남기지 않는다.
+        """
+        with self._lock:
+            future = self._inflight.get(key)
+            if future is None:
+                future = self._inflight[key] = Future()
+                owner = True
+            else:
+                self.joined += 1
+                owner = False
+        if not owner:
+            return future.result()
+
+        try:
+            value = self._run_across_processes(key, compute, shareable, encode or (lambda v: v),
+                                               decode or (lambda v: v), self.result_ttl if ttl is None else ttl)
+        except BaseException as e:
+            with self._lock:
+                self._inflight.pop(key, None)
+            future.set_exception(e)
+            raise
+        with self._lock:
+            self._inflight.pop(key, None)
+        future.set_result(value)
+        return value
+
+    def _run_across_processes(self, key, compute, shareable, encode, decode, ttl):
+        """backend의 결과를 쓰거나, 임대를 얻어 직접 수행하거나, 다른 프로세스의 결과를 기다림"""
+        result_key, lease_key = f"result:{key}", f"lease:{key}"
+        token = uuid.uuid4().hex
+        while True:
+            stored = self.backend.get(result_key)
+            if stored is not None:
+                with self._lock:
+                    self.remote += 1
+                return decode(stored)
+            if self.backend.add(lease_key, token, self.lease_seconds):
+                break
+            # 다른 프로세스가 수행 중: 결과가 생기거나 임대가 풀릴(실패·만료) 때까지 대기
+            time.sleep(self.poll_interval)
+
+        with self._lock:
+            self.executed += 1
+        try:
+            value = compute()
+            if ttl > 0 and (shareable is None or shareable(value)):
+                self.backend.set(result_key, encode(value), ttl)
+        finally:
+            if self.backend.get(lease_key) == token:
+                self.backend.delete(lease_key)
+        return value
+
+    def stats(self):
+        """직접 수행/진행 중 작업 합류/공유 결과 사용 횟수와 진행 중인 작업 수"""
+        with self._lock:
+            return {"executed": self.executed, "joined": self.joined, "remote": self.remote,
+                    "inflight": len(self._inflight)}
+
+    def clear_stats(self):
+        """통계 초기화 (진행 중인 작업은 유지)"""
+        with self._lock:
+            self.executed = self.joined = self.remote = 0
@@ -1,13 +1,26 @@
 # streamlit_app.py
-import streamlit as st
-import requests
-import urllib.request
-import urllib.parse
-import json
-import time
+import os
 from datetime import datetime
-from openai import OpenAI
-from anthropic import Anthropic
+
+import streamlit as st
+from analysis_cache import AnalysisCache
+from archive import DEFAULT_ARCHIVE_DB_PATH, ArticleArchive
+from article_fetcher import DEFAULT_BODY_DB_PATH, DEFAULT_PER_DOMAIN_LIMIT, ArticleFetcher, BodyStore
+from bookmark_store import BookmarkStore, DEFAULT_BOOKMARK_DB_PATH
+from search_cache import SearchCache
+from shared_cache import SHARED_DB_ENV, SingleFlight, SQLiteBackend
+from client_pool import ClientRegistry
+from token_usage import TokenUsageLog
+from metrics import StageMetrics, prometheus_text, stage_name
+from resilience import DEFAULT_PROVIDER_LIMITS, ResilienceRegistry
+from relevance import TRIAGE_METHODS
+from clustering import DEFAULT_CLUSTER_THRESHOLD
+from watchlist import (DEFAULT_POLL_INTERVAL, DEFAULT_WATCHLIST_DB_PATH, WatchlistScheduler, WatchlistStore,
+                       watch_matches_search, watch_owner, watched_results)
+from news_pipeline import (
+    NewsPipeline, PipelineConfig, describe_search_error, DEFAULT_DIGEST_MAX_CLUSTERS,
+    DEFAULT_ANALYSIS_CACHE_PATH, ANALYSIS_CACHE_TTL_SECONDS, ANALYSIS_CACHE_MAX_ENTRIES
+)
 
 # 페이지 설정
 st.set_page_config(
@@ -16,31 +29,396 @@ st.set_page_config(
     layout="wide"
 )
 
+# 공유 자원 (앱 재실행과 세션 간에 유지)
+@st.cache_resource
+def get_analysis_cache():
+    """앱 재실행과 세션 간에 공유되는 분석 결과 캐시"""
+    return AnalysisCache(DEFAULT_ANALYSIS_CACHE_PATH, ANALYSIS_CACHE_TTL_SECONDS, ANALYSIS_CACHE_MAX_ENTRIES)
+
+analysis_cache = get_analysis_cache()
+
+@st.cache_resource
+def get_search_cache():
+    """세션 간에 공유되는 검색 결과 캐시 (동일 검색 요청은 한 번만 호출)"""
+    return SearchCache()
+
+search_cache = get_search_cache()
+
+@st.cache_resource
+def get_single_flight():
+    """세션 간에 같은 검색·기사 분석이 동시에 들어오면 한 번만 수행하고 결과를 나눠 주는 공유 계층
+
+    환경 변수 NEWS_AGENT_SHARED_DB에 SQLite 파일 경로를 주면 그 파일을 쓰는 다른 앱 프로세스와도 공유한다.
+    """
+    path = os.environ.get(SHARED_DB_ENV)
+    return SingleFlight(SQLiteBackend(path) if path else None)
+
+single_flight = get_single_flight()
+
+@st.cache_resource
+def get_client_registry():
+    """재실행 간에 연결 풀을 유지하는 API 클라이언트 레지스트리"""
+    return ClientRegistry()
+
+client_registry = get_client_registry()
+
+@st.cache_resource
+def get_bookmark_store():
+    """세션이 끝나도 유지되는 북마크 저장소"""
+    return BookmarkStore(DEFAULT_BOOKMARK_DB_PATH)
+
+bookmark_store = get_bookmark_store()
+
+@st.cache_resource
+def get_token_usage():
+    """AI 호출별 토큰 사용량 기록 (세션 간 공유)"""
+    return TokenUsageLog()
+
+token_usage = get_token_usage()
+
+@st.cache_resource
+def get_resilience():
+    """공급자별 요청 제한, 재시도, 서킷 브레이커, NewsAPI 일일 사용량 (세션 간 공유)"""
+    return ResilienceRegistry()
+
+resilience = get_resilience()
+
+@st.cache_resource
+def get_stage_metrics():
+    """검색, AI 호출, 파싱, 화면 표시 단계별 소요 시간 기록 (세션 간 공유)"""
+    return StageMetrics()
+
+stage_metrics = get_stage_metrics()
+
+@st.cache_resource
+def get_article_fetcher():
+    """기사 원문 수집기와 본문 저장소 (세션 간 공유, 사이트별 동시 연결 제한도 함께 적용)"""
+    return ArticleFetcher(BodyStore(DEFAULT_BODY_DB_PATH), client_registry, metrics=stage_metrics)
+
+article_fetcher = get_article_fetcher()
+
+@st.cache_resource
+def get_archive():
+    """검색하고 분석한 기사를 계속 쌓아 두는 로컬 아카이브 (세션 간 공유, API 호출 없이 지난 기사 검색)"""
+    return ArticleArchive(DEFAULT_ARCHIVE_DB_PATH)
+
+archive = get_archive()
+
+@st.cache_resource
+def get_watchlist_scheduler():
+    """관심 키워드 저장소와 백그라운드 수집기 (앱 프로세스가 살아 있는 동안 계속 실행)"""
+    return WatchlistScheduler(WatchlistStore(DEFAULT_WATCHLIST_DB_PATH))
+
+watchlist_scheduler = get_watchlist_scheduler()
+watchlist_store = watchlist_scheduler.store
+
 # 세션 상태 초기화
-if 'bookmarks' not in st.session_state:
-    st.session_state.bookmarks = []
-if 'bookmark_counter' not in st.session_state:
-    st.session_state.bookmark_counter = 0
-if 'bookmark_message' not in st.session_state:
-    st.session_state.bookmark_message = None
+if 'bookmark_page' not in st.session_state:
+    st.session_state.bookmark_page = 1
 if 'search_results' not in st.session_state:
     st.session_state.search_results = None
+if 'results_page' not in st.session_state:
+    st.session_state.results_page = 1
+if 'digest_result' not in st.session_state:
+    st.session_state.digest_result = None
 
 # 앱 제목
 st.title("AI 뉴스 요약 에이전트")
 st.markdown("네이버 뉴스 API와 NewsAPI를 활용한 스마트 뉴스 요약 서비스")
 st.markdown("---")
 
+# 사이드바 북마크 목록의 페이지당 개수
+BOOKMARKS_PER_PAGE = 10
+
+NEWS_SOURCE_CODES = {"네이버 뉴스": "naver", "NewsAPI": "newsapi", "네이버 + NewsAPI": "all"}
+
+# 북마크 추가 함수
+def add_bookmark(news, analysis):
+    """북마크 추가 함수 (URL 고유 인덱스로 중복 확인)"""
+    return bookmark_store.add(
+        title=news.title,
+        url=news.url,
+        summary=analysis.get('summary', ''),
+        source=news.source,
+        api_source=news.api_source
+    )
+
+def delete_bookmark(bookmark_id):
+    """북마크 삭제 버튼 콜백 (목록을 그리기 전에 실행되므로 다시 실행할 필요 없음)"""
+    bookmark_store.delete(bookmark_id)
+    st.toast("북마크가 삭제되었습니다!")
+
+def clear_bookmarks():
+    """전체 삭제 버튼 콜백"""
+    bookmark_store.clear()
+    st.toast("모든 북마크가 삭제되었습니다!")
+
+def add_watch(owner, news_source_code):
+    """관심 키워드 추가 버튼 콜백 (현재 API 자격 증명에 묶어 현재 선택한 뉴스 소스로 수집)"""
+    watch_keyword = st.session_state.new_watch_keyword.strip()
+    if not watch_keyword:
+        return
+    if watchlist_store.add(owner, watch_keyword, news_source_code):
+        watchlist_scheduler.poll_now(owner)
+        st.toast(f"'{watch_keyword}'을(를) 관심 키워드로 등록했습니다!")
+    else:
+        st.toast(f"'{watch_keyword}'의 뉴스 소스를 바꿨습니다.")
+    st.session_state.new_watch_keyword = ""
+
+def remove_watch(watch_id, watch_keyword):
+    """관심 키워드 삭제 버튼 콜백"""
+    watchlist_store.remove(watch_id)
+    st.toast(f"'{watch_keyword}'을(를) 관심 키워드에서 삭제했습니다.")
+
+@st.fragment
+def render_bookmark_list():
+    """사이드바 북마크 목록 (검색, 페이지 이동, 삭제 시 이 부분만 다시 실행)"""
+    # 북마크 검색 (제목/요약 전문 검색)
+    bookmark_query = st.text_input("북마크 검색", placeholder="제목이나 요약으로 검색", key="bookmark_query")
+    bookmark_total = bookmark_store.count(bookmark_query)
+    
+    # 북마크 전체 삭제 버튼
+    if bookmark_total and not bookmark_query:
+        col_clear1, col_clear2 = st.columns([1, 1])
+        with col_clear1:
+            st.button("🗑️ 전체 삭제", key="clear_all_bookmarks", on_click=clear_bookmarks)
+        with col_clear2:
+            st.write(f"총 {bookmark_total}개")
+    
+    # 북마크 목록 표시 (현재 페이지만 조회해서 그림)
+    if bookmark_total:
+        bookmark_pages = (bookmark_total + BOOKMARKS_PER_PAGE - 1) // BOOKMARKS_PER_PAGE
+        st.session_state.bookmark_page = min(st.session_state.bookmark_page, bookmark_pages)
+        if bookmark_pages > 1:
+            bookmark_page = st.number_input(f"페이지 (총 {bookmark_pages}쪽, {bookmark_total}개)",
+                                            min_value=1, max_value=bookmark_pages, key="bookmark_page")
+        else:
+            bookmark_page = 1
+    
+        for bookmark in bookmark_store.list(bookmark_query, BOOKMARKS_PER_PAGE,
+                                            (bookmark_page - 1) * BOOKMARKS_PER_PAGE):
+            with st.expander(f"📌 {bookmark['title'][:25]}..."):
+                st.write(f"**요약:** {bookmark['summary'][:100]}...")
+                st.write(f"**출처:** {bookmark['source']}")
+                st.write(f"**저장 시간:** {bookmark.get('saved_at', '정보 없음')}")
+    
+                col1, col2 = st.columns([1, 1])
+                with col1:
+                    if st.button("🔗 원문 보기", key=f"view_bookmark_{bookmark['id']}"):
+                        st.markdown(f"[원문 링크]({bookmark['url']})")
+                with col2:
+                    st.button("❌ 삭제", key=f"delete_bookmark_{bookmark['id']}",
+                              on_click=delete_bookmark, args=(bookmark['id'],))
+    elif bookmark_query:
+        st.info("검색어에 맞는 북마크가 없습니다.")
+    else:
+        st.info("저장된 뉴스가 없습니다.")
+
+# 결과 카드 뷰 모델
+def build_card_view(news, analysis=None, relevance=None):
+    """카드를 그릴 때마다 반복하지 않도록 날짜 형식, 감정/키워드 표시 값을 미리 계산"""
+    view = {
+        "title": news.title,
+        "description": news.description,
+        "source": news.source or '정보 없음',
+        "date": news.published_date,
+        "api_source": news.api_source.upper(),
+        "url": news.url,
+        "analyzed": analysis is not None,
+        "relevance": f"{relevance:.2f}" if relevance is not None else None
+    }
+    if analysis is None:
+        return view
+    
+    view["summary"] = analysis.get('summary', '요약 없음')
+    view["error"] = analysis.get('error')
+    if 'sentiment' in analysis:
+        view["sentiment"] = sentiment_style(analysis['sentiment'])
+    if 'keywords' in analysis:
+        view["keyword_tags"] = keyword_tags(analysis['keywords'])
+    return view
+
+def sentiment_style(sentiment):
+    """감정 분석 결과의 (표시 스타일, 이모지를 붙인 문구)"""
+    if '긍정' in sentiment:
+        return "success", f"😊 {sentiment}"
+    if '부정' in sentiment:
+        return "error", f"😔 {sentiment}"
+    return "info", f"😐 {sentiment}"
+
+def keyword_tags(keywords):
+    """쉼표로 구분된 키워드를 태그 표기로 변환 (최대 5개)"""
+    return " ".join(f"`{kw.strip()}`" for kw in keywords.split(',')[:5])
+
+def show_sentiment_box(style, text):
+    """sentiment_style 결과를 스타일에 맞는 상자로 표시"""
+    if style == "success":
+        st.success(text)
+    elif style == "error":
+        st.error(text)
+    else:
+        st.info(text)
+
+def make_result_item(news, analysis=None, relevance=None):
+    """세션 상태에 저장할 검색 결과 항목 (원본, 분석 결과, 검색어 관련도, 카드 뷰 모델)"""
+    return {"original": news, "analysis": analysis, "relevance": relevance,
+            "view": build_card_view(news, analysis, relevance)}
+
+@st.fragment
+def render_result_card(i, item, show_sentiment, show_keywords):
+    """기사 카드 하나 (저장/분석 버튼을 누르면 이 카드만 다시 실행)"""
+    news = item["original"]
+    view = item["view"]
+    
+    with st.container():
+        st.subheader(f"{i+1}. {view['title']}")
+        
+        # 뉴스 정보 및 분석 결과
+        col1, col2 = st.columns([1, 4])
+        with col1:
+            st.write(f"**출처:** {view['source']}")
+            st.write(f"**날짜:** {view['date']}")
+            st.write(f"**API:** {view['api_source']}")
+            if view["relevance"] is not None:
+                st.write(f"**관련도:** {view['relevance']}")
+            
+            # 북마크 버튼 - 고유한 키 사용
+            if st.button(f"📑 저장", key=f"bookmark_{view['url']}_{i}"):
+                if add_bookmark(news, item["analysis"] or {}):
+                    st.toast("뉴스가 저장되었습니다!", icon="📑")
+                else:
+                    st.toast("이미 저장된 뉴스입니다!", icon="⚠️")
+        
+        with col2:
+            st.write(f"**원문:** {view['description']}")
+            if not view["analyzed"]:
+                # 요청한 기사만 분석 (제목/설명만 먼저 표시하고, 분석이 끝나면 버튼 자리에 결과 표시)
+                if view["relevance"] is not None:
+                    st.caption("검색어 관련도가 낮아 요약을 생략했습니다.")
+                analyze_slot = st.empty()
+                if analyze_slot.button("🤖 AI 분석", key=f"analyze_{view['url']}_{i}"):
+                    with st.spinner("분석 중입니다..."):
+                        item.update(make_result_item(news, pipeline.analyze_articles([news])[0], item.get("relevance")))
+                    analyze_slot.empty()
+                    view = item["view"]
+            if view["analyzed"]:
+                if view["error"]:
+                    st.error(view["error"])
+                st.write("**AI 요약:**")
+                st.info(view["summary"])
+                
+                # 감정 분석 결과
+                if show_sentiment and "sentiment" in view:
+                    st.write("**감정 분석:**")
+                    show_sentiment_box(*view["sentiment"])
+                
+                # 키워드 추출 결과
+                if show_keywords and "keyword_tags" in view:
+                    st.write("**주요 키워드:**")
+                    st.markdown(view["keyword_tags"])
+        
+        # 원문 링크
+        st.markdown(f"[원문 보기]({view['url']})")
+        st.divider()
+
+# 주제별 묶음 요약
+def run_digest(pipeline, keyword, news_results):
+    """기사를 주제별로 묶어 요약하고 세션 상태에 저장 (기사별 결과 화면은 비움)"""
+    progress_bar = st.progress(0)
+    digest = pipeline.digest(keyword, news_results,
+                             on_progress=lambda done, total: progress_bar.progress(done / total))
+    progress_bar.empty()
+    for error_message in digest["errors"]:
+        st.error(error_message)
+    st.session_state.digest_result = {"digest": digest, "articles": news_results}
+    st.session_state.search_results = None
+
+def run_timeline(pipeline, keyword, streaming):
+    """최신순 통합 타임라인을 받는 대로 미리보기 카드로 그리고 최신 기사부터 분석한 뒤 세션 상태에 저장"""
+    fetch_status = st.empty()
+    stream_preview = st.empty()
+    preview = stream_preview.container()
+    summary_slots = []
+    detail_slots = []
+    
+    def show_article(i, news):
+        with preview:
+            st.markdown(f"**{i+1}. {news.title}** · {news.source} · {news.published_date}")
+            summary_slots.append(st.empty())
+            detail_slots.append(st.empty())
+        summary_slots[i].caption("분석 대기 중...")
+        fetch_status.info(f"최신 기사부터 {i + 1}개를 받았습니다...")
+    
+    def show_partial_summary(i, text):
+        summary_slots[i].info(text + " ▌")
+    
+    def show_finished_analysis(i, analysis):
+        summary_slots[i].info(analysis.get('summary', '요약 없음'))
+        details = [analysis[key] for key in ('sentiment', 'keywords') if key in analysis]
+        if details:
+            detail_slots[i].caption(" | ".join(details))
+    
+    news_results, analyses, search_errors = pipeline.analyze_timeline(
+        keyword, on_article=show_article, on_delta=show_partial_summary if streaming else None,
+        on_result=show_finished_analysis
+    )
+    fetch_status.empty()
+    stream_preview.empty()
+    for error_message in search_errors:
+        st.error(error_message)
+    if news_results:
+        st.success(f"최신 기사 {len(news_results)}개를 게시 시각순으로 받아 분석했습니다.")
+        st.session_state.search_results = [make_result_item(news, analysis)
+                                           for news, analysis in zip(news_results, analyses)]
+    else:
+        st.info("검색 결과가 없습니다. 다른 키워드로 시도해보세요.")
+        st.session_state.search_results = None
+    st.session_state.results_page = 1
+    st.session_state.digest_result = None
+
+def render_article_links(articles, indices):
+    """기사 순번 목록을 제목 링크, 출처, 날짜 한 줄씩으로 표시"""
+    for i in indices:
+        news = articles[i]
+        st.markdown(f"- [{news.title}]({news.url}) · {news.source or '정보 없음'} · {news.published_date}")
+
+def render_digest(digest, articles, show_sentiment, show_keywords):
+    """전체 브리핑, 주제별 요약과 주제마다 묶인 기사 목록 표시"""
+    if digest["briefing"]:
+        st.subheader("🧭 전체 브리핑")
+        st.info(digest["briefing"])
+    
+    for number, topic in enumerate(digest["topics"], start=1):
+        with st.container():
+            st.subheader(f"{number}. {topic['headline']} (기사 {len(topic['articles'])}개)")
+            if topic.get('error'):
+                st.error(topic['error'])
+            st.info(topic['summary'])
+            if show_sentiment and 'sentiment' in topic:
+                show_sentiment_box(*sentiment_style(topic['sentiment']))
+            if show_keywords and 'keywords' in topic:
+                st.markdown(keyword_tags(topic['keywords']))
+            with st.expander("묶인 기사 보기"):
+                render_article_links(articles, topic["articles"])
+            st.divider()
+    
+    if digest["other"]:
+        with st.expander(f"기타 기사 {len(digest['other'])}개 (요약하지 않은 작은 주제)"):
+            render_article_links(articles, digest["other"])
+
 # 사이드바에 API 설정 폼 추가
 with st.sidebar:
     st.header("API 설정")
     
     # 뉴스 소스 선택
     st.subheader("뉴스 소스 선택")
-    news_source = st.radio("사용할 뉴스 API", ["네이버 뉴스", "NewsAPI"])
+    news_source = st.radio("사용할 뉴스 API", ["네이버 뉴스", "NewsAPI", "네이버 + NewsAPI"],
+                           help="'네이버 + NewsAPI'는 두 소스를 동시에 검색하고 중복 기사를 제외합니다")
+    use_naver = news_source in ("네이버 뉴스", "네이버 + NewsAPI")
+    use_newsapi = news_source in ("NewsAPI", "네이버 + NewsAPI")
     
     # 네이버 API 설정
-    if news_source == "네이버 뉴스":
+    if use_naver:
         st.subheader("네이버 뉴스 API")
         naver_client_id = st.text_input("Naver Client ID", type="password", 
                                         help="네이버 개발자센터에서 발급받은 Client ID를 입력하세요")
@@ -52,14 +430,12 @@ with st.sidebar:
         - 애플리케이션 등록 시 '검색' API 선택
         - 웹 서비스 URL은 로컬 테스트의 경우 http://localhost 입력
         """)
-        newsapi_key = None
-        newsapi_language = "ko"
     else:
         naver_client_id = None
         naver_client_secret = None
     
     # NewsAPI 설정
-    if news_source == "NewsAPI":
+    if use_newsapi:
         st.subheader("NewsAPI")
         newsapi_key = st.text_input("NewsAPI Key", type="password",
                                    help="NewsAPI에서 발급받은 API 키를 입력하세요")
@@ -79,6 +455,16 @@ with st.sidebar:
         newsapi_key = None
         newsapi_language = "ko"
     
+    # 검색 캐시 설정
+    with st.expander("🗂️ 검색 캐시"):
+        search_cache_ttl = st.slider("검색 결과 유지 시간(분)", min_value=0, max_value=60, value=5,
+                                     help="같은 조건의 검색은 이 시간 동안 API를 다시 호출하지 않습니다") * 60
+        serve_stale_search = st.checkbox("만료된 결과 먼저 표시 후 갱신", value=False,
+                                         help="유지 시간이 지난 결과를 바로 보여주고 백그라운드에서 새로 가져옵니다")
+        search_stats = search_cache.stats()
+        st.write(f"적중 {search_stats['hits']}회 / 만료 제공 {search_stats['stale_hits']}회 / "
+                 f"미스 {search_stats['misses']}회 / 병합 {search_stats['coalesced']}회")
+    
     # AI 모델 설정
     st.subheader("AI 모델 API")
     model_type = st.radio("사용할 AI 모델", ["OpenAI", "Anthropic"])
@@ -94,309 +480,263 @@ with st.sidebar:
         st.markdown("[Anthropic API 키 발급받기](https://console.anthropic.com/)")
         ai_model = "claude-3-haiku-20240307"
     
+    max_concurrency = st.slider("동시 분석 요청 수", min_value=1, max_value=10, value=4,
+                                help="한 번에 AI 모델로 보내는 분석 요청의 최대 개수입니다")
+    enable_batching = st.checkbox("여러 기사 묶어서 분석", value=False,
+                                  help="여러 기사를 한 요청으로 분석해 요청 수를 줄입니다 (토큰 단위 스트리밍은 꺼집니다)")
+    if enable_batching:
+        batch_token_budget = st.number_input("묶음당 토큰 예산", min_value=1000, max_value=16000, value=4000, step=500,
+                                             help="입력과 예상 출력 토큰의 합이 이 값을 넘지 않도록 기사를 묶습니다")
+    enable_triage = st.checkbox("관련도 낮은 기사 요약 생략", value=False,
+                                help="검색어와 제목/설명의 관련도를 로컬에서 계산해 관련 있는 기사만 AI로 요약합니다")
+    if enable_triage:
+        triage_method = st.selectbox("관련도 계산 방식", list(TRIAGE_METHODS),
+                                     format_func=lambda method: {"bm25": "BM25", "tfidf": "TF-IDF 코사인"}[method])
+        triage_min_score = st.slider("최소 관련도", min_value=0.0, max_value=1.0, value=0.2, step=0.05)
+        triage_top_n = st.number_input("관련도 상위 몇 개만 요약 (0이면 제한 없음)", min_value=0, max_value=100, value=0)
+    analysis_engine = st.radio("감정/키워드 분석 엔진", ["AI 모델", "로컬 엔진"], horizontal=True,
+                               help="로컬 엔진은 감정 사전과 TF-IDF로 검색 결과 전체를 한 번에 계산하고 AI는 요약만 만듭니다")
+    fetch_full_text = st.checkbox("기사 원문으로 분석", value=False,
+                                  help="검색 결과의 짧은 설명 대신 기사 페이지에서 본문을 가져와 요약합니다 (본문 수집과 분석을 동시에 진행)")
+    if fetch_full_text:
+        max_body_tokens = st.slider("원문 최대 토큰", min_value=500, max_value=4000, value=1500, step=250,
+                                    help="프롬프트에 넣는 본문의 길이 한도입니다")
+    
+    # 연결 설정
+    with st.expander("🔌 연결 설정"):
+        pool_size = st.slider("연결 풀 크기", min_value=1, max_value=20, value=10,
+                              help="API별로 유지하는 keep-alive 연결의 최대 개수입니다")
+        connect_timeout = st.number_input("연결 타임아웃(초)", min_value=1.0, max_value=30.0, value=5.0, step=1.0)
+        read_timeout = st.number_input("응답 타임아웃(초)", min_value=5.0, max_value=180.0, value=60.0, step=5.0)
+        client_registry.configure(pool_size, connect_timeout, read_timeout)
+        per_domain_limit = st.slider("사이트별 동시 연결 수 (원문 수집)", min_value=1, max_value=8,
+                                     value=DEFAULT_PER_DOMAIN_LIMIT,
+                                     help="같은 언론사 사이트에 한 번에 여는 연결 수입니다")
+        article_fetcher.configure(per_domain_limit)
+        fetch_stats = article_fetcher.stats
+        st.write(f"원문 수집 {fetch_stats['fetched']}건 / 저장본 사용 {fetch_stats['stored']}건 / "
+                 f"실패 {fetch_stats['failed']}건 / {fetch_stats['bytes'] / 1024:,.0f}KB")
+        if article_fetcher.last_error:
+            st.caption(article_fetcher.last_error)
+    
+    # 요청 제한 (공급자별 속도 제한, 429 대응, 서킷 브레이커, 일일 한도)
+    with st.expander("🛡️ 요청 제한"):
+        model_provider = model_type.lower()
+        llm_rpm = st.number_input(f"{model_type} 분당 최대 요청 수", min_value=1, max_value=10000,
+                                  value=DEFAULT_PROVIDER_LIMITS[model_provider]["requests_per_minute"], step=10,
+                                  key=f"llm_rpm_{model_provider}",
+                                  help="계정 등급의 요청 한도에 맞추면 429 오류 없이 가장 빠르게 분석합니다")
+        resilience.guard(model_provider).configure(requests_per_minute=llm_rpm)
+        circuit_labels = {"closed": "정상", "open": "일시 중단", "half_open": "회복 확인 중"}
+        for guard in resilience.status():
+            if not guard["calls"] and not guard["rejected"]:
+                continue
+            st.write(f"{guard['provider']}: 호출 {guard['calls']}회 / 429 {guard['throttled']}회 / "
+                     f"재시도 {guard['retries']}회 / 동시 {guard['concurrency_limit']}/{guard['max_concurrency']} / "
+                     f"{circuit_labels[guard['circuit']]}")
+        quota_used, quota_limit = resilience.guard("newsapi").quota.usage()
+        st.write(f"NewsAPI 오늘 사용량: {quota_used:,}/{quota_limit:,}회 (UTC 기준)")
+    
+    # 분석 캐시 상태
+    with st.expander("🗄️ 분석 캐시"):
+        cache_stats = analysis_cache.stats()
+        st.write(f"저장된 분석: {cache_stats['entries']}개")
+        st.write(f"적중 {cache_stats['hits']}회 / 미스 {cache_stats['misses']}회 (적중률 {cache_stats['hit_rate']:.0%})")
+        if st.button("캐시 비우기", key="clear_analysis_cache"):
+            analysis_cache.clear()
+            st.rerun()
+    
+    # 기사 아카이브 (지난 검색 결과와 분석을 API 호출 없이 다시 찾기)
+    ARCHIVE_PERIODS = {"전체 기간": 0, "최근 24시간": 24, "최근 7일": 24 * 7, "최근 30일": 24 * 30}
+    with st.expander("🗃️ 기사 아카이브"):
+        archive_first = st.checkbox("아카이브에서 먼저 찾기", value=False,
+                                    help="예전에 검색한 기사 중 검색어에 맞는 기사가 있으면 API를 호출하지 않고 보여줍니다")
+        archive_period = st.selectbox("찾을 기사 게시 기간", list(ARCHIVE_PERIODS), disabled=not archive_first)
+        archive_stats = archive.stats()
+        st.write(f"저장된 기사 {archive_stats['articles']:,}개 / 분석 {archive_stats['analyses']:,}개 / "
+                 f"색인 단어 {archive_stats['tokens']:,}개")
+    
+    # 토큰 사용량 (입력/출력 토큰과 예상 비용)
+    with st.expander("📊 토큰 사용량"):
+        max_description_tokens = st.slider("기사 내용 최대 토큰", min_value=100, max_value=1000, value=300, step=50,
+                                           help="프롬프트에 넣는 기사 내용을 이 길이로 잘라 입력 토큰을 줄입니다")
+        usage = token_usage.summary()
+        st.write(f"AI 호출 {usage['calls']}회 / 입력 {usage['input_tokens']:,} / 출력 {usage['output_tokens']:,} 토큰")
+        st.write(f"평균 응답 {usage['avg_latency']:.2f}초 / 예상 비용 ${usage['cost']:.4f}")
+        if st.button("기록 지우기", key="clear_token_usage"):
+            token_usage.clear()
+            st.rerun()
+    
+    # 진단 (단계별 소요 시간, 캐시 적중, 재시도, 지표 내보내기)
+    with st.expander("⏱️ 진단"):
+        stage_rows = stage_metrics.summary()
+        if not stage_rows:
+            st.caption("아직 기록이 없습니다. 검색하면 단계별 소요 시간이 표시됩니다.")
+        for row in stage_rows:
+            st.write(f"{stage_name(row)}: {row['count']}회 · p50 {row['p50']:.2f}초 / p95 {row['p95']:.2f}초 / "
+                     f"p99 {row['p99']:.2f}초" + (f" · 오류 {row['errors']}회" if row['errors'] else ""))
+        search_stats = search_cache.stats()
+        search_lookups = search_stats['hits'] + search_stats['stale_hits'] + search_stats['misses']
+        search_hit_rate = (search_stats['hits'] + search_stats['stale_hits']) / search_lookups if search_lookups else 0.0
+        st.write(f"검색 캐시 적중률 {search_hit_rate:.0%} / 분석 캐시 적중률 {analysis_cache.stats()['hit_rate']:.0%} / "
+                 f"재시도 {sum(guard['retries'] for guard in resilience.status())}회")
+        flight_stats = single_flight.stats()
+        st.write(f"세션 간 공유: 직접 수행 {flight_stats['executed']}회 / 진행 중 작업 합류 {flight_stats['joined']}회 / "
+                 f"공유 결과 사용 {flight_stats['remote']}회")
+        st.download_button("Prometheus 지표 내려받기",
+                           prometheus_text(stage_metrics, token_usage, search_cache, analysis_cache, resilience,
+                                           single_flight),
+                           file_name="news_agent_metrics.prom", mime="text/plain")
+        st.download_button("구조화 로그 내려받기 (JSONL)", stage_metrics.events_jsonl(),
+                           file_name="news_agent_stages.jsonl", mime="application/x-ndjson")
+        if st.button("기록 지우기", key="clear_stage_metrics"):
+            stage_metrics.clear()
+            single_flight.clear_stats()
+            st.rerun()
+    
+    # 관심 키워드 (백그라운드에서 새 기사를 모아 미리 분석, 입력한 API 키 조합별로 따로 관리)
+    api_credentials = dict(
+        naver_client_id=naver_client_id or "",
+        naver_client_secret=naver_client_secret or "",
+        newsapi_key=newsapi_key or "",
+        openai_api_key=openai_api_key if model_type == "OpenAI" else "",
+        anthropic_api_key=anthropic_api_key if model_type == "Anthropic" else ""
+    )
+    watch_owner_id = watch_owner(**api_credentials)
+    with st.expander("👀 관심 키워드"):
+        st.text_input("키워드 추가", placeholder="예: 반도체, 금리", key="new_watch_keyword")
+        st.button("추가", key="add_watch", on_click=add_watch, args=(watch_owner_id, NEWS_SOURCE_CODES[news_source]))
+        poll_minutes = st.slider("확인 간격(분)", min_value=1, max_value=60, value=DEFAULT_POLL_INTERVAL // 60,
+                                 help="관심 키워드의 새 기사를 이 간격으로 확인하고 미리 분석합니다")
+        watch_workers = st.slider("동시에 확인할 키워드 수", min_value=1, max_value=5, value=2)
+        for watch in watchlist_store.list(watch_owner_id):
+            last_polled = (datetime.fromtimestamp(watch['last_polled_at']).strftime('%H:%M')
+                           if watch['last_polled_at'] else "대기 중")
+            col_watch, col_remove = st.columns([4, 1])
+            with col_watch:
+                st.write(f"**{watch['keyword']}** · 기사 {watch['article_count']}개 · "
+                         f"최근 확인 {last_polled} (새 기사 {watch['last_new_count']}개)")
+                if watch['last_error']:
+                    st.caption(watch['last_error'])
+            with col_remove:
+                st.button("✕", key=f"remove_watch_{watch['id']}", on_click=remove_watch,
+                          args=(watch['id'], watch['keyword']))
+        st.button("지금 확인", key="poll_watchlist", on_click=watchlist_scheduler.poll_now, args=(watch_owner_id,))
+        if watchlist_scheduler.last_error:
+            st.caption(watchlist_scheduler.last_error)
+    
     # 북마크 표시
     st.markdown("---")
     st.subheader("📑 저장된 뉴스")
     
-    # 북마크 전체 삭제 버튼
-    if st.session_state.bookmarks:
-        col_clear1, col_clear2 = st.columns([1, 1])
-        with col_clear1:
-            if st.button("🗑️ 전체 삭제", key="clear_all_bookmarks"):
-                st.session_state.bookmarks = []
-                st.success("모든 북마크가 삭제되었습니다!")
-                st.rerun()
-        with col_clear2:
-            st.write(f"총 {len(st.session_state.bookmarks)}개")
-    
-    # 북마크 목록 표시
-    if st.session_state.bookmarks:
-        for i, bookmark in enumerate(st.session_state.bookmarks):
-            with st.expander(f"📌 {bookmark['title'][:25]}..."):
-                st.write(f"**요약:** {bookmark['summary'][:100]}...")
-                st.write(f"**출처:** {bookmark['source']}")
-                st.write(f"**저장 시간:** {bookmark.get('saved_at', '정보 없음')}")
-                
-                col1, col2 = st.columns([1, 1])
-                with col1:
-                    if st.button("🔗 원문 보기", key=f"view_bookmark_{i}"):
-                        st.markdown(f"[원문 링크]({bookmark['url']})")
-                with col2:
-                    if st.button("❌ 삭제", key=f"delete_bookmark_{i}"):
-                        st.session_state.bookmarks.pop(i)
-                        st.success("북마크가 삭제되었습니다!")
-                        st.rerun()
-    else:
-        st.info("저장된 뉴스가 없습니다.")
-
-# 북마크 추가 함수
-def add_bookmark(news, analysis):
-    """북마크 추가 함수"""
-    bookmark_data = {
-        "title": news['title'].replace('<b>', '').replace('</b>', ''),
-        "summary": analysis.get('summary', ''),
-        "source": news.get('source', ''),
-        "url": news['url'],
-        "saved_at": datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
-        "api_source": news.get('api_source', ''),
-        "id": st.session_state.bookmark_counter
-    }
-    
-    # 중복 확인 (URL 기준)
-    existing_urls = [bookmark['url'] for bookmark in st.session_state.bookmarks]
-    if bookmark_data['url'] not in existing_urls:
-        st.session_state.bookmarks.append(bookmark_data)
-        st.session_state.bookmark_counter += 1
-        return True
-    return False
+    render_bookmark_list()
 
 # 메인 화면
 # 검색어 입력
 keyword = st.text_input("검색할 뉴스 키워드를 입력하세요", placeholder="예: 인공지능, 기후변화, 경제")
 
+# 대량 검색: 네이버 뉴스를 100개씩 페이지로 받아오고 분석은 화면에 보이는 기사만 수행
+bulk_search = news_source == "네이버 뉴스" and st.checkbox(
+    "대량 검색 (모니터링)", value=False,
+    help="최대 1,000개까지 가져오고, 보고 있는 페이지의 기사나 직접 요청한 기사만 AI로 분석합니다"
+)
+
 # 검색 옵션 설정
 col1, col2, col3 = st.columns(3)
 with col1:
-    display_count = st.slider("요약할 뉴스 개수", min_value=1, max_value=10, value=5)
+    if bulk_search:
+        display_count = st.number_input("가져올 뉴스 개수", min_value=10, max_value=1000, value=100, step=10)
+    else:
+        display_count = st.slider("요약할 뉴스 개수", min_value=1, max_value=10, value=5)
 with col2:
     sort_option = st.selectbox("정렬 기준", ["정확도순", "최신순"], index=0)
     sort_value = "sim" if sort_option == "정확도순" else "date"
+    # 최신순이면 소스별 결과를 게시 시각으로 합쳐 받는 대로 최신 기사부터 분석
+    unified_timeline = sort_value == "date" and not bulk_search and st.checkbox(
+        "통합 타임라인", value=False,
+        help="여러 소스의 기사를 게시 시각 하나의 순서로 합쳐, 최신 기사부터 받는 대로 분석하고 보여줍니다"
+    )
 with col3:
     summary_length = st.selectbox("요약 길이", ["짧게", "보통", "자세히"], index=1)
 
 # 분석 옵션
-col4, col5 = st.columns(2)
+col4, col5, col6 = st.columns(3)
 with col4:
     enable_sentiment = st.checkbox("감정 분석 포함", value=True)
 with col5:
     enable_keywords = st.checkbox("키워드 추출 포함", value=True)
+with col6:
+    enable_streaming = st.checkbox("실시간 스트리밍 표시", value=True,
+                                   help="요약이 생성되는 대로 바로 보여줍니다")
 
-# 북마크 메시지 표시
-if st.session_state.bookmark_message:
-    if st.session_state.bookmark_message['type'] == 'success':
-        st.success(st.session_state.bookmark_message['text'])
-    elif st.session_state.bookmark_message['type'] == 'warning':
-        st.warning(st.session_state.bookmark_message['text'])
-    # 메시지 표시 후 초기화
-    st.session_state.bookmark_message = None
+# 요약 방식: 기사별 요약 또는 비슷한 기사를 묶어 주제마다 한 번 요약
+summary_mode = st.radio("요약 방식", ["기사별 요약", "주제별 묶음 요약"], horizontal=True,
+                        help="주제별 묶음 요약은 같은 사건을 다룬 기사를 묶어 주제마다 한 번만 AI로 요약하고 전체 브리핑을 만듭니다")
+digest_mode = summary_mode == "주제별 묶음 요약"
+if digest_mode:
+    col7, col8, col9 = st.columns(3)
+    with col7:
+        digest_threshold = st.slider("같은 주제로 묶을 최소 유사도", min_value=0.1, max_value=0.9,
+                                     value=DEFAULT_CLUSTER_THRESHOLD, step=0.05,
+                                     help="높일수록 더 비슷한 기사끼리만 묶습니다")
+    with col8:
+        digest_max_clusters = st.number_input("요약할 최대 주제 수", min_value=1, max_value=20,
+                                              value=DEFAULT_DIGEST_MAX_CLUSTERS)
+    with col9:
+        digest_briefing = st.checkbox("전체 브리핑 생성", value=True, help="주제별 요약을 모아 한 번 더 요약합니다")
 
 # 검색 버튼
 search_pressed = st.button("뉴스 검색 및 요약", type="primary")
 
-# 뉴스 검색 및 요약 함수
-def search_naver_news(keyword, display=5, sort='sim'):
-    """네이버 뉴스 API를 사용해 뉴스 검색"""
-    encText = urllib.parse.quote(keyword)
-    url = f"https://openapi.naver.com/v1/search/news?query={encText}&display={display}&sort={sort}"
-    
-    request = urllib.request.Request(url)
-    request.add_header("X-Naver-Client-Id", naver_client_id)
-    request.add_header("X-Naver-Client-Secret", naver_client_secret)
-    
-    try:
-        response = urllib.request.urlopen(request)
-        rescode = response.getcode()
-        
-        if rescode == 200:
-            response_body = response.read()
-            response_data = json.loads(response_body.decode('utf-8'))
-            items = response_data.get('items', [])
-            
-            # 네이버 API 결과를 표준 형태로 변환
-            standardized_items = []
-            for item in items:
-                standardized_items.append({
-                    'title': item.get('title', ''),
-                    'description': item.get('description', ''),
-                    'url': item.get('link', ''),
-                    'source': item.get('source', '네이버 뉴스'),
-                    'publishedAt': item.get('pubDate', ''),
-                    'api_source': 'naver'
-                })
-            
-            return standardized_items
-        else:
-            st.error(f"네이버 API 요청 실패: 응답 코드 {rescode}")
-            return []
-    except Exception as e:
-        st.error(f"네이버 API 요청 중 오류 발생: {str(e)}")
-        return []
-
-def search_newsapi(keyword, page_size=5, sort_by='relevancy', language='ko'):
-    """NewsAPI를 사용해 뉴스 검색"""
-    url = "https://newsapi.org/v2/everything"
-    
-    params = {
-        'q': keyword,
-        'pageSize': page_size,
-        'sortBy': 'relevancy' if sort_by == 'sim' else 'publishedAt',
-        'language': language,
-        'apiKey': newsapi_key
-    }
-    
-    try:
-        response = requests.get(url, params=params)
-        
-        if response.status_code == 200:
-            data = response.json()
-            articles = data.get('articles', [])
-            
-            # NewsAPI 결과를 표준 형태로 변환
-            standardized_articles = []
-            for article in articles:
-                standardized_articles.append({
-                    'title': article.get('title', ''),
-                    'description': article.get('description', ''),
-                    'url': article.get('url', ''),
-                    'source': article.get('source', {}).get('name', 'NewsAPI'),
-                    'publishedAt': article.get('publishedAt', ''),
-                    'api_source': 'newsapi'
-                })
-            
-            return standardized_articles
-        else:
-            st.error(f"NewsAPI 요청 실패: {response.status_code} - {response.text}")
-            return []
-    except Exception as e:
-        st.error(f"NewsAPI 요청 중 오류 발생: {str(e)}")
-        return []
-
-def get_summary_prompt(title, description, length):
-    """요약 길이에 따른 프롬프트 생성"""
-    if length == "짧게":
-        return f"""다음 뉴스 기사를 1-2문장으로 핵심만 간단히 요약해주세요.
-        
-        제목: {title}
-        내용: {description}
-        
-        요약:"""
-    elif length == "보통":
-        return f"""다음 뉴스 기사를 3-4문장으로 요약해주세요. 핵심 정보만 간결하게 포함하세요.
-        
-        제목: {title}
-        내용: {description}
-        
-        요약:"""
-    else:  # 자세히
-        return f"""다음 뉴스 기사를 5-6문장으로 자세히 요약해주세요. 배경 정보와 세부 내용을 포함하세요.
-        
-        제목: {title}
-        내용: {description}
-        
-        요약:"""
-
-def analyze_with_openai(news, length, include_sentiment=False, include_keywords=False):
-    """OpenAI API를 사용해 뉴스 기사 분석"""
-    title = news.get('title', '').replace('<b>', '').replace('</b>', '')
-    description = news.get('description', '').replace('<b>', '').replace('</b>', '')
-    
-    client = OpenAI(api_key=openai_api_key)
-    
-    # 기본 요약 프롬프트
-    summary_prompt = get_summary_prompt(title, description, length)
-    
-    try:
-        # 요약 생성
-        summary_response = client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[
-                {"role": "system", "content": "당신은 뉴스 요약 전문가입니다. 핵심 정보를 간결하고 정확하게 요약해주세요."},
-                {"role": "user", "content": summary_prompt}
-            ],
-            temperature=0.3,
-            max_tokens=300
-        )
-        summary = summary_response.choices[0].message.content.strip()
-        
-        result = {"summary": summary}
-        
-        # 감정 분석
-        if include_sentiment:
-            sentiment_prompt = f"""다음 뉴스의 전체적인 감정을 분석해주세요. '긍정', '부정', '중립' 중 하나로 답하고, 한 줄로 이유를 설명해주세요.
-            
-            제목: {title}
-            내용: {description}"""
-            
-            sentiment_response = client.chat.completions.create(
-                model="gpt-4o-mini",
-                messages=[
-                    {"role": "system", "content": "당신은 텍스트 감정 분석 전문가입니다."},
-                    {"role": "user", "content": sentiment_prompt}
-                ],
-                temperature=0.1,
-                max_tokens=100
-            )
-            result["sentiment"] = sentiment_response.choices[0].message.content.strip()
-        
-        # 키워드 추출
-        if include_keywords:
-            keywords_prompt = f"""다음 뉴스에서 가장 중요한 키워드 5개를 추출해주세요. 쉼표로 구분해서 나열해주세요.
-            
-            제목: {title}
-            내용: {description}"""
-            
-            keywords_response = client.chat.completions.create(
-                model="gpt-4o-mini",
-                messages=[
-                    {"role": "system", "content": "당신은 키워드 추출 전문가입니다."},
-                    {"role": "user", "content": keywords_prompt}
-                ],
-                temperature=0.1,
-                max_tokens=100
-            )
-            result["keywords"] = keywords_response.choices[0].message.content.strip()
-        
-        return result
-    except Exception as e:
-        st.error(f"OpenAI API 요청 중 오류 발생: {str(e)}")
-        return {"summary": "분석을 생성할 수 없습니다."}
-
-def analyze_with_anthropic(news, length, include_sentiment=False, include_keywords=False):
-    """Anthropic API를 사용해 뉴스 기사 분석"""
-    title = news.get('title', '').replace('<b>', '').replace('</b>', '')
-    description = news.get('description', '').replace('<b>', '').replace('</b>', '')
-    
-    client = Anthropic(api_key=anthropic_api_key)
-    
-    try:
-        # 분석 요청을 하나의 프롬프트로 통합
-        analysis_parts = []
-        analysis_parts.append(get_summary_prompt(title, description, length))
-        
-        if include_sentiment:
-            analysis_parts.append("\n\n추가로, 이 뉴스의 감정을 '긍정', '부정', '중립' 중 하나로 분석하고 이유를 한 줄로 설명해주세요.")
-        
-        if include_keywords:
-            analysis_parts.append("\n\n또한, 이 뉴스에서 가장 중요한 키워드 5개를 쉼표로 구분해서 추출해주세요.")
-        
-        combined_prompt = "".join(analysis_parts)
-        
-        response = client.messages.create(
-            model="claude-3-haiku-20240307",
-            max_tokens=400,
-            system="당신은 뉴스 분석 전문가입니다. 요약, 감정 분석, 키워드 추출을 정확하게 수행해주세요.",
-            messages=[
-                {"role": "user", "content": combined_prompt}
-            ]
-        )
-        
-        full_response = response.content[0].text.strip()
-        
-        # 응답을 파싱해서 구분
-        result = {"summary": full_response}
-        
-        # 간단한 파싱 (실제로는 더 정교한 파싱이 필요할 수 있음)
-        if include_sentiment and include_keywords:
-            lines = full_response.split('\n')
-            if len(lines) >= 3:
-                result["summary"] = lines[0]
-                result["sentiment"] = lines[-2] if '감정' in lines[-2] or '긍정' in lines[-2] or '부정' in lines[-2] or '중립' in lines[-2] else "분석 실패"
-                result["keywords"] = lines[-1] if ',' in lines[-1] else "추출 실패"
-        
-        return result
-    except Exception as e:
-        st.error(f"Anthropic API 요청 중 오류 발생: {str(e)}")
-        return {"summary": "분석을 생성할 수 없습니다."}
+# 파이프라인 설정 (사이드바와 검색 옵션 값으로 매 실행마다 생성)
+RESULTS_PER_PAGE = 10
+
+pipeline = NewsPipeline(
+    PipelineConfig(
+        news_source=NEWS_SOURCE_CODES[news_source],
+        **api_credentials,
+        newsapi_language=newsapi_language,
+        model_provider=model_type.lower(),
+        display_count=display_count,
+        sort=sort_value,
+        unified_timeline=unified_timeline,
+        summary_length=summary_length,
+        include_sentiment=enable_sentiment,
+        include_keywords=enable_keywords,
+        local_sentiment_keywords=analysis_engine == "로컬 엔진",
+        max_concurrency=max_concurrency,
+        enable_batching=enable_batching,
+        batch_token_budget=batch_token_budget if enable_batching else 4000,
+        search_cache_ttl=search_cache_ttl,
+        serve_stale_search=serve_stale_search,
+        max_description_tokens=max_description_tokens,
+        enable_triage=enable_triage,
+        triage_method=triage_method if enable_triage else "bm25",
+        triage_top_n=triage_top_n if enable_triage else 0,
+        triage_min_score=triage_min_score if enable_triage else 0.2,
+        fetch_full_text=fetch_full_text,
+        max_body_tokens=max_body_tokens if fetch_full_text else 1500,
+        digest_threshold=digest_threshold if digest_mode else DEFAULT_CLUSTER_THRESHOLD,
+        digest_max_clusters=digest_max_clusters if digest_mode else DEFAULT_DIGEST_MAX_CLUSTERS,
+        digest_briefing=digest_briefing if digest_mode else True,
+        archive_first=archive_first,
+        archive_max_age_hours=ARCHIVE_PERIODS[archive_period]
+    ),
+    analysis_cache=analysis_cache,
+    search_cache=search_cache,
+    client_registry=client_registry,
+    token_usage=token_usage,
+    resilience=resilience,
+    metrics=stage_metrics,
+    fetcher=article_fetcher,
+    shared=single_flight,
+    archive=archive
+)
+
+# 관심 키워드 수집기에 이 자격 증명으로 등록한 관심 키워드를 확인할 파이프라인을 넘김
+# (다른 자격 증명의 관심 키워드에는 영향 없음, 설정이 부족하면 대기)
+if not pipeline.config.validate():
+    watchlist_scheduler.configure(pipeline, poll_minutes * 60, watch_workers)
 
 # 검색 및 요약 수행
 if search_pressed:
@@ -408,133 +748,169 @@ if search_pressed:
         st.error("Anthropic API 키가 필요합니다. 사이드바에서 API 키를 입력해주세요.")
     else:
         # API 키 유효성 검사
-        api_configured = False
+        api_configured = True
+        if use_naver and not (naver_client_id and naver_client_secret):
+            api_configured = False
+            st.error("네이버 API 설정이 필요합니다. 사이드바에서 Client ID와 Secret을 입력해주세요.")
+        if use_newsapi and not newsapi_key:
+            api_configured = False
+            st.error("NewsAPI 키가 필요합니다. 사이드바에서 API 키를 입력해주세요.")
         
-        if news_source == "네이버 뉴스":
-            if naver_client_id and naver_client_secret:
-                api_configured = True
-            else:
-                st.error("네이버 API 설정이 필요합니다. 사이드바에서 Client ID와 Secret을 입력해주세요.")
-        elif news_source == "NewsAPI":
-            if newsapi_key:
-                api_configured = True
+        if api_configured and bulk_search:
+            # 페이지를 받는 대로 개수를 갱신하고, 분석은 결과 화면에서 필요한 기사만 수행
+            fetch_status = st.empty()
+            news_results = []
+            try:
+                for page in pipeline.iter_naver_pages(keyword, display_count, sort_value):
+                    news_results.extend(page)
+                    fetch_status.info(f"뉴스 {len(news_results)}개를 가져왔습니다...")
+            except Exception as e:
+                st.error(describe_search_error("네이버 API", e))
+            fetch_status.empty()
+            
+            if not news_results:
+                st.info("검색 결과가 없습니다. 다른 키워드로 시도해보세요.")
+                st.session_state.search_results = None
+                st.session_state.digest_result = None
+            elif digest_mode:
+                st.success(f"{len(news_results)}개의 뉴스를 찾았습니다. 주제별로 묶어 요약합니다.")
+                with st.spinner('주제별로 묶어 요약 중입니다...'):
+                    run_digest(pipeline, keyword, news_results)
             else:
-                st.error("NewsAPI 키가 필요합니다. 사이드바에서 API 키를 입력해주세요.")
-        
-        if api_configured:
+                st.success(f"{len(news_results)}개의 뉴스를 찾았습니다. 보고 있는 페이지의 기사부터 분석합니다.")
+                st.session_state.search_results = [make_result_item(news) for news in news_results]
+                st.session_state.results_page = 1
+                st.session_state.digest_result = None
+        elif api_configured and pipeline.config.use_timeline and not digest_mode:
+            run_timeline(pipeline, keyword, enable_streaming)
+        elif api_configured:
             # 검색 진행
             with st.spinner('뉴스를 검색하고 분석 중입니다...'):
-                # 선택된 API로 뉴스 검색
-                if news_source == "네이버 뉴스":
-                    news_results = search_naver_news(keyword, display_count, sort_value)
-                else:  # NewsAPI
-                    news_results = search_newsapi(keyword, display_count, sort_value, newsapi_language)
+                # 관심 키워드는 백그라운드에서 미리 모아 분석해 둔 최신 기사를 바로 사용
+                # (같은 API 자격 증명으로 등록했고 뉴스 소스, 최신순, 아카이브 설정이 맞을 때만)
+                watched_articles, watched_duplicates = [], 0
+                watch = watchlist_store.get(watch_owner_id, keyword.strip())
+                if watch and watch_matches_search(watch, pipeline.config):
+                    watched_articles, watched_duplicates = watched_results(watchlist_store, watch, pipeline.config)
+                if watched_articles:
+                    news_results, duplicate_count, search_errors = watched_articles, watched_duplicates, []
+                    st.info("관심 키워드입니다. 백그라운드에서 미리 모아 분석한 최신 기사를 보여줍니다.")
+                else:
+                    # 선택된 API로 뉴스 검색 (두 소스를 모두 쓰면 동시에 검색 후 중복 제거, 설정하면 아카이브 먼저)
+                    news_results, duplicate_count, search_errors, from_archive = pipeline.search_or_archive(keyword)
+                    if from_archive:
+                        st.info("아카이브에 저장된 지난 기사에서 찾은 결과입니다. 최신 기사는 '아카이브에서 먼저 찾기'를 끄고 검색하세요.")
+                for error_message in search_errors:
+                    st.error(error_message)
+                if duplicate_count:
+                    st.info(f"두 소스에서 중복된 기사 {duplicate_count}개를 분석에서 제외했습니다.")
                 
                 if not news_results:
                     st.info("검색 결과가 없습니다. 다른 키워드로 시도해보세요.")
                     st.session_state.search_results = None
+                    st.session_state.digest_result = None
+                elif digest_mode:
+                    # 관련도 선별을 켜면 관련 있는 기사만 묶어 요약
+                    selected, _ = pipeline.triage(keyword, news_results)
+                    skipped_count = len(news_results) - len(selected)
+                    st.success(f"{len(news_results)}개의 뉴스를 찾았습니다."
+                               + (f" 관련도가 낮은 {skipped_count}개는 요약하지 않습니다." if skipped_count else ""))
+                    run_digest(pipeline, keyword, [news_results[i] for i in selected])
                 else:
-                    st.success(f"{len(news_results)}개의 뉴스를 찾았습니다.")
+                    # 검색어 관련도가 낮은 기사는 요약하지 않고 원문만 표시
+                    selected, relevance = pipeline.triage(keyword, news_results)
+                    relevance = relevance or [None] * len(news_results)
+                    skipped_count = len(news_results) - len(selected)
+                    st.success(f"{len(news_results)}개의 뉴스를 찾았습니다."
+                               + (f" 관련도가 낮은 {skipped_count}개는 요약하지 않습니다." if skipped_count else ""))
                     
                     # 진행 상황 표시
                     progress_bar = st.progress(0)
-                    analyzed_news = []
                     
-                    # 각 뉴스 분석
-                    for i, news in enumerate(news_results):
-                        # 뉴스 분석
-                        if model_type == "OpenAI":
-                            analysis = analyze_with_openai(news, summary_length, enable_sentiment, enable_keywords)
-                        else:  # Anthropic
-                            analysis = analyze_with_anthropic(news, summary_length, enable_sentiment, enable_keywords)
+                    # 스트리밍 모드: 기사별 미리보기 카드를 먼저 그리고 토큰이 도착하는 대로 채움
+                    stream_callbacks = {}
+                    if enable_streaming:
+                        stream_preview = st.empty()
+                        summary_slots = []
+                        detail_slots = []
+                        with stream_preview.container():
+                            for i, news in enumerate(news_results):
+                                st.markdown(f"**{i+1}. {news.title}**")
+                                summary_slots.append(st.empty())
+                                detail_slots.append(st.empty())
+                                summary_slots[i].caption("분석 대기 중..." if relevance[i] is None or i in selected
+                                                         else "관련도가 낮아 요약 생략")
+                        
+                        def show_partial_summary(i, text):
+                            summary_slots[i].info(text + " ▌")
                         
-                        analyzed_news.append({
-                            "original": news,
-                            "analysis": analysis
-                        })
+                        def show_finished_analysis(i, analysis):
+                            summary_slots[i].info(analysis.get('summary', '요약 없음'))
+                            details = [analysis[key] for key in ('sentiment', 'keywords') if key in analysis]
+                            if details:
+                                detail_slots[i].caption(" | ".join(details))
                         
-                        # 진행 상황 업데이트
-                        progress_bar.progress((i + 1) / len(news_results))
-                        time.sleep(0.1)  # UI 업데이트를 위한 짧은 지연
+                        stream_callbacks = {"on_delta": show_partial_summary, "on_result": show_finished_analysis}
+                    
+                    # 각 뉴스 동시 분석 (캐시된 분석은 바로 반환, 묶음 분석이면 묶음이 끝날 때마다 카드 갱신)
+                    analyses = pipeline.analyze_articles(
+                        news_results,
+                        on_progress=lambda done, total: progress_bar.progress(done / total),
+                        selected=selected,
+                        **stream_callbacks
+                    )
+                    
+                    # 미리보기 카드는 아래의 전체 결과 화면으로 대체
+                    if enable_streaming:
+                        stream_preview.empty()
+                    
+                    # 카드 표시용 값은 검색할 때 한 번만 계산 (분석 오류는 기사 카드에 표시)
+                    analyzed_news = [make_result_item(news, analysis, score)
+                                     for news, analysis, score in zip(news_results, analyses, relevance)]
                     
                     # 검색 결과를 세션 상태에 저장
                     st.session_state.search_results = analyzed_news
+                    st.session_state.results_page = 1
+                    st.session_state.digest_result = None
 
 # 검색 결과 표시 (세션 상태에서 가져오기)
 if st.session_state.search_results:
     analyzed_news = st.session_state.search_results
     
-    # 결과 표시
-    for i, item in enumerate(analyzed_news):
-        news = item["original"]
-        analysis = item["analysis"]
-        
-        with st.container():
-            st.subheader(f"{i+1}. {news['title'].replace('<b>', '').replace('</b>', '')}")
-            
-            # 뉴스 정보 및 분석 결과
-            col1, col2 = st.columns([1, 4])
-            with col1:
-                st.write(f"**출처:** {news.get('source', '정보 없음')}")
-                # 날짜 형식 처리
-                published_date = news.get('publishedAt', '정보 없음')
-                if published_date != '정보 없음':
-                    if news.get('api_source') == 'newsapi':
-                        try:
-                            parsed_date = datetime.fromisoformat(published_date.replace('Z', '+00:00'))
-                            formatted_date = parsed_date.strftime('%Y-%m-%d')
-                        except:
-                            formatted_date = published_date[:10]
-                    else:
-                        formatted_date = published_date[:10]
-                else:
-                    formatted_date = '정보 없음'
-                st.write(f"**날짜:** {formatted_date}")
-                st.write(f"**API:** {news.get('api_source', '').upper()}")
-                
-                # 북마크 버튼 - 고유한 키 사용
-                bookmark_key = f"bookmark_{news.get('url', '')}_{i}"
-                if st.button(f"📑 저장", key=bookmark_key):
-                    if add_bookmark(news, analysis):
-                        st.session_state.bookmark_message = {
-                            'type': 'success',
-                            'text': '뉴스가 저장되었습니다!'
-                        }
-                    else:
-                        st.session_state.bookmark_message = {
-                            'type': 'warning',
-                            'text': '이미 저장된 뉴스입니다!'
-                        }
-                    st.rerun()
-            
-            with col2:
-                st.write(f"**원문:** {news['description'].replace('<b>', '').replace('</b>', '')}")
-                st.write("**AI 요약:**")
-                st.info(analysis.get('summary', '요약 없음'))
-                
-                # 감정 분석 결과
-                if enable_sentiment and 'sentiment' in analysis:
-                    st.write("**감정 분석:**")
-                    sentiment = analysis['sentiment']
-                    if '긍정' in sentiment:
-                        st.success(f"😊 {sentiment}")
-                    elif '부정' in sentiment:
-                        st.error(f"😔 {sentiment}")
-                    else:
-                        st.info(f"😐 {sentiment}")
-                
-                # 키워드 추출 결과
-                if enable_keywords and 'keywords' in analysis:
-                    st.write("**주요 키워드:**")
-                    keywords = analysis['keywords'].split(',')
-                    keyword_tags = []
-                    for kw in keywords[:5]:  # 최대 5개만 표시
-                        keyword_tags.append(f"`{kw.strip()}`")
-                    st.markdown(" ".join(keyword_tags))
-            
-            # 원문 링크
-            st.markdown(f"[원문 보기]({news['url']})")
-            st.divider()
+    # 결과가 많으면 페이지로 나누어 표시
+    page_count = (len(analyzed_news) + RESULTS_PER_PAGE - 1) // RESULTS_PER_PAGE
+    if page_count > 1:
+        col_page, col_auto = st.columns([1, 3])
+        with col_page:
+            st.session_state.results_page = min(st.session_state.results_page, page_count)
+            results_page = st.number_input(f"페이지 (총 {page_count}쪽)", min_value=1, max_value=page_count,
+                                           key="results_page")
+        with col_auto:
+            auto_analyze = st.checkbox("보고 있는 페이지 자동 분석", value=True,
+                                       help="끄면 기사마다 'AI 분석' 버튼을 눌렀을 때만 분석합니다")
+    else:
+        results_page = 1
+        auto_analyze = True
+    page_start = (results_page - 1) * RESULTS_PER_PAGE
+    visible_items = analyzed_news[page_start:page_start + RESULTS_PER_PAGE]
+    
+    # 아직 분석하지 않은 기사는 화면에 보일 때만 분석 (관련도 선별로 건너뛴 기사는 버튼을 누를 때만)
+    pending = [item for item in visible_items if item["analysis"] is None and item["relevance"] is None]
+    if pending and auto_analyze:
+        with st.spinner(f"이 페이지의 기사 {len(pending)}개를 분석 중입니다..."):
+            analyses = pipeline.analyze_articles([item["original"] for item in pending])
+        for item, analysis in zip(pending, analyses):
+            item.update(make_result_item(item["original"], analysis))
+    
+    # 결과 표시 (카드마다 독립된 프래그먼트)
+    with stage_metrics.span("render"):
+        for i, item in enumerate(visible_items, start=page_start):
+            render_result_card(i, item, enable_sentiment, enable_keywords)
+
+# 주제별 묶음 요약 결과 표시
+if st.session_state.digest_result:
+    render_digest(st.session_state.digest_result["digest"], st.session_state.digest_result["articles"],
+                  enable_sentiment, enable_keywords)
 
 # 앱 사용 방법 안내
 with st.expander("📚 사용 방법"):
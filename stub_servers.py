@@ -0,0 +1,346 @@
+# stub_servers.py
+"""네이버 뉴스, NewsAPI, OpenAI, Anthropic API와 기사 원문 페이지를 흉내 내는 로컬 대역 서버 (벤치마크/오프라인 실행용)
+
+실제 API 키와 네트워크 없이 파이프라인 전체를 돌릴 수 있도록 각 엔드포인트의
+응답 형식을 재현하고, 지연 시간·지터·429 응답 비율을 설정할 수 있다.
+"""
+import json
+import random
+import re
+import threading
+import time
+import urllib.parse
+from dataclasses import dataclass
+from email.utils import format_datetime
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+@dataclass
+class EndpointBehavior:
+    """엔드포인트 하나의 응답 특성"""
+    latency: float = 0.05       # 평균 응답 지연(초)
+    jitter: float = 0.02        # 지연의 ± 범위(초)
+    rate_429: float = 0.0       # 429를 돌려줄 확률
+    retry_after: float = 0.1    # 429 응답의 Retry-After(초)
+
+    def wait(self, rng):
+        time.sleep(max(0.0, self.latency + rng.uniform(-self.jitter, self.jitter)))
+
+def prompt_cache_min_tokens(provider, model):
+    """공급자가 프롬프트 캐시를 적용하는 최소 접두부 토큰 수 (OpenAI 1024, Claude Haiku 2048, 그 밖의 Claude 1024)"""
+    if provider == "anthropic" and "haiku" in (model or ""):
+        return 2048
+    return 1024
+
+def build_fake_value(schema, article_ids=()):
+    """JSON 스키마에 맞는 가짜 값 생성 (묶음 분석의 articles 배열은 기사 ID마다 하나씩)"""
+    schema_type = schema.get("type")
+    if "enum" in schema:
+        return schema["enum"][0]
+    if schema_type == "object":
+        properties = schema.get("properties", {})
+        if "articles" in properties:
+            item_schema = properties["articles"]["items"]
+            return {"articles": [
+                {**build_fake_value(item_schema), "id": article_id} for article_id in article_ids
+            ]}
+        return {name: build_fake_value(prop) for name, prop in properties.items()}
+    if schema_type == "array":
+        return [f"키워드{i + 1}" for i in range(5)]
+    return "로컬 대역 서버가 생성한 요약 문장입니다. 실제 모델 응답과 비슷한 길이를 갖도록 채운 내용입니다."
+
+class StubState:
+    """대역 서버의 설정과 요청 통계"""
+
+    def __init__(self, behaviors=None, seed=0, articles_per_query=100):
+        self.behaviors = behaviors or {}
+        self.articles_per_query = articles_per_query
+        self.rng = random.Random(seed)
+        self.counts = {}
+        self.throttled = {}
+        self._cached_prefixes = set()
+        self._lock = threading.Lock()
+
+    def behavior(self, endpoint):
+        return self.behaviors.get(endpoint, EndpointBehavior())
+
+    def record(self, endpoint, throttled=False):
+        with self._lock:
+            self.counts[endpoint] = self.counts.get(endpoint, 0) + 1
+            if throttled:
+                self.throttled[endpoint] = self.throttled.get(endpoint, 0) + 1
+
+    def prefix_seen(self, prefix, tokens, min_tokens):
+        """공급자 쪽 프롬프트 캐시 흉내: 같은 접두부를 이전에 받은 적이 있으면 True (처음이면 기록)
+
+        실제 공급자처럼 min_tokens보다 짧은 접두부는 캐시하지 않는다.
+        """
+        if tokens < min_tokens:
+            return False
+        with self._lock:
+            seen = prefix in self._cached_prefixes
+            self._cached_prefixes.add(prefix)
+            return seen
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self.counts), dict(self.throttled)
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive 연결 재사용 허용
+
+    def log_message(self, format, *args):
+        pass  # 벤치마크 출력이 어지럽지 않도록 접근 로그 생략
+
+    @property
+    def state(self):
+        return self.server.state
+
+    def do_GET(self):
+        parsed = urllib.parse.urlsplit(self.path)
+        params = dict(urllib.parse.parse_qsl(parsed.query))
+        if parsed.path == "/v1/search/news":
+            self._handle("naver", lambda: self._naver_response(params))
+        elif parsed.path == "/v2/everything":
+            self._handle("newsapi", lambda: self._newsapi_response(params))
+        elif parsed.path.startswith("/articles/"):
+            self._handle("article", lambda: self._article_response(parsed.path))
+        else:
+            self._send_json(404, {"error": "not found"})
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        body = json.loads(self.rfile.read(length) or b"{}")
+        path = urllib.parse.urlsplit(self.path).path
+        if path.endswith("/chat/completions"):
+            self._handle("openai", lambda: self._openai_response(body))
+        elif path.endswith("/messages"):
+            self._handle("anthropic", lambda: self._anthropic_response(body))
+        else:
+            self._send_json(404, {"error": "not found"})
+
+    def _handle(self, endpoint, respond):
+        behavior = self.state.behavior(endpoint)
+        behavior.wait(self.state.rng)
+        if self.state.rng.random() < behavior.rate_429:
+            self.state.record(endpoint, throttled=True)
+            self._send_json(429, {"error": {"type": "rate_limit_error", "message": "Too Many Requests"}},
+                            {"Retry-After": str(behavior.retry_after)})
+            return
+        self.state.record(endpoint)
+        respond()
+
+    # 뉴스 검색 API
+
+    def _fake_articles(self, query, start, count):
+        now = datetime(2025, 1, 15, 12, 0, tzinfo=timezone(timedelta(hours=9)))
+        total = self.state.articles_per_query
+        for rank in range(start, min(start + count, total + 1)):
+            yield rank, now - timedelta(minutes=7 * rank), (
+                f"<b>{query}</b> 관련 뉴스 {rank}: 시장과 정책에 미치는 영향 분석",
+                f"{query} 관련 {rank}번째 기사 본문 요약입니다. 업계 관계자들은 이번 발표가 "
+                f"향후 {rank % 7 + 1}개 분기 동안 &quot;상당한 변화&quot;를 가져올 것으로 내다봤다."
+            )
+
+    def _naver_response(self, params):
+        query = params.get("query", "")
+        start, display = int(params.get("start", 1)), int(params.get("display", 10))
+        items = [{
+            "title": title,
+            "originallink": f"https://news.example.com/{urllib.parse.quote(query)}/{rank}",
+            "link": f"{self._base_url}/articles/naver/{urllib.parse.quote(query)}/{rank}",
+            "description": description,
+            "pubDate": format_datetime(published_at)
+        } for rank, published_at, (title, description) in self._fake_articles(query, start, display)]
+        self._send_json(200, {"total": self.state.articles_per_query, "start": start,
+                              "display": len(items), "items": items})
+
+    def _newsapi_response(self, params):
+        query = params.get("q", "")
+        page, page_size = int(params.get("page", 1)), int(params.get("pageSize", 20))
+        if page_size > 100:
+            # 실제 NewsAPI처럼 한도를 넘는 pageSize는 요청 전체를 거부
+            self._send_json(400, {"status": "error", "code": "parameterInvalid",
+                                  "message": "pageSize must be 100 or less."})
+            return
+        articles = [{
+            "source": {"id": None, "name": "Example Wire"},
+            "title": re.sub(r"</?b>", "", title),
+            "description": description,
+            "url": f"{self._base_url}/articles/wire/{urllib.parse.quote(query)}/{rank}",
+            "publishedAt": published_at.astimezone(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+        } for rank, published_at, (title, description)
+            in self._fake_articles(query, (page - 1) * page_size + 1, page_size)]
+        self._send_json(200, {"status": "ok", "totalResults": self.state.articles_per_query, "articles": articles})
+
+    @property
+    def _base_url(self):
+        # 기사 주소도 이 서버를 가리키게 해 원문 수집까지 오프라인으로 측정
+        return f"http://{self.headers.get('Host', '127.0.0.1')}"
+
+    def _article_response(self, path):
+        _, _, source, query, rank = path.split("/", 4)
+        query = urllib.parse.unquote(query)
+        paragraphs = "".join(
+            f"<p>{query} 관련 {rank}번째 기사의 {i + 1}번째 문단입니다. 업계 관계자들은 이번 발표가 시장과 정책 전반에 "
+            f"걸쳐 상당한 변화를 가져올 것으로 내다봤으며, 구체적인 영향은 다음 분기 실적에서 드러날 전망이다.</p>"
+            for i in range(12))
+        page = (f"<!DOCTYPE html><html><head><meta charset=\"utf-8\"><title>{query} {rank}</title>"
+                f"<script>var tracking = true;</script></head><body>"
+                f"<nav><a href=\"/\">홈</a> <a href=\"/economy\">경제</a> <a href=\"/it\">IT/과학 주요 뉴스 전체 보기</a></nav>"
+                f"<div id=\"newsct_article\"><h2>{query} 관련 뉴스 {rank}</h2>{paragraphs}</div>"
+                f"<footer>Copyright {source}. 무단 전재 및 재배포 금지. 모든 권리 보유.</footer></body></html>")
+        payload = page.encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    # LLM API
+
+    def _fake_completion(self, schema_holder, prompt):
+        article_ids = re.findall(r"\[(A\d+)\]", prompt)
+        return json.dumps(build_fake_value(schema_holder, article_ids), ensure_ascii=False)
+
+    def _openai_response(self, body):
+        schema = body.get("response_format", {}).get("json_schema", {}).get("schema", {"type": "string"})
+        messages = [message["content"] for message in body.get("messages", []) if isinstance(message["content"], str)]
+        prompt = "\n".join(messages)
+        content = self._fake_completion(schema, prompt)
+        # OpenAI는 최소 길이 이상인 같은 접두부(첫 메시지)를 자동으로 캐시
+        prefix_tokens = len(messages[0]) // 2 if messages else 0
+        cached = prefix_tokens if messages and self.state.prefix_seen(
+            ("openai", messages[0]), prefix_tokens, prompt_cache_min_tokens("openai", body.get("model"))) else 0
+        usage = {"prompt_tokens": len(prompt) // 2, "completion_tokens": len(content) // 2,
+                 "total_tokens": (len(prompt) + len(content)) // 2,
+                 "prompt_tokens_details": {"cached_tokens": cached}}
+        if body.get("stream"):
+            chunks = [{"id": "chatcmpl-stub", "object": "chat.completion.chunk", "created": int(time.time()),
+                       "model": body.get("model"),
+                       "choices": [{"index": 0, "delta": {"content": content[i:i + 8]}, "finish_reason": None}]}
+                      for i in range(0, len(content), 8)]
+            chunks.append({"id": "chatcmpl-stub", "object": "chat.completion.chunk", "created": int(time.time()),
+                           "model": body.get("model"), "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]})
+            if body.get("stream_options", {}).get("include_usage"):
+                chunks.append({"id": "chatcmpl-stub", "object": "chat.completion.chunk", "created": int(time.time()),
+                               "model": body.get("model"), "choices": [], "usage": usage})
+            self._send_sse([(None, chunk) for chunk in chunks] + [(None, "[DONE]")])
+            return
+        self._send_json(200, {
+            "id": "chatcmpl-stub", "object": "chat.completion", "created": int(time.time()), "model": body.get("model"),
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+            "usage": usage
+        })
+
+    def _anthropic_response(self, body):
+        system = body.get("system", "")
+        cache_control = isinstance(system, list) and any("cache_control" in block for block in system)
+        if isinstance(system, list):
+            system = "\n".join(block.get("text", "") for block in system)
+        match = re.search(r"응답 JSON 스키마: (\{.*\})", system, re.S)
+        schema = json.loads(match.group(1)) if match else {"type": "string"}
+        prompt = "\n".join(message["content"] if isinstance(message["content"], str)
+                           else "".join(block.get("text", "") for block in message["content"])
+                           for message in body.get("messages", []))
+        content = self._fake_completion(schema, prompt)
+        # 미리 채운 '{' 다음부터 이어서 생성한 것처럼 응답
+        if body.get("messages") and body["messages"][-1]["role"] == "assistant":
+            content = content[len(body["messages"][-1]["content"]):]
+        # cache_control이 붙은 시스템 프롬프트는 최소 길이 이상일 때만 처음에 캐시에 쓰고 이후에는 캐시에서 읽음
+        cache_read = cache_write = 0
+        system_tokens = len(system) // 2
+        min_tokens = prompt_cache_min_tokens("anthropic", body.get("model"))
+        if cache_control and system_tokens >= min_tokens:
+            if self.state.prefix_seen(("anthropic", system), system_tokens, min_tokens):
+                cache_read = system_tokens
+            else:
+                cache_write = system_tokens
+        usage = {"input_tokens": (len(system) + len(prompt)) // 2 - cache_read - cache_write,
+                 "output_tokens": len(content) // 2,
+                 "cache_read_input_tokens": cache_read, "cache_creation_input_tokens": cache_write}
+        message = {"id": "msg_stub", "type": "message", "role": "assistant", "model": body.get("model"),
+                   "content": [], "stop_reason": None, "stop_sequence": None, "usage": usage}
+        if body.get("stream"):
+            events = [("message_start", {"type": "message_start", "message": message}),
+                      ("content_block_start", {"type": "content_block_start", "index": 0,
+                                               "content_block": {"type": "text", "text": ""}})]
+            events += [("content_block_delta", {"type": "content_block_delta", "index": 0,
+                                                "delta": {"type": "text_delta", "text": content[i:i + 8]}})
+                       for i in range(0, len(content), 8)]
+            events += [("content_block_stop", {"type": "content_block_stop", "index": 0}),
+                       ("message_delta", {"type": "message_delta",
+                                          "delta": {"stop_reason": "end_turn", "stop_sequence": None},
+                                          "usage": {"output_tokens": usage["output_tokens"]}}),
+                       ("message_stop", {"type": "message_stop"})]
+            self._send_sse(events)
+            return
+        self._send_json(200, {**message, "content": [{"type": "text", "text": content}], "stop_reason": "end_turn"})
+
+    # 응답 전송
+
+    def _send_json(self, status, data, headers=None):
+        payload = json.dumps(data, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(payload)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _send_sse(self, events):
+        parts = []
+        for event, data in events:
+            if event:
+                parts.append(f"event: {event}\n")
+            parts.append(f"data: {data if isinstance(data, str) else json.dumps(data, ensure_ascii=False)}\n\n")
+        payload = "".join(parts).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+class StubServer:
+    """모든 대역 엔드포인트를 하나의 로컬 포트에서 제공하는 서버
+
+    with StubServer(behaviors) as stub:
+        config = PipelineConfig(**stub.pipeline_urls(), ...)
+    """
+
+    def __init__(self, behaviors=None, seed=0, articles_per_query=100, host="127.0.0.1", port=0):
+        self.state = StubState(behaviors, seed, articles_per_query)
+        self.httpd = ThreadingHTTPServer((host, port), StubHandler)
+        self.httpd.daemon_threads = True
+        self.httpd.state = self.state
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def pipeline_urls(self):
+        """PipelineConfig에 넘길 API 주소 설정"""
+        return {
+            "naver_api_url": self.base_url,
+            "newsapi_url": self.base_url,
+            "openai_base_url": f"{self.base_url}/v1",
+            "anthropic_base_url": self.base_url
+        }
+
+    def start(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
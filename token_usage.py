@@ -0,0 +1,89 @@
+# token_usage.py
+"""AI 호출별 토큰 사용량, 지연 시간, 예상 비용 기록 (공급자가 알려준 프롬프트 캐시 토큰은 비용 계산에 반영)"""
+import threading
+import time
+from collections import deque
+
+# 모델별 100만 토큰당 가격(USD): 입력, 캐시 읽기, 캐시 쓰기, 출력 — 예상 비용 계산용
+MODEL_PRICES = {
+    "gpt-4o-mini": {"input": 0.15, "cached": 0.075, "cache_write": 0.15, "output": 0.60},
+    "claude-3-haiku-20240307": {"input": 0.25, "cached": 0.03, "cache_write": 0.30, "output": 1.25},
+}
+
+def usage_from_openai(usage):
+    """OpenAI usage 객체를 (입력, 출력, 캐시 읽기, 캐시 쓰기) 토큰 수로 변환 (prompt_tokens에 캐시분 포함)"""
+    if usage is None:
+        return None
+    details = getattr(usage, 'prompt_tokens_details', None)
+    cached = getattr(details, 'cached_tokens', 0) or 0
+    return usage.prompt_tokens or 0, usage.completion_tokens or 0, cached, 0
+
+def usage_from_anthropic(usage):
+    """Anthropic usage 객체를 (입력, 출력, 캐시 읽기, 캐시 쓰기) 토큰 수로 변환
+
+    Anthropic의 input_tokens에는 캐시에서 읽거나 캐시에 쓴 토큰이 빠져 있으므로 더해서 전체 입력으로 맞춘다.
+    """
+    if usage is None:
+        return None
+    cached = getattr(usage, 'cache_read_input_tokens', 0) or 0
+    cache_write = getattr(usage, 'cache_creation_input_tokens', 0) or 0
+    return (usage.input_tokens or 0) + cached + cache_write, usage.output_tokens or 0, cached, cache_write
+
+def estimate_cost(model, input_tokens, output_tokens, cached_tokens=0, cache_write_tokens=0):
+    """가격표로 계산한 예상 비용(USD) (가격을 모르는 모델은 0)"""
+    prices = MODEL_PRICES.get(model)
+    if not prices:
+        return 0.0
+    uncached = input_tokens - cached_tokens - cache_write_tokens
+    return (uncached * prices["input"] + cached_tokens * prices["cached"]
+            + cache_write_tokens * prices["cache_write"] + output_tokens * prices["output"]) / 1_000_000
+
+class TokenUsageLog:
+    """여러 분석 스레드가 함께 쓰는 호출 기록 (최근 max_records건과 누적 합계 보관)"""
+
+    def __init__(self, max_records=1000):
+        self._records = deque(maxlen=max_records)
+        self._lock = threading.Lock()
+        self._reset_totals()
+
+    def _reset_totals(self):
+        self._totals = {
+            "calls": 0, "input_tokens": 0, "output_tokens": 0, "cached_tokens": 0, "cache_write_tokens": 0,
+            "latency": 0.0, "cost": 0.0
+        }
+
+    def record(self, model, kind, usage, latency):
+        """호출 한 건 기록 (usage: usage_from_openai/usage_from_anthropic 결과, None이면 무시)"""
+        if usage is None:
+            return
+        input_tokens, output_tokens, cached_tokens, cache_write_tokens = usage
+        cost = estimate_cost(model, input_tokens, output_tokens, cached_tokens, cache_write_tokens)
+        record = {
+            "time": time.time(), "model": model, "kind": kind, "latency": latency,
+            "input_tokens": input_tokens, "output_tokens": output_tokens,
+            "cached_tokens": cached_tokens, "cache_write_tokens": cache_write_tokens, "cost": cost
+        }
+        with self._lock:
+            self._records.append(record)
+            totals = self._totals
+            totals["calls"] += 1
+            for key in ("input_tokens", "output_tokens", "cached_tokens", "cache_write_tokens", "latency", "cost"):
+                totals[key] += record[key]
+
+    def summary(self):
+        """누적 호출 수, 토큰 합계, 평균 지연, 예상 비용"""
+        with self._lock:
+            totals = dict(self._totals)
+        calls = totals["calls"]
+        return {**totals, "avg_latency": totals["latency"] / calls if calls else 0.0}
+
+    def records(self):
+        """최근 호출 기록 (오래된 것부터)"""
+        with self._lock:
+            return list(self._records)
+
+    def clear(self):
+        """기록과 누적 합계 삭제"""
+        with self._lock:
+            self._records.clear()
+            self._reset_totals()
@@ -0,0 +1,412 @@
+# watchlist.py
+"""관심 키워드를 주기적으로 확인해 새 기사만 가져오고 미리 분석해 두는 백그라운드 수집기
+
+키워드와 소스별로 마지막으로 받은 기사의 게시 시각과 그 시각의 URL을 워터마크로 삼아
+네이버는 최신순(sort=date) 페이지를, NewsAPI는 워터마크 이후(from) 기사만 요청한다.
+새 기사는 파이프라인으로 분석해 분석 캐시에 넣어 두므로, 같은 분석 설정으로 해당 키워드를
+열면 AI 호출 없이 바로 요약이 표시된다.
+
+관심 키워드는 등록한 사용자의 API 자격 증명(해시값)에 묶인다. 수집과 분석에는 그 사용자가
+넘긴 파이프라인만 쓰고, 모아 둔 기사도 같은 자격 증명을 쓰는 세션에만 보여 준다.
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+from articles import Article, parse_timestamp
+from dedup import deduplicate_articles
+from news_pipeline import NAVER_MAX_START, NAVER_PAGE_SIZE, describe_search_error
+
+DEFAULT_WATCHLIST_DB_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "watchlist.sqlite3")
+DEFAULT_POLL_INTERVAL = 600  # 10분
+WATCH_INITIAL_ITEMS = 20  # 처음 확인할 때 소스별로 가져올 최신 기사 수
+WATCH_MAX_NEW_ITEMS = 100  # 한 번 확인할 때 소스별로 가져올 새 기사 최대 수
+WATCH_ARTICLES_PER_KEYWORD = 200  # 키워드별로 보관하는 최신 기사 수
+SCHEDULER_TICK_SECONDS = 5  # 확인할 키워드가 있는지 살펴보는 간격
+CREDENTIAL_FIELDS = ("naver_client_id", "naver_client_secret", "newsapi_key", "openai_api_key", "anthropic_api_key")
+
+def watch_owner(**credentials):
+    """관심 키워드 소유자 식별자: API 자격 증명을 해시한 값 (키 자체는 저장하지 않음)"""
+    payload = json.dumps([credentials.get(field) or "" for field in CREDENTIAL_FIELDS])
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+def watch_matches_search(watch, config):
+    """모아 둔 기사를 검색 결과로 바로 쓸 수 있는지: 같은 뉴스 소스, 최신순, 아카이브 우선 검색이 아닐 때
+
+    관심 키워드는 최신순으로 모으므로 정확도순 검색이나 아카이브에서 먼저 찾는 검색에는 쓰지 않는다.
+    """
+    return watch["news_source"] == config.news_source and config.sort == 'date' and not config.archive_first
+
+def watched_results(store, watch, config):
+    """모아 둔 기사를 검색 결과처럼 반환: (최신 기사 display_count개, 제외된 중복 기사 수)
+
+    두 소스를 모두 쓰는 관심 키워드는 검색과 마찬가지로 중복을 제거한 뒤 요청한 개수만 남긴다
+    (서로 다른 확인 때 모은 같은 기사가 남아 있을 수 있음).
+    """
+    if watch["news_source"] != "all":
+        return store.articles(watch["id"], (watch["news_source"],), config.display_count), 0
+    articles, removed_count = deduplicate_articles(store.articles(watch["id"], ("naver", "newsapi"),
+                                                                  config.display_count * 2))
+    return articles[:config.display_count], removed_count
+
+def config_owner(config):
+    """파이프라인 설정의 자격 증명으로 만든 관심 키워드 소유자 식별자"""
+    return watch_owner(**{field: getattr(config, field) for field in CREDENTIAL_FIELDS})
+
+def is_after_watermark(article, watermark):
+    """기사가 워터마크(마지막으로 본 게시 시각, 그 시각의 URL 집합)보다 새로운지 판단"""
+    if watermark is None:
+        return True
+    since, seen_urls = watermark
+    if article.url in seen_urls:
+        return False
+    if article.published_at is None:
+        return True
+    return article.published_at.timestamp() >= since
+
+def advance_watermark(watermark, articles):
+    """새로 받은 기사로 워터마크를 앞당김 (게시 시각이 없는 기사는 반영하지 않음)"""
+    timestamps = [(article.published_at.timestamp(), article.url) for article in articles if article.published_at]
+    if not timestamps:
+        return watermark
+    latest = max(ts for ts, _ in timestamps)
+    if watermark and watermark[0] > latest:
+        return watermark
+    urls = {url for ts, url in timestamps if ts == latest}
+    if watermark and watermark[0] == latest:
+        urls |= watermark[1]
+    return latest, urls
+
+def fetch_new_naver(pipeline, keyword, watermark, max_items):
+    """네이버 뉴스를 최신순으로 넘기며 워터마크보다 새 기사만 모음 (이미 본 기사가 나오면 멈춤)"""
+    new_articles = []
+    page_size = min(NAVER_PAGE_SIZE, max_items)
+    start = 1
+    while start <= NAVER_MAX_START and len(new_articles) < max_items:
+        page = pipeline.fetch_naver_news(keyword, page_size, 'date', start)
+        for article in page:
+            if not is_after_watermark(article, watermark):
+                return new_articles
+            new_articles.append(article)
+        if len(page) < page_size:
+            break
+        start += page_size
+    return new_articles[:max_items]
+
+def fetch_new_newsapi(pipeline, keyword, watermark, max_items):
+    """NewsAPI에서 워터마크 시각 이후에 게시된 기사만 최신순으로 요청"""
+    since = datetime.fromtimestamp(watermark[0], timezone.utc) if watermark else None
+    articles = pipeline.fetch_newsapi(keyword, min(NAVER_PAGE_SIZE, max_items), 'date',
+                                      pipeline.config.newsapi_language, from_time=since)
+    return [article for article in articles if is_after_watermark(article, watermark)][:max_items]
+
+# 소스 이름 -> (새 기사 수집 함수, 필요한 설정 확인, 검색 오류에 붙일 API 이름)
+WATCH_SOURCES = {
+    "naver": (fetch_new_naver, lambda config: config.naver_client_id and config.naver_client_secret, "네이버 API"),
+    "newsapi": (fetch_new_newsapi, lambda config: config.newsapi_key, "NewsAPI"),
+}
+
+class WatchlistStore:
+    """관심 키워드, 키워드별 최신 기사, 소스별 워터마크를 저장하는 SQLite 저장소
+
+    관심 키워드는 (소유자, 키워드)마다 하나씩 두고, 기사와 워터마크는 관심 키워드 id에 묶는다.
+    워터마크는 중복 제거 전에 받은 기사로 계산해서, 다른 소스와 겹쳐 저장하지 않은 기사도
+    다음 확인 때 다시 받지 않는다.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS watchlist (
+                    id INTEGER PRIMARY KEY,
+                    owner TEXT NOT NULL,
+                    keyword TEXT NOT NULL,
+                    news_source TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    last_polled_at REAL,
+                    last_new_count INTEGER NOT NULL DEFAULT 0,
+                    last_error TEXT NOT NULL DEFAULT '',
+                    UNIQUE (owner, keyword)
+                )
+            """)
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS watch_articles (
+                    id INTEGER PRIMARY KEY,
+                    watch_id INTEGER NOT NULL,
+                    url TEXT NOT NULL,
+                    title TEXT NOT NULL,
+                    description TEXT NOT NULL,
+                    source TEXT NOT NULL,
+                    api_source TEXT NOT NULL,
+                    published_at TEXT,
+                    published_ts REAL NOT NULL,
+                    fetched_at REAL NOT NULL,
+                    UNIQUE (watch_id, url)
+                )
+            """)
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_watch_articles_recent "
+                               "ON watch_articles (watch_id, api_source, published_ts DESC)")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS watch_watermarks (
+                    watch_id INTEGER NOT NULL,
+                    api_source TEXT NOT NULL,
+                    published_ts REAL NOT NULL,
+                    urls TEXT NOT NULL,
+                    PRIMARY KEY (watch_id, api_source)
+                )
+            """)
+
+    def add(self, owner, keyword, news_source):
+        """소유자의 관심 키워드 등록 (이미 있으면 소스만 바꾸고 False 반환)"""
+        with self._lock, self._conn:
+            cursor = self._conn.execute(
+                "INSERT OR IGNORE INTO watchlist (owner, keyword, news_source, created_at) VALUES (?, ?, ?, ?)",
+                (owner, keyword, news_source, time.time())
+            )
+            if cursor.rowcount == 1:
+                return True
+            self._conn.execute("UPDATE watchlist SET news_source = ? WHERE owner = ? AND keyword = ?",
+                               (news_source, owner, keyword))
+            return False
+
+    def remove(self, watch_id):
+        """관심 키워드와 모아 둔 기사 삭제"""
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM watchlist WHERE id = ?", (watch_id,))
+            self._conn.execute("DELETE FROM watch_articles WHERE watch_id = ?", (watch_id,))
+            self._conn.execute("DELETE FROM watch_watermarks WHERE watch_id = ?", (watch_id,))
+
+    def get(self, owner, keyword):
+        """소유자의 관심 키워드 정보 (등록되지 않았으면 None)"""
+        watches = self._select("WHERE w.owner = ? AND w.keyword = ?", [owner, keyword])
+        return watches[0] if watches else None
+
+    def list(self, owner=None):
+        """소유자의 관심 키워드 (등록순, owner가 None이면 모든 소유자)"""
+        if owner is None:
+            return self._select("", [])
+        return self._select("WHERE w.owner = ?", [owner])
+
+    def due(self, owner, poll_interval, now=None):
+        """소유자의 관심 키워드 중 마지막 확인 후 poll_interval초가 지난 것"""
+        cutoff = (now or time.time()) - poll_interval
+        return self._select("WHERE w.owner = ? AND (w.last_polled_at IS NULL OR w.last_polled_at <= ?)",
+                            [owner, cutoff])
+
+    def watermark(self, watch_id, api_source):
+        """소스별 워터마크: (가장 최근 게시 시각, 그 시각에 게시된 기사 URL 집합), 아직 없으면 None"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT published_ts, urls FROM watch_watermarks WHERE watch_id = ? AND api_source = ?",
+                (watch_id, api_source)
+            ).fetchone()
+        if row is None:
+            return None
+        return row[0], set(json.loads(row[1]))
+
+    def set_watermark(self, watch_id, api_source, watermark):
+        """소스별 워터마크 저장"""
+        if watermark is None:
+            return
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO watch_watermarks (watch_id, api_source, published_ts, urls) VALUES (?, ?, ?, ?)",
+                (watch_id, api_source, watermark[0], json.dumps(sorted(watermark[1])))
+            )
+
+    def add_articles(self, watch_id, articles):
+        """새 기사 저장 후 키워드별로 최신 WATCH_ARTICLES_PER_KEYWORD개만 남김 (실제로 저장된 기사 반환)
+
+        게시 시각이 없는 기사는 목록에서 가장 오래된 것으로 취급한다.
+        """
+        now = time.time()
+        stored = []
+        with self._lock, self._conn:
+            for article in articles:
+                cursor = self._conn.execute(
+                    "INSERT OR IGNORE INTO watch_articles (watch_id, url, title, description, source, api_source, "
+                    "published_at, published_ts, fetched_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (watch_id, article.url, article.title, article.description, article.source, article.api_source,
+                     article.published_at.isoformat() if article.published_at else None,
+                     article.published_at.timestamp() if article.published_at else 0.0, now)
+                )
+                if cursor.rowcount == 1:
+                    stored.append(article)
+            self._conn.execute(
+                "DELETE FROM watch_articles WHERE watch_id = ? AND id NOT IN (SELECT id FROM watch_articles "
+                "WHERE watch_id = ? ORDER BY published_ts DESC LIMIT ?)",
+                (watch_id, watch_id, WATCH_ARTICLES_PER_KEYWORD)
+            )
+        return stored
+
+    def articles(self, watch_id, api_sources=("naver", "newsapi"), limit=10):
+        """모아 둔 기사를 최신순으로 limit개 반환 (기사 레코드)"""
+        placeholders = ", ".join("?" * len(api_sources))
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT title, description, url, source, api_source, published_at FROM watch_articles "
+                f"WHERE watch_id = ? AND api_source IN ({placeholders}) ORDER BY published_ts DESC LIMIT ?",
+                [watch_id, *api_sources, limit]
+            ).fetchall()
+        return [Article(title, description, url, source, api_source, parse_timestamp(published_at))
+                for title, description, url, source, api_source, published_at in rows]
+
+    def record_poll(self, watch_id, new_count, error=""):
+        """확인 시각과 결과 기록"""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE watchlist SET last_polled_at = ?, last_new_count = ?, last_error = ? WHERE id = ?",
+                (time.time(), new_count, error, watch_id)
+            )
+
+    def close(self):
+        """데이터베이스 연결 종료"""
+        with self._lock:
+            self._conn.close()
+
+    def _select(self, where, params):
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT w.id, w.owner, w.keyword, w.news_source, w.created_at, w.last_polled_at, w.last_new_count, "
+                "w.last_error, (SELECT COUNT(*) FROM watch_articles a WHERE a.watch_id = w.id) "
+                f"FROM watchlist w {where} ORDER BY w.created_at",
+                params
+            ).fetchall()
+        columns = ("id", "owner", "keyword", "news_source", "created_at", "last_polled_at", "last_new_count",
+                   "last_error", "article_count")
+        return [dict(zip(columns, row)) for row in rows]
+
+class WatchlistScheduler:
+    """관심 키워드를 소유자별 확인 간격마다 확인해 새 기사를 모으고 미리 분석하는 백그라운드 스레드
+
+    파이프라인, 확인 간격, 동시에 확인할 키워드 수는 자격 증명 소유자별로 따로 보관해, 관심 키워드마다
+    등록한 소유자의 API 키와 설정으로만 확인한다. 다른 세션이 configure()를 불러도 자기 소유자의 설정만
+    바뀌며, 소유자의 파이프라인을 받기 전(앱을 다시 시작한 직후 등)에는 그 관심 키워드를 확인하지 않는다.
+    생성자의 poll_interval과 max_workers는 configure()에서 값을 주지 않은 소유자의 기본값이다.
+    """
+
+    def __init__(self, store, poll_interval=DEFAULT_POLL_INTERVAL, max_workers=2, on_new_articles=None):
+        self.store = store
+        self.poll_interval = poll_interval
+        self.max_workers = max_workers
+        self.on_new_articles = on_new_articles
+        self._owners = {}  # 소유자 -> (파이프라인, 확인 간격, 동시에 확인할 키워드 수)
+        self._forced = set()  # 확인 간격과 관계없이 바로 확인할 소유자 (None이면 모든 소유자)
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self.last_error = ""
+
+    def configure(self, pipeline, poll_interval=None, max_workers=None):
+        """파이프라인 소유자의 관심 키워드에 쓸 파이프라인과 확인 간격, 동시에 확인할 키워드 수를 바꾸고 스레드 시작
+
+        poll_interval이나 max_workers가 None이면 그 소유자의 기존 값(처음이면 기본값)을 유지한다.
+        """
+        owner = config_owner(pipeline.config)
+        with self._lock:
+            _, current_interval, current_workers = self._owners.get(owner, (None, self.poll_interval, self.max_workers))
+            self._owners[owner] = (pipeline,
+                                   current_interval if poll_interval is None else poll_interval,
+                                   current_workers if max_workers is None else max_workers)
+        self.start()
+
+    def start(self):
+        """백그라운드 스레드 시작 (이미 실행 중이면 무시)"""
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="watchlist-scheduler", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout=None):
+        """백그라운드 스레드 종료"""
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def poll_now(self, owner=None):
+        """확인 간격과 관계없이 소유자의 관심 키워드를 바로 확인하도록 요청 (owner가 None이면 모든 소유자)"""
+        with self._lock:
+            self._forced.add(owner)
+        self._wake.set()
+
+    def poll_due(self, force=False):
+        """확인할 때가 된 관심 키워드를 소유자별로 동시에 확인할 키워드 수만큼씩 확인하고 새 기사 수 합계 반환
+
+        force가 True면 모든 소유자의, 소유자 집합이면 그 소유자들의 관심 키워드를 확인 간격과 관계없이 확인한다.
+        소유자의 파이프라인이 아직 없는 관심 키워드는 그 소유자가 다시 접속할 때까지 건너뛴다.
+        """
+        with self._lock:
+            owners = dict(self._owners)
+        executors, futures = [], []
+        try:
+            for owner, (pipeline, poll_interval, max_workers) in owners.items():
+                forced = force is True or (force and owner in force)
+                watches = self.store.list(owner) if forced else self.store.due(owner, poll_interval)
+                if not watches:
+                    continue
+                executor = ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(watches))))
+                executors.append(executor)
+                futures += [executor.submit(self.poll_keyword, pipeline, watch) for watch in watches]
+            return sum(future.result() for future in futures)
+        finally:
+            for executor in executors:
+                executor.shutdown()
+
+    def poll_keyword(self, pipeline, watch):
+        """키워드 하나의 새 기사를 소스별로 모아 저장하고 분석 캐시에 미리 분석 (새 기사 수 반환)"""
+        watch_id, keyword = watch["id"], watch["keyword"]
+        new_articles, errors = [], []
+        for api_source, (fetch_new, configured, api_name) in WATCH_SOURCES.items():
+            if watch["news_source"] not in (api_source, "all"):
+                continue
+            if not configured(pipeline.config):
+                errors.append(f"{api_name} 설정이 없어 확인하지 못했습니다.")
+                continue
+            watermark = self.store.watermark(watch_id, api_source)
+            try:
+                fetched = fetch_new(pipeline, keyword, watermark,
+                                    WATCH_MAX_NEW_ITEMS if watermark else WATCH_INITIAL_ITEMS)
+            except Exception as e:
+                errors.append(describe_search_error(api_name, e))
+                continue
+            self.store.set_watermark(watch_id, api_source, advance_watermark(watermark, fetched))
+            new_articles += fetched
+
+        if watch["news_source"] == "all":
+            new_articles, _ = deduplicate_articles(new_articles)
+        # 이미 모아 둔 기사(다른 소스와 URL이 같은 기사 등)는 다시 분석하지 않음
+        new_articles = self.store.add_articles(watch_id, new_articles)
+        # 관련도 선별을 켠 설정이면 관련 있는 기사만 미리 분석
+        analyses = pipeline.analyze_articles(new_articles, selected=pipeline.triage(keyword, new_articles)[0]) \
+            if new_articles else []
+        self.store.record_poll(watch_id, len(new_articles), " ".join(errors))
+        if new_articles and self.on_new_articles:
+            self.on_new_articles(keyword, new_articles, analyses)
+        return len(new_articles)
+
+    def _run(self):
+        forced = set()
+        while not self._stop.is_set():
+            try:
+                self.poll_due(True if None in forced else forced)
+                self.last_error = ""
+            except Exception as e:
+                # 스레드가 멈추지 않도록 오류는 기록만 하고 다음 확인 때 다시 시도
+                self.last_error = f"관심 키워드 확인 중 오류 발생: {str(e)}"
+            self._wake.wait(SCHEDULER_TICK_SECONDS)
+            self._wake.clear()
+            with self._lock:
+                forced, self._forced = self._forced, set()